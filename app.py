@@ -1,9 +1,46 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
 from src.api.FetchSpeechData import speech_app
+from src.core.Common import Metrics, Profiling
+
+REQUEST_SECONDS = Metrics.histogram('api_request_seconds', "API request latency by method, route and status",
+                                    ('method', 'route', 'status'))
 # ʼ FastAPI ʵ
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # With PROFILE=1 the report covers the whole server run and is written on shutdown
+    with Profiling.profile_run('api'):
+        yield
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/s",speech_app)
 
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (set by the router that matched), not by the raw path
+        route = request.scope.get('route')
+        route_path = f"{request.scope.get('root_path', '')}{route.path}" if route is not None else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route_path,
+                                status=str(status))
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(Metrics.render(), media_type=Metrics.CONTENT_TYPE)
+
 @app.get("/")
 async def root():
     return {"status": "ok"}
@@ -0,0 +1,119 @@
+"""
+Cold start of the speech entry points when there is nothing to do.
+
+Each stage first runs once against the local fixture server to bring an empty work directory up to date (uploads
+go to mongomock unless --mongo-uri is given). Then it runs again in a fresh interpreter under `python -X importtime`,
+which is the cron case this measures: nothing new on the site, nothing to extract, nothing to upload. Reports the
+wall time of that run (interpreter start-up included), the time spent importing and the heaviest imports.
+
+    python benchmarks/bench_cold_start.py --start-year 2023 --budget 1.0
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+
+from fixtures.fed_server import FedFixtureServer  # noqa: E402
+
+# Every snippet runs in a new interpreter; {workdir}, {start_year} and {mongo} are filled in per run
+PRELUDE = f"""
+import asyncio, os, sys
+sys.path.insert(0, {REPO_ROOT!r})
+
+def client(use_mock):
+    if not use_mock:
+        return None
+    from mongomock_motor import AsyncMongoMockClient
+    return AsyncMongoMockClient()
+"""
+
+STAGES = {
+    'SpeechDownloader': """
+from src.core.Speech import SpeechDownloader
+SpeechDownloader.main(base_folder=os.path.join({workdir!r}, 'pdfs'), start_year={start_year})
+""",
+    'PdfHanlder': """
+from src.core.Speech.PdfHanlder import PdfHanlder as pdf_module
+pdf_module.main(os.path.join({workdir!r}, 'pdfs', 'speech_metadata'), os.path.join({workdir!r}, 'all.json'))
+""",
+    'MongoDbManger': """
+from src.core.Speech.PdfHanlder.UploadDb import MongoDbManger as mongo_module
+asyncio.run(mongo_module.main(os.path.join({workdir!r}, 'all.json'), client=client({mongo})))
+""",
+    'SpeechPipeline --once': """
+from src.cron import SpeechPipeline
+downloader = SpeechPipeline.downloader_module.SpeechDownloader(base_folder=os.path.join({workdir!r}, 'pipeline'),
+                                                               start_year={start_year})
+db_manager = None
+if {mongo}:
+    db_manager = SpeechPipeline.mongo_module.AsyncMongoDBManager(client=client(True))
+asyncio.run(SpeechPipeline.SpeechPipeline(downloader=downloader, db_manager=db_manager, trigger_file=None)
+            .run(once=True))
+""",
+}
+
+
+def run_snippet(code, env, importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    start = time.perf_counter()
+    result = subprocess.run(command, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{code.strip().splitlines()[-1]} failed:\n{result.stderr[-2000:]}")
+    return wall, result.stderr
+
+
+def parse_importtime(stderr):
+    """(total import seconds, [(cumulative seconds, top-level module)] heaviest first) from -X importtime output."""
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module that imported them
+        if not name[1:].startswith(' '):
+            top_level.append((int(cumulative) / 1e6, name.strip()))
+    return sum(seconds for seconds, _ in top_level), sorted(top_level, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--start-year', type=int, default=2023)
+    parser.add_argument('--budget', type=float, default=1.0, help="Seconds a run with nothing to do may take")
+    parser.add_argument('--top', type=int, default=4, help="Heaviest imports listed per stage")
+    parser.add_argument('--mongo-uri', help="Upload the first runs to a real MongoDB instead of mongomock")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='speech-cold-start-')
+    with FedFixtureServer() as server:
+        env = dict(os.environ, FED_BASE_URL=server.base_url)
+        if args.mongo_uri:
+            env['MONGO_URI'] = args.mongo_uri
+        params = {'workdir': workdir, 'start_year': args.start_year, 'mongo': not args.mongo_uri}
+        baseline, _ = run_snippet('pass', env)
+
+        results = []
+        for name, snippet in STAGES.items():
+            code = PRELUDE + snippet.format(**params)
+            run_snippet(code, env)  # Brings the work directory up to date
+            # The measured run never connects to MongoDB, so it does not need the mock
+            wall, stderr = run_snippet(PRELUDE + snippet.format(**dict(params, mongo=False)), env, importtime=True)
+            imports, heaviest = parse_importtime(stderr)
+            results.append((name, wall, imports, heaviest[:args.top]))
+
+    print(f"workdir: {workdir}, interpreter start-up alone: {baseline:.3f}s")
+    print(f"{'entry point':<24} {'wall s':>7} {'imports s':>10}  heaviest imports (cumulative s)")
+    for name, wall, imports, heaviest in results:
+        flag = '' if wall < args.budget else f'  over the {args.budget:.1f}s budget'
+        listed = ', '.join(f"{module} {seconds:.3f}" for seconds, module in heaviest)
+        print(f"{name:<24} {wall:>7.3f} {imports:>10.3f}  {listed}{flag}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark of the company HTML -> text conversion in FileProcessor: a fresh html2text converter
+per page on the full document (the old behaviour) vs the shared converter pool on the extracted
+main content, optionally with the cross-page boilerplate filter.
+
+Pages come from the saved Firecrawl results (CompanyList/<Company>/data/metaData/*_metaData_*.json)
+and from --html-dir, laid out as <html-dir>/<Company>/*.html. The boilerplate filter only removes
+lines once a company has --min-pages pages, so use --html-dir with several pages per company to see it.
+
+    python benchmarks/bench_html_conversion.py --html-dir /tmp/company_pages
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+import html2text  # noqa: E402
+
+from src.config import CompanyConfig  # noqa: E402
+from src.core.Company.Processor import HtmlConverter  # noqa: E402
+
+
+def load_pages(html_dir):
+    """Return {company: [html, ...]}."""
+    pages = defaultdict(list)
+    pattern = os.path.join(CompanyConfig.COMPANY_LIST_DIR, '*', 'data', 'metaData', '*_metaData_*.json')
+    for path in sorted(glob.glob(pattern)):
+        company = os.path.basename(path).split('_metaData_')[0]
+        with open(path, 'r', encoding='utf-8') as f:
+            html = json.load(f).get('html')
+        if html:
+            pages[company].append(html)
+    if html_dir:
+        for path in sorted(glob.glob(os.path.join(html_dir, '*', '*.htm*'))):
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                pages[os.path.basename(os.path.dirname(path))].append(f.read())
+    return pages
+
+
+def baseline(pages):
+    texts = []
+    for html in pages:
+        h = html2text.HTML2Text()
+        h.ignore_links = True
+        texts.append(h.handle(html))
+    return texts
+
+
+def run(label, convert, pages_by_company, repeat):
+    total_pages = sum(len(pages) for pages in pages_by_company.values())
+    best = float('inf')
+    texts = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        texts = [text for company, pages in pages_by_company.items() for text in convert(company, pages)]
+        best = min(best, time.perf_counter() - start)
+    stored = sum(len(text.encode('utf-8')) for text in texts)
+    print(f"{label:<32} {total_pages / best:10,.1f} pages/s  ({best * 1000:8.1f} ms)  {stored:12,} bytes stored")
+    return stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--html-dir', help="Directory with saved pages, one sub-directory per company")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-pages', type=int, default=5, help="Pages seen before boilerplate is removed")
+    parser.add_argument('--threshold', type=float, default=0.6)
+    args = parser.parse_args()
+
+    pages_by_company = load_pages(args.html_dir)
+    if not pages_by_company:
+        print("No pages found")
+        sys.exit(1)
+    source_bytes = sum(len(html.encode('utf-8')) for pages in pages_by_company.values() for html in pages)
+    print(f"{sum(map(len, pages_by_company.values()))} pages from {len(pages_by_company)} companies, "
+          f"{source_bytes:,} bytes of HTML, lxml available: {HtmlConverter.HAS_LXML}")
+
+    pool = HtmlConverter.Html2TextPool(size=1)
+
+    def pooled(company, pages):
+        return [HtmlConverter.html_to_text(html, pool=pool) for html in pages]
+
+    def pooled_boilerplate(company, pages):
+        # Fresh statistics per company and run, as if each company were crawled for the first time
+        boilerplate = HtmlConverter.BoilerplateFilter(
+            HtmlConverter.InMemoryLineStats(), threshold=args.threshold, min_pages=args.min_pages)
+        return [HtmlConverter.html_to_text(html, pool=pool, boilerplate=boilerplate) for html in pages]
+
+    base = run("new converter, full page", lambda company, pages: baseline(pages), pages_by_company, args.repeat)
+    main_only = run("pool + main content", pooled, pages_by_company, args.repeat)
+    cleaned = run("pool + main content + boilerplate", pooled_boilerplate, pages_by_company, args.repeat)
+    if base:
+        print(f"stored text: {main_only / base:.1%} of baseline with main content, "
+              f"{cleaned / base:.1%} with boilerplate removal")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark of the vectorized metadata merge in SpeechUpdater.
+
+Writes a synthetic archive of N existing rows to a temporary metadata store and
+builds an incoming batch (a tenth of N, at most --batch rows) that mixes new,
+changed and unchanged rows, then times what merge_metadata does with it:
+prepare_new_metadata, the store lookup of the batch URLs and diff_metadata.
+
+    python benchmarks/bench_metadata_merge.py --sizes 10000 100000 1000000 --batch 10000
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.core.Speech.SpeechMetadataStore import SpeechMetadataStore  # noqa: E402
+from src.core.Speech.SpeechUpdater import prepare_new_metadata, diff_metadata  # noqa: E402
+
+
+def synthetic_metadata(n, start=0, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(start, start + n)
+    years = rng.integers(1996, 2025, size=n)
+    dates = (pd.to_datetime(np.char.add(years.astype(str), '-01-01'))
+             + pd.to_timedelta(rng.integers(0, 365, size=n), unit='D'))
+    return pd.DataFrame({
+        'url': [f"https://www.federalreserve.gov/newsevents/speech/files/speaker{i}a.pdf" for i in ids],
+        'year': years,
+        'title': [f"Speech title {i}" for i in ids],
+        'author': [f"Governor {i % 50}" for i in ids],
+        'date': dates.strftime('%Y-%m-%d'),
+        'file_path': [f"{y}/Speech title {i}_{d}.pdf" for i, y, d in zip(ids, years, dates.strftime('%Y-%m-%d'))],
+    })
+
+
+def build_batch(existing_df, new_rows, updated_rows, unchanged_rows, seed=1):
+    rng = np.random.default_rng(seed)
+    sample = existing_df.iloc[rng.choice(len(existing_df), size=updated_rows + unchanged_rows, replace=False)].copy()
+    updated = sample.iloc[:updated_rows].copy()
+    updated['author'] = updated['author'] + ' (updated)'
+    unchanged = sample.iloc[updated_rows:]
+    inserted = synthetic_metadata(new_rows, start=len(existing_df), seed=seed)
+    return pd.concat([inserted, updated, unchanged], ignore_index=True)
+
+
+def run(size, batch, repeat):
+    existing_df = SpeechMetadataStore.normalize(synthetic_metadata(size))
+    batch_size = max(min(size // 10, batch), 1)
+    batch_df = build_batch(existing_df, new_rows=batch_size // 2, updated_rows=batch_size // 10,
+                           unchanged_rows=batch_size - batch_size // 2 - batch_size // 10)
+
+    root = tempfile.mkdtemp(prefix='speech-metadata-')
+    try:
+        store = SpeechMetadataStore(root)
+        store.append(existing_df)
+        timings = []
+        counts = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            new_df = prepare_new_metadata(batch_df)
+            _, _, counts = diff_metadata(store.read(urls=new_df['url']), new_df)
+            timings.append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    best = min(timings)
+    print(f"{size:>9} existing | {len(batch_df):>8} incoming | best {best * 1000:8.1f} ms | "
+          f"{len(batch_df) / best:12,.0f} rows/s | {counts} | {'OK' if best < 1.0 else 'SLOW'}")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--batch', type=int, default=10_000, help="Largest incoming batch")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # One INFO line per appended partition would bury the results
+    logging.getLogger('src.core.Speech.SpeechMetadataStore').setLevel(logging.WARNING)
+    results = [run(size, args.batch, args.repeat) for size in args.sizes]
+    sys.exit(0 if all(best < 1.0 for best in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+End-to-end offline benchmark of the speech pipeline:
+SpeechDownloader -> SpeechUpdater -> PDFHandler -> MongoDbManger, against the local fixture server.
+
+Reports per-stage wall time, throughput, per-item latency percentiles and peak RSS. Uses mongomock
+(mongomock_motor) unless --mongo-uri points at a real mongod.
+
+    python benchmarks/bench_pipeline.py --start-year 2023 --latency-ms 10 --output bench_output.json
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from fixtures.fed_server import FedFixtureServer  # noqa: E402
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def record_latency(func, samples):
+    """
+    Wrap a sync or async function so every call's duration is appended to `samples`.
+    """
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+class StageReport:
+    def __init__(self):
+        self.stages = []
+
+    def run(self, name, func, items, samples):
+        # Imported here: the settings are loaded on the first import of src, after main() set the environment
+        from src.cron.SpeechPipeline import percentile
+
+        start = time.perf_counter()
+        result = func()
+        wall = time.perf_counter() - start
+        count = items() if callable(items) else items
+        self.stages.append({
+            'stage': name,
+            'wall_s': round(wall, 4),
+            'items': count,
+            'items_per_s': round(count / wall, 2) if wall > 0 else 0.0,
+            'p50_ms': round(percentile(samples, 50) * 1000, 2),
+            'p95_ms': round(percentile(samples, 95) * 1000, 2),
+            'p99_ms': round(percentile(samples, 99) * 1000, 2),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+        })
+        return result
+
+    def print(self, total_wall):
+        print(f"{'stage':<12} {'wall s':>8} {'items':>7} {'items/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'peak RSS MB':>12}")
+        for s in self.stages:
+            print(f"{s['stage']:<12} {s['wall_s']:>8.2f} {s['items']:>7} {s['items_per_s']:>9.1f} {s['p50_ms']:>8.1f} "
+                  f"{s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['peak_rss_mb']:>12.1f}")
+        print(f"total wall time: {total_wall:.2f} s")
+
+
+def make_mongo_client(mongo_uri):
+    if mongo_uri:
+        import motor.motor_asyncio
+        return motor.motor_asyncio.AsyncIOMotorClient(mongo_uri)
+    from mongomock_motor import AsyncMongoMockClient
+    return AsyncMongoMockClient()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--start-year', type=int, default=2017)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Artificial per-response server delay")
+    parser.add_argument('--mongo-uri', help="Use a real MongoDB instead of mongomock")
+    parser.add_argument('--workdir', help="Directory for downloaded PDFs and outputs (default: a temp dir)")
+    parser.add_argument('--output', help="Write the stage report as JSON to this file")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='speech-bench-')
+    base_folder = os.path.join(workdir, 'pdfs')
+    output_json = os.path.join(workdir, 'all_metadata_and_text.json')
+    report = StageReport()
+
+    with FedFixtureServer(latency_ms=args.latency_ms) as server:
+        # Settings are loaded once, on the first import, so the environment has to be set first
+        os.environ['FED_BASE_URL'] = server.base_url
+        from src.core.Speech import SpeechDownloader as downloader_module, SpeechParser
+        from src.core.Speech.PdfHanlder import PdfHanlder as pdf_module
+        from src.core.Speech.PdfHanlder.UploadDb import MongoDbManger as mongo_module
+
+        http_samples = []
+        SpeechParser.fetch_html = record_latency(SpeechParser.fetch_html, http_samples)
+        SpeechParser.fetch_once = record_latency(SpeechParser.fetch_once, http_samples)
+
+        total_start = time.perf_counter()
+        downloader = downloader_module.SpeechDownloader(base_folder=base_folder, start_year=args.start_year)
+        report.run('download', downloader.download_speeches_parallel,
+                   lambda: len(downloader.speech_metadata), http_samples)
+
+        merge_samples = []
+        counts = report.run('update', lambda: record_latency(downloader.save_metadata, merge_samples)(),
+                            lambda: len(downloader.speech_metadata), merge_samples)
+
+        extract_samples = []
+        handler = pdf_module.PDFHandler(os.path.join(base_folder, 'speech_metadata'))
+        handler.extract_pdf_metadata = record_latency(handler.extract_pdf_metadata, extract_samples)
+        report.run('extract', lambda: asyncio.run(handler.process_all_pdfs(output_json)),
+                   lambda: len(extract_samples), extract_samples)
+
+        upload_samples = []
+
+        async def upload():
+            db_manager = mongo_module.AsyncMongoDBManager(client=make_mongo_client(args.mongo_uri))
+            db_manager.insert_many_speeches = record_latency(db_manager.insert_many_speeches, upload_samples)
+            await db_manager.create_unique_index()
+            await mongo_module.upload_json_to_mongodb(output_json, db_manager)
+            return await db_manager.collection.count_documents({})
+
+        uploaded = report.run('upload', lambda: asyncio.run(upload()), 0, upload_samples)
+        report.stages[-1]['items'] = uploaded
+        report.stages[-1]['items_per_s'] = round(uploaded / report.stages[-1]['wall_s'], 2) \
+            if report.stages[-1]['wall_s'] else 0.0
+        total_wall = time.perf_counter() - total_start
+
+    print(f"workdir: {workdir}, merge counts: {counts}")
+    report.print(total_wall)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'stages': report.stages, 'total_wall_s': round(total_wall, 4),
+                       'start_year': args.start_year, 'latency_ms': args.latency_ms}, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark of the shared URL seen-set (src/core/Common/SeenUrls.py): memory-mapped Bloom filter size,
+per-check latency for seen and unseen URLs, measured false positive rate and resident memory.
+With --exact the URLs are also written to the SQLite index behind the filter (SeenUrlSet).
+
+    python benchmarks/bench_seen_urls.py --urls 2000000
+"""
+import argparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from src.core.Common.SeenUrls import BloomFilter, SeenUrlSet, normalize_url  # noqa: E402
+
+
+def synthetic_urls(count, offset=0):
+    for i in range(offset, offset + count):
+        yield f"https://investor.example{i % 97}.com/news/{i // 97}/press-release-{i}.htm"
+
+
+def per_call_us(func, items):
+    start = time.perf_counter()
+    hits = sum(1 for item in items if func(item))
+    return (time.perf_counter() - start) / len(items) * 1e6, hits
+
+
+def max_rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--urls', type=int, default=1_000_000, help="Number of URLs to add")
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--probes', type=int, default=100_000, help="Number of seen / unseen URLs to check")
+    parser.add_argument('--exact', action='store_true', help="Also fill the exact SQLite index (slower)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='seen-urls-bench-')
+    try:
+        rss_before = max_rss_mb()
+        bloom = BloomFilter(os.path.join(workdir, 'bench.bloom'), capacity=args.urls, error_rate=args.error_rate)
+        start = time.perf_counter()
+        for url in synthetic_urls(args.urls):
+            bloom.add(normalize_url(url))
+        add_time = time.perf_counter() - start
+        normalize_url.cache_clear()
+        print(f"Bloom filter: {args.urls:,} URLs, {bloom.hashes} hashes, {bloom.size_bytes / 1e6:.2f} MB file, "
+              f"{add_time / args.urls * 1e6:.2f} us per add, max RSS +{max_rss_mb() - rss_before:.1f} MB")
+
+        seen = list(synthetic_urls(args.probes))
+        unseen = list(synthetic_urls(args.probes, offset=args.urls))
+        hit_us, hits = per_call_us(lambda url: normalize_url(url) in bloom, seen)
+        normalize_url.cache_clear()
+        miss_us, false_positives = per_call_us(lambda url: normalize_url(url) in bloom, unseen)
+        print(f"normalize + check seen URL:   {hit_us:.2f} us ({hits:,}/{len(seen):,} found)")
+        print(f"normalize + check unseen URL: {miss_us:.2f} us (false positive rate "
+              f"{false_positives / len(unseen):.3%}, target {args.error_rate:.3%})")
+        keys = [normalize_url(url) for url in unseen]
+        key_us, _ = per_call_us(lambda key: key in bloom, keys)
+        print(f"check normalized key only:    {key_us:.2f} us")
+        bloom.close()
+
+        if args.exact:
+            normalize_url.cache_clear()
+            seen_set = SeenUrlSet(os.path.join(workdir, 'exact'), capacity=args.urls, error_rate=args.error_rate)
+            start = time.perf_counter()
+            batch = []
+            for url in synthetic_urls(args.urls):
+                batch.append(url)
+                if len(batch) == 10_000:
+                    seen_set.add_many(batch)
+                    batch = []
+            seen_set.add_many(batch)
+            print(f"SeenUrlSet: {(time.perf_counter() - start) / args.urls * 1e6:.2f} us per add, "
+                  f"index {os.path.getsize(seen_set.index.path) / 1e6:.1f} MB")
+            normalize_url.cache_clear()
+            hit_us, hits = per_call_us(lambda url: url in seen_set, seen)
+            normalize_url.cache_clear()
+            miss_us, found = per_call_us(lambda url: url in seen_set, unseen)
+            print(f"SeenUrlSet check seen URL:   {hit_us:.2f} us ({hits:,}/{len(seen):,} found)")
+            print(f"SeenUrlSet check unseen URL: {miss_us:.2f} us ({found} wrongly found)")
+            seen_set.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
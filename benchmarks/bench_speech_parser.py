@@ -0,0 +1,92 @@
+"""
+Benchmark of SpeechParser page parsing: lxml fast path vs the BeautifulSoup html.parser baseline,
+inline and in a process pool.
+
+Pages come from --pages-dir (saved *.htm files) or are rendered from the recorded speech metadata.
+
+    python benchmarks/bench_speech_parser.py --processes 4
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+from src.core.Speech import SpeechParser  # noqa: E402
+from fixtures.fed_pages import load_speech_rows, render_speech_page, render_year_index  # noqa: E402
+
+
+def load_pages(pages_dir):
+    """
+    Return (detail_pages, index_pages) as lists of (page_url, html_bytes).
+    """
+    detail_pages, index_pages = [], []
+    if pages_dir:
+        for path in sorted(glob.glob(os.path.join(pages_dir, '**', '*.htm'), recursive=True)):
+            with open(path, 'rb') as f:
+                page = (f"https://www.federalreserve.gov/newsevents/speech/{os.path.basename(path)}", f.read())
+            (index_pages if path.endswith('-speeches.htm') else detail_pages).append(page)
+        return detail_pages, index_pages
+
+    rows = load_speech_rows()
+    for row in rows:
+        detail_pages.append((f"https://www.federalreserve.gov/newsevents/speech/{row['slug']}.htm",
+                             render_speech_page(row).encode('utf-8')))
+    for year in sorted({row['year'] for row in rows}):
+        year_rows = [row for row in rows if row['year'] == year]
+        index_pages.append((f"https://www.federalreserve.gov/newsevents/speech/{year}-speeches.htm",
+                            render_year_index(year, year_rows).encode('utf-8')))
+    return detail_pages, index_pages
+
+
+def _parse_detail(args):
+    return SpeechParser.parse_speech_page(*args)
+
+
+def timed(label, func, pages, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(pages)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<34} {len(pages) / best:10,.0f} pages/s  ({best * 1000:8.1f} ms for {len(pages)} pages)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages-dir', help="Directory with saved speech pages (*.htm)")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    detail_pages, index_pages = load_pages(args.pages_dir)
+    print(f"{len(detail_pages)} detail pages, {len(index_pages)} index pages, lxml available: {SpeechParser.HAS_LXML}")
+
+    baseline = timed("detail pages, bs4 html.parser", lambda pages: [
+        SpeechParser._parse_speech_page_bs4(html, url) for url, html in pages], detail_pages, args.repeat)
+    fast = timed("detail pages, fast path", lambda pages: [
+        SpeechParser.parse_speech_page(html, url) for url, html in pages], detail_pages, args.repeat)
+    with ProcessPoolExecutor(max_workers=args.processes) as executor:
+        timed(f"detail pages, fast path x{args.processes} procs", lambda pages: list(executor.map(
+            _parse_detail, [(html, url) for url, html in pages], chunksize=16)), detail_pages, args.repeat)
+
+    timed("index pages, bs4 html.parser", lambda pages: [
+        SpeechParser._parse_speech_links_bs4(html) for _, html in pages], index_pages, args.repeat)
+    timed("index pages, fast path", lambda pages: [
+        SpeechParser.parse_speech_links(html) for _, html in pages], index_pages, args.repeat)
+
+    if baseline != fast:
+        mismatches = sum(1 for a, b in zip(baseline, fast) if a != b)
+        print(f"WARNING: fast path differs from the baseline on {mismatches} pages")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
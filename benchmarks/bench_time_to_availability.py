@@ -0,0 +1,75 @@
+"""
+Time-to-availability of new speeches in the resident pipeline (src/cron/SpeechPipeline.py), streaming vs batch.
+
+Runs one pipeline cycle per mode against the local fixture server, each into an empty work directory and an
+empty mongomock collection, and reports per speech the time from when its speech page was first listed on an
+index page until its MongoDB insert was acknowledged, i.e. until the API can return it.
+
+    python benchmarks/bench_time_to_availability.py --start-year 2023 --latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from fixtures.fed_server import FedFixtureServer  # noqa: E402
+
+
+def make_mongo_client(mongo_uri):
+    if mongo_uri:
+        import motor.motor_asyncio
+        return motor.motor_asyncio.AsyncIOMotorClient(mongo_uri)
+    from mongomock_motor import AsyncMongoMockClient
+    return AsyncMongoMockClient()
+
+
+def run_mode(pipeline_module, streaming, args):
+    workdir = tempfile.mkdtemp(prefix='speech-tta-')
+    downloader = pipeline_module.downloader_module.SpeechDownloader(base_folder=os.path.join(workdir, 'pdfs'),
+                                                                    start_year=args.start_year)
+    db_manager = pipeline_module.mongo_module.AsyncMongoDBManager(client=make_mongo_client(args.mongo_uri))
+    pipeline = pipeline_module.SpeechPipeline(downloader=downloader, db_manager=db_manager, trigger_file=None,
+                                              streaming=streaming)
+    start = time.perf_counter()
+    asyncio.run(pipeline.run(once=True))
+    wall = time.perf_counter() - start
+    samples = pipeline.availability
+    return {
+        'mode': 'streaming' if streaming else 'batch',
+        'speeches': len(samples),
+        'cycle_s': wall,
+        'first_s': min(samples) if samples else 0.0,
+        'p50_s': pipeline_module.percentile(samples, 50),
+        'p95_s': pipeline_module.percentile(samples, 95),
+        'max_s': max(samples) if samples else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--start-year', type=int, default=2023)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Artificial per-response server delay")
+    parser.add_argument('--mongo-uri', help="Use a real MongoDB instead of mongomock (use a scratch database)")
+    args = parser.parse_args()
+
+    with FedFixtureServer(latency_ms=args.latency_ms) as server:
+        # Settings are loaded once, on the first import, so the environment has to be set first
+        os.environ['FED_BASE_URL'] = server.base_url
+        from src.cron import SpeechPipeline as pipeline_module
+        results = [run_mode(pipeline_module, streaming, args) for streaming in (False, True)]
+
+    print(f"{'mode':<10} {'speeches':>9} {'cycle s':>8} {'first s':>8} {'p50 s':>8} {'p95 s':>8} {'max s':>8}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['speeches']:>9} {r['cycle_s']:>8.2f} {r['first_s']:>8.2f} {r['p50_s']:>8.2f} "
+              f"{r['p95_s']:>8.2f} {r['max_s']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
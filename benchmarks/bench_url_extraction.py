@@ -0,0 +1,108 @@
+"""
+Benchmark of BaseCrawler URL extraction on the saved Firecrawl pages
+(CompanyList/<Company>/data/metaData/*_metaData_*.json): the previous regex scan over
+markdown + HTML vs UrlExtractor (linear scans of the href/src attributes and of the markdown).
+
+    python benchmarks/bench_url_extraction.py --repeat 20
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from urllib.parse import urlparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from src.config import CompanyConfig  # noqa: E402
+from src.core.Company import UrlExtractor  # noqa: E402
+
+# The pattern BaseCrawler used before UrlExtractor
+LEGACY_URL_PATTERN = re.compile(
+    r"https?://"
+    r"(?:[a-zA-Z0-9-]+\.)*"
+    r"[a-zA-Z0-9-]+"
+    r"(?:\.[a-zA-Z]{2,})"
+    r"(?::\d{1,5})?"
+    r"(?:/[^?#\s]*)?"
+    r"(?:\?[^#\s]*)?"
+    r"(?:#[^\s]*)?"
+)
+
+
+def legacy_extract_urls(result):
+    data = (result.get('markdown', "") + " " + result.get('html', "")).strip()
+    cleaned_data = data.replace('\n', ' ').replace('\r', ' ')
+    urls = re.findall(LEGACY_URL_PATTERN, cleaned_data)
+    cleaned_urls = []
+    for url in urls:
+        url = re.split(r'[\\>\s]', url)[0]
+        cleaned_url = url.rstrip('.,);\'"!?')
+        if urlparse(cleaned_url).scheme in ['http', 'https']:
+            cleaned_urls.append(cleaned_url)
+    return cleaned_urls
+
+
+def extract_urls(result):
+    page_url = (result.get('metadata') or {}).get('sourceURL')
+    return UrlExtractor.extract_urls(html=result.get('html'), markdown=result.get('markdown'), base_url=page_url)
+
+
+def extract_urls_cold(result):
+    # The first page of a company: no normalized links cached yet
+    UrlExtractor.normalize_url.cache_clear()
+    return extract_urls(result)
+
+
+def load_pages():
+    pages = []
+    pattern = os.path.join(CompanyConfig.COMPANY_LIST_DIR, '*', 'data', 'metaData', '*_metaData_*.json')
+    for path in sorted(glob.glob(pattern)):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), json.load(f)))
+    return pages
+
+
+def timed(func, result, repeat):
+    best = float('inf')
+    urls = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        urls = func(result)
+        best = min(best, time.perf_counter() - start)
+    return best, urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    pages = load_pages()
+    if not pages:
+        print("No saved Firecrawl pages found")
+        sys.exit(1)
+    print("'warm' reuses the normalized links of an earlier page, as later pages of the same company do")
+    print(f"{'page':<34} {'bytes':>10} {'legacy ms':>10} {'urls':>6} {'unique':>7} "
+          f"{'cold ms':>8} {'warm ms':>8} {'urls':>6}")
+    totals = [0.0, 0.0, 0.0]
+    for name, result in pages:
+        size = len((result.get('markdown') or '').encode('utf-8')) + len((result.get('html') or '').encode('utf-8'))
+        legacy_time, legacy_urls = timed(legacy_extract_urls, result, args.repeat)
+        cold_time, new_urls = timed(extract_urls_cold, result, args.repeat)
+        warm_time, _ = timed(extract_urls, result, args.repeat)
+        totals[0] += legacy_time
+        totals[1] += cold_time
+        totals[2] += warm_time
+        print(f"{name:<34} {size:>10,} {legacy_time * 1000:>10.2f} {len(legacy_urls):>6} "
+              f"{len(set(legacy_urls)):>7} {cold_time * 1000:>8.2f} {warm_time * 1000:>8.2f} {len(new_urls):>6}")
+    print(f"{'total':<34} {'':>10} {totals[0] * 1000:>10.2f} {'':>6} {'':>7} "
+          f"{totals[1] * 1000:>8.2f} {totals[2] * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Speech crawl split between several downloaders through a shared lease queue (WORK_QUEUE=mongo).
+
+Each run starts N downloaders, each with its own empty work directory, on one CrawlFrontier.SharedFrontier,
+crawls the fixture server once and stores the metadata of each downloader. The downloaders run as threads of this
+process on a MemoryLeaseQueue, or on a MongoLeaseQueue in a scratch collection with --mongo-uri. Reports per N the wall time, the speech pages per
+downloader, the PDFs saved, the PDF requests that went to an URL fetched before (there should be none) and the
+speech pages that failed; exits non-zero if any page failed.
+
+--abandon K first lets a downloader that "dies" claim K year index pages without ever completing them: the
+others claim them again once its leases expire after --lease-seconds.
+
+    python benchmarks/bench_work_sharing.py --nodes 1 2 4 --latency-ms 20 --abandon 2
+"""
+import argparse
+import collections
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from fixtures.fed_server import FedFixtureServer  # noqa: E402
+
+
+def make_queue(args, run, owner):
+    from src.core.Common import LeaseQueue
+
+    if not args.mongo_uri:
+        return LeaseQueue.MemoryLeaseQueue('speech_crawl', lease_seconds=args.lease_seconds, owner=owner)
+    from pymongo import MongoClient
+    collection = MongoClient(args.mongo_uri)['bench_work_sharing'][f'crawl_queue_{run}']
+    return LeaseQueue.MongoLeaseQueue(collection, 'speech_crawl', lease_seconds=args.lease_seconds, owner=owner)
+
+
+def run_nodes(nodes, args, run):
+    from src.core.Speech import CrawlFrontier, SpeechDownloader, SpeechParser
+
+    queue = make_queue(args, run, 'bench')
+    if args.mongo_uri:
+        queue.collection.drop()
+    if args.abandon:
+        # A downloader that dies right after claiming some index pages: its leases are never renewed
+        dead = make_queue(args, run, 'dead') if args.mongo_uri else queue
+        for year in range(args.start_year, time.localtime().tm_year + 1):
+            CrawlFrontier.queue_item(dead, CrawlFrontier.BACKFILL, CrawlFrontier.INDEX, year,
+                                     SpeechParser.year_index_url(year))
+        for _ in range(args.abandon):
+            dead.claim()
+
+    pages = collections.Counter()
+    failed = []
+    process_page = SpeechDownloader.SpeechDownloader._process_speech_page
+
+    def counting_page(self, page_url, year, year_folder, seen_at=None):
+        pages[self.base_folder] += 1
+        processed = process_page(self, page_url, year, year_folder, seen_at)
+        if processed is False:
+            failed.append(page_url)
+        return processed
+
+    downloaders = [SpeechDownloader.SpeechDownloader(base_folder=tempfile.mkdtemp(prefix='speech-share-'),
+                                                     start_year=args.start_year, work_queue=queue)
+                   for _ in range(nodes)]
+    SpeechDownloader.SpeechDownloader._process_speech_page = counting_page
+    start = time.perf_counter()
+    try:
+        threads = [threading.Thread(target=downloader.download_speeches_parallel) for downloader in downloaders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        SpeechDownloader.SpeechDownloader._process_speech_page = process_page
+    wall = time.perf_counter() - start
+    saved = sum(len(downloader.speech_metadata) for downloader in downloaders)
+    # Speech pages stay staged in the queue until their downloader stored the metadata
+    for downloader in downloaders:
+        downloader.save_metadata()
+    return wall, [pages[downloader.base_folder] for downloader in downloaders], saved, failed, queue.outstanding()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, nargs='+', default=[1, 2, 4], help="Downloaders per run")
+    parser.add_argument('--start-year', type=int, default=2022)
+    parser.add_argument('--latency-ms', type=float, default=20, help="Artificial per-response server delay")
+    parser.add_argument('--workers', type=int, default=3, help="Download threads per downloader (MAX_WORKERS)")
+    parser.add_argument('--abandon', type=int, default=0, help="Index pages claimed by a downloader that dies")
+    parser.add_argument('--lease-seconds', type=int, default=10)
+    parser.add_argument('--mongo-uri', help="Share the queue through a real MongoDB (database bench_work_sharing)")
+    args = parser.parse_args()
+
+    with FedFixtureServer(latency_ms=args.latency_ms) as server:
+        # Settings are loaded once, on the first import, so the environment has to be set first
+        os.environ['FED_BASE_URL'] = server.base_url
+        os.environ['MAX_WORKERS'] = str(args.workers)
+        from src.core.Speech import SpeechParser
+
+        fetches = collections.Counter()
+        fetch_once = SpeechParser.fetch_once
+
+        def counting_fetch(url):
+            fetches[url] += 1
+            return fetch_once(url)
+
+        SpeechParser.fetch_once = counting_fetch
+        results = []
+        for run, nodes in enumerate(args.nodes):
+            fetches.clear()
+            wall, pages, saved, failed, outstanding = run_nodes(nodes, args, run)
+            duplicates = sum(count - 1 for count in fetches.values())
+            results.append((nodes, wall, pages, len(fetches), saved, duplicates, failed, outstanding))
+
+    print(f"{'nodes':>5} {'wall s':>7} {'pages/s':>8} {'PDF URLs':>9} {'saved':>6} {'refetched':>10} "
+          f"{'failed':>7} {'left':>5}  pages per node")
+    for nodes, wall, pages, urls, saved, duplicates, failed, outstanding in results:
+        print(f"{nodes:>5} {wall:>7.2f} {sum(pages) / wall:>8.1f} {urls:>9} {saved:>6} {duplicates:>10} "
+              f"{len(failed):>7} {outstanding:>5}  {' '.join(map(str, pages))}")
+    failed = [url for result in results for url in result[6]]
+    if failed:
+        print(f"{len(failed)} speech pages failed, e.g. {failed[0]}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
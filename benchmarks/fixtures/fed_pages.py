@@ -0,0 +1,114 @@
+"""
+Recorded-layout fixture pages for the federalreserve.gov speech pages.
+
+Pages are rendered from the rows of `src/data/pdfs/speech_metadata.csv` using the same markup the
+parser relies on (`h3.title em`, `p.speaker`, `p.article__time`, PDF anchors) plus the site's
+navigation and footer chrome so that page weight is close to the real site.
+"""
+import csv
+import html
+import os
+import posixpath
+from datetime import datetime
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_METADATA_CSV = os.path.join(REPO_ROOT, 'src', 'data', 'pdfs', 'speech_metadata.csv')
+
+_NAV_SECTIONS = ['aboutthefed', 'newsevents', 'monetarypolicy', 'supervisionreg', 'paymentsystems',
+                 'econres', 'data', 'consumerscommunities', 'publications', 'faqs']
+
+
+def load_speech_rows(metadata_csv=DEFAULT_METADATA_CSV):
+    """
+    Load the recorded speeches and derive the page slug (e.g. powell20170107a) for each of them.
+    """
+    rows = []
+    with open(metadata_csv, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            row['slug'] = posixpath.basename(row['url']).rsplit('.pdf', 1)[0]
+            row['file_path'] = row['file_path'].replace('\\', '/')
+            rows.append(row)
+    return rows
+
+
+def _chrome_header():
+    links = []
+    for section in _NAV_SECTIONS:
+        for i in range(15):
+            links.append(f'<li><a href="/{section}/page{i}.htm">{section.title()} topic {i}</a></li>')
+    return ('<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>Federal Reserve Board</title>'
+            '<link rel="stylesheet" href="/css/main.css"><script src="/js/main.js"></script></head><body>'
+            '<header class="header"><nav id="navbar" class="navbar"><ul class="nav">' + ''.join(links) +
+            '</ul></nav></header><div id="content" class="container container__main">')
+
+
+def _chrome_footer():
+    links = ''.join(f'<li><a class="footer-link" href="/{s}.htm">{s.title()}</a></li>' for s in _NAV_SECTIONS)
+    return ('</div><footer class="footer"><ul>' + links +
+            '</ul><p>Last Update: October 15, 2024</p></footer></body></html>')
+
+
+def _display_date(iso_date):
+    return datetime.strptime(iso_date, '%Y-%m-%d').strftime('%B %d, %Y')
+
+
+def render_year_index(year, rows):
+    """
+    Render `{year}-speeches.htm` listing the speeches of that year.
+    """
+    items = []
+    for row in rows:
+        slug = row['slug']
+        items.append(
+            '<div class="row"><div class="col-xs-3 col-md-2 eventlist__time"><time>'
+            f'{_display_date(row["date"]).replace(",", "")}</time></div>'
+            '<div class="col-xs-9 col-md-10 eventlist__event">'
+            f'<p><a href="/newsevents/speech/{slug}.htm"><em>{html.escape(row["title"])}</em></a></p>'
+            f'<p class="news__speaker">{html.escape(row["author"])}</p>'
+            f'<p><a class="watchLive" href="/newsevents/speech/{slug}.htm#video">Watch Live</a></p>'
+            '</div></div>'
+        )
+    return (_chrome_header() + f'<h3 class="title">{year} Speeches</h3><div id="article" class="eventlist">' +
+            ''.join(items) + '</div>' + _chrome_footer())
+
+
+def render_speech_page(row, paragraphs=30):
+    """
+    Render the detail page of one speech, linking its PDF under /newsevents/speech/files/.
+    """
+    slug = row['slug']
+    body = ''.join(
+        f'<p>Paragraph {i} of the remarks on {html.escape(row["title"])}. Monetary policy, financial stability '
+        'and the outlook for the economy are discussed at length in this paragraph of the speech.</p>'
+        for i in range(paragraphs)
+    )
+    return (
+        _chrome_header() +
+        '<div id="article"><div class="heading col-xs-12 col-sm-8 col-md-8">'
+        f'<p class="article__time">{_display_date(row["date"])}</p>'
+        f'<h3 class="title"><em>{html.escape(row["title"])}</em></h3>'
+        f'<p class="speaker">{html.escape(row["author"])}</p>'
+        '<p class="location">At a conference, Washington, D.C.</p></div>'
+        '<div class="col-xs-12 col-sm-8 col-md-8">'
+        f'<p><a href="/newsevents/speech/files/{slug}.pdf">PDF</a></p>'
+        f'<p><a href="/newsevents/speech/{slug}.htm#video">Watch Live</a></p>'
+        f'{body}<p><a href="/newsevents/speech/files/other20990101a.pdf">Related publication</a></p></div></div>' +
+        _chrome_footer()
+    )
+
+
+def save_fixture_pages(output_dir, rows):
+    """
+    Write the rendered index and detail pages to disk, one file per URL path.
+    """
+    years = sorted({row['year'] for row in rows})
+    speech_dir = os.path.join(output_dir, 'newsevents', 'speech')
+    os.makedirs(speech_dir, exist_ok=True)
+    for year in years:
+        year_rows = [row for row in rows if row['year'] == year]
+        with open(os.path.join(speech_dir, f'{year}-speeches.htm'), 'w', encoding='utf-8') as f:
+            f.write(render_year_index(year, year_rows))
+    for row in rows:
+        with open(os.path.join(speech_dir, f"{row['slug']}.htm"), 'w', encoding='utf-8') as f:
+            f.write(render_speech_page(row))
+    return speech_dir
@@ -0,0 +1,135 @@
+"""
+Local HTTP stand-in for the federalreserve.gov speech pages.
+
+Serves `/newsevents/speech/{year}-speeches.htm`, the speech detail pages and
+`/newsevents/speech/files/{slug}.pdf` (the PDFs recorded under `src/data/pdfs`).
+
+    python benchmarks/fixtures/fed_server.py --port 8808 --latency-ms 20
+    FED_BASE_URL=http://127.0.0.1:8808 python src/core/Speech/SpeechDownloader.py
+"""
+import argparse
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures.fed_pages import REPO_ROOT, load_speech_rows, render_speech_page, render_year_index  # noqa: E402
+
+PDF_ROOT = os.path.join(REPO_ROOT, 'src', 'data', 'pdfs')
+
+_YEAR_INDEX = re.compile(r'^/newsevents/speech/(\d{4})-speeches\.htm$')
+_SPEECH_PAGE = re.compile(r'^/newsevents/speech/([a-z]+\d{8}[a-z0-9]*)\.htm$')
+_SPEECH_PDF = re.compile(r'^/newsevents/speech/files/([a-z]+\d{8}[a-z0-9]*)\.pdf$')
+
+
+class FedFixtureSite:
+    """
+    Pre-rendered pages and PDF paths for the recorded speeches.
+    """
+
+    def __init__(self, rows=None, pdf_root=PDF_ROOT):
+        rows = rows if rows is not None else load_speech_rows()
+        self.year_pages = {}
+        self.speech_pages = {}
+        self.pdf_paths = {}
+        for year in sorted({row['year'] for row in rows}):
+            year_rows = [row for row in rows if row['year'] == year]
+            self.year_pages[year] = render_year_index(year, year_rows).encode('utf-8')
+        for row in rows:
+            self.speech_pages[row['slug']] = render_speech_page(row).encode('utf-8')
+            pdf_path = os.path.join(pdf_root, *row['file_path'].split('/'))
+            if os.path.exists(pdf_path):
+                self.pdf_paths[row['slug']] = pdf_path
+
+    def resolve(self, path):
+        """
+        Return (status, content_type, body) for a request path.
+        """
+        path = path.split('?', 1)[0].split('#', 1)[0]
+        match = _YEAR_INDEX.match(path)
+        if match:
+            # Years without recorded speeches still get an (empty) index page, like the real site
+            body = self.year_pages.get(match.group(1)) or render_year_index(match.group(1), []).encode('utf-8')
+            return 200, 'text/html; charset=utf-8', body
+        match = _SPEECH_PAGE.match(path)
+        if match and match.group(1) in self.speech_pages:
+            return 200, 'text/html; charset=utf-8', self.speech_pages[match.group(1)]
+        match = _SPEECH_PDF.match(path)
+        if match and match.group(1) in self.pdf_paths:
+            with open(self.pdf_paths[match.group(1)], 'rb') as f:
+                return 200, 'application/pdf', f.read()
+        return 404, 'text/html; charset=utf-8', b'<html><body>Not Found</body></html>'
+
+
+def make_handler(site, latency=0.0):
+    class FedFixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _respond(self, include_body):
+            if latency:
+                time.sleep(latency)
+            status, content_type, body = site.resolve(self.path)
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if include_body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            self._respond(include_body=True)
+
+        def do_HEAD(self):
+            self._respond(include_body=False)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FedFixtureHandler
+
+
+class FedFixtureServer:
+    """
+    Threaded fixture server usable as a context manager; `base_url` is set once started.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0, site=None):
+        self.site = site or FedFixtureSite()
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.site, latency_ms / 1000.0))
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fed-fixture-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8808)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Artificial delay added to every response")
+    args = parser.parse_args()
+
+    server = FedFixtureServer(args.host, args.port, args.latency_ms)
+    print(f"Serving {len(server.site.speech_pages)} speeches ({len(server.site.pdf_paths)} PDFs) at {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
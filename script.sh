@@ -9,13 +9,8 @@ VENV_PATH="$SCRIPT_DIR/venv/Scripts"
 # Add the virtual environment's Python path to PATH
 export PATH="$VENV_PATH:$PATH"
 
-# Infinite loop, runs every 15 minutes
-while true; do
-    # Execute Python scripts
-    python src/core/Speech/SpeechDownloader.py
-    python src/core/Speech/PdfHanlder/PdfHanlder.py
-    python src/core/Speech/PdfHanlder/UploadDb/MongoDbManger.py
+cd "$SCRIPT_DIR"
 
-    # Sleep for 15 minutes (15 minutes = 900 seconds)
-    sleep 900
-done
+# One resident process runs download -> extract -> upload every PIPELINE_INTERVAL seconds (15 minutes by default).
+# Start a cycle early with: touch src/data/pipeline.trigger (or kill -USR1 <pid>)
+exec python -m src.cron.SpeechPipeline "$@"
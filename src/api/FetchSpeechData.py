@@ -1,26 +1,13 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import StreamingResponse
 from io import BytesIO
-from pypdf import PdfWriter
 import motor.motor_asyncio
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-import os
-import importlib.util
-
-# Dynamically import config.py
-def dynamic_import(module_name, module_path):
-    spec = importlib.util.spec_from_file_location(module_name, module_path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
-
-# Import configuration from config.py
-current_script_dir = os.path.dirname(os.path.abspath(__file__))
-config_module_path = os.path.abspath(
-    os.path.join(current_script_dir, '..', '..', 'src', 'config', 'config.py')
-)
-config = dynamic_import("config", config_module_path)
+
+from src.config import config
+from src.core.Common import LogSetup, Metrics, Profiling
+
+logger = LogSetup.get_logger('api')
+QUERY_SECONDS = Metrics.histogram('mongo_query_seconds', "Latency of MongoDB queries made by the API", ('operation',))
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -36,18 +23,21 @@ class AsyncMongoDBManager:
             self.db = self.client[database_name]
             self.collection = self.db[collection_name]
         except Exception as e:
-            print(f"Failed to connect to MongoDB: {str(e)}")
+            logger.error(f"Failed to connect to MongoDB: {e}")
             self.client = None
 
+    @Profiling.span()
     async def find_document_by_title(self, title):
         if not self.client:
             return None
-        return await self.collection.find_one({"title": title})
+        with QUERY_SECONDS.time(operation='find_one'):
+            return await self.collection.find_one({"title": title})
 
 db_manager = AsyncMongoDBManager()
 
 speech_app = FastAPI()
 @speech_app.get("/get_pdf_by_title/")
+@Profiling.span()
 async def get_pdf_by_title(title: str):
     title = title.strip()
 
@@ -62,6 +52,10 @@ async def get_pdf_by_title(title: str):
     if not pages:
         raise HTTPException(status_code=404, detail="No pages found in the document")
 
+    # ReportLab is only needed to render a found document, so it is not imported at API startup
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+
     # Create PDF in-memory using BytesIO
     buffer = BytesIO()
 
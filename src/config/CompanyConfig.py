@@ -0,0 +1,42 @@
+# Company crawler settings as module constants. The values come from the settings object of the process
+# (src/config/settings.py), which reads the environment and the .env file once and validates them.
+import os
+
+from src.config.settings import get_settings
+
+_settings = get_settings()
+
+# Firecrawl API key used by the company crawlers
+FIRECRAWL_API_KEY = _settings.firecrawl_api_key
+
+# Log file shared by all company crawlers (records carry a company field), next to the speech log in src/log
+LOG_FILE = _settings.company_log_file
+
+# Company data directory (CompanyList/{company}/data)
+COMPANY_LIST_DIR = _settings.company_list_dir
+# DATA_DIR, if set, replaces CompanyList/{company}/data for every company
+DATA_DIR = _settings.company_data_dir
+
+
+def company_data_dir(company_name):
+    """Data directory of a company (metaData, html, pdf, error, ...): DATA_DIR or CompanyList/{company}/data."""
+    return DATA_DIR or os.path.join(COMPANY_LIST_DIR, company_name, 'data')
+
+
+# Local caches shared by the company crawlers
+CACHE_DIR = _settings.cache_dir
+FILE_TYPE_CACHE_PATH = _settings.file_type_cache_path
+FILE_TYPE_CACHE_TTL = _settings.file_type_cache_ttl  # Seconds a detected type stays valid
+FIRECRAWL_CACHE_DIR = _settings.firecrawl_cache_dir  # Firecrawl results, one directory per day
+SEEN_URLS_DIR = _settings.seen_urls_dir  # Bloom filter + SQLite sets of URLs already processed
+
+# Crawler controller concurrency
+CONTROLLER_MAX_WORKERS = _settings.controller_max_workers  # Total URLs processed at once
+PER_COMPANY_CONCURRENCY = _settings.per_company_concurrency  # URLs of one company processed at once
+PER_HOST_CONCURRENCY = _settings.per_host_concurrency  # Requests to one host in flight at once
+PROGRESS_INTERVAL = _settings.progress_interval  # Seconds between progress reports
+
+# Multi-page Firecrawl crawl (BaseCrawler.crawl)
+CRAWL_MAX_WORKERS = _settings.crawl_max_workers  # Firecrawl scrapes in flight at once
+CRAWL_MAX_PAGES = _settings.crawl_max_pages  # Upper bound on pages scraped per crawl
+COMPANY_CRAWLER_WORKERS = _settings.company_crawler_workers  # Companies crawled at once (CompanyIR)
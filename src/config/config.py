@@ -1,33 +1,59 @@
+# Speech pipeline settings as module constants. The values come from the settings object of the process
+# (src/config/settings.py), which reads the environment and the .env file once and validates them.
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from a .env file
-load_dotenv()  # This will read the .env file and load the variables into the environment
+from src.config.settings import get_settings
 
-# Function to get environment variable or return a default value
-def get_env_variable(var_name, default_value=None):
-    return os.environ.get(var_name, default_value)
+_settings = get_settings()
 
 # Logging configuration
-LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'log')  # Create 'log' directory inside src
-LOG_FILE = os.path.join(LOG_DIR, 'speech_downloader.log')  # Path to the log file
-LOG_MAX_BYTES = 5 * 1024 * 1024  # 5 MB per log file
-LOG_BACKUP_COUNT = 3  # Keep 3 backups
+LOG_DIR = _settings.log_dir  # src/log
+LOG_FILE = _settings.speech_log_file  # Path to the log file
+LOG_MAX_BYTES = _settings.log_max_bytes  # 5 MB per log file
+LOG_BACKUP_COUNT = _settings.log_backup_count  # Keep 3 backups
 
 # Database configuration
-MONGO_URI = get_env_variable("MONGO_URI", "mongodb://localhost:27017/")
-DATABASE_NAME = get_env_variable("DATABASE_NAME", "USA_FED")
-COLLECTION_NAME = get_env_variable("COLLECTION_NAME", "speeches")
-
-# Base directory configuration
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-# BASE_DIR will now point to the core directory, 3 levels up from the current file's location
+MONGO_URI = _settings.mongo_uri
+DATABASE_NAME = _settings.database_name
+COLLECTION_NAME = _settings.collection_name
 
 # Data directories
-DATA_DIR = os.path.join(BASE_DIR, 'data')  # Point to \task\src\core\Speech\data
-PDF_DIR = os.path.join(DATA_DIR, 'pdfs')  # Create the 'pdfs' directory inside the data folder
+DATA_DIR = _settings.data_dir  # src/data
+PDF_DIR = _settings.pdf_dir  # src/data/pdfs
+METADATA_STORE_DIR = os.path.join(PDF_DIR, 'speech_metadata')  # Parquet metadata store written by SpeechDownloader
+EXTRACTED_FILE = _settings.extracted_file  # src/data/all_metadata_and_text.json, written by speech-extract
 
 # Download configuration
-START_YEAR = 2017
-MAX_WORKERS = 5
-
+FED_BASE_URL = _settings.fed_base_url  # Site root, a local mirror in benchmarks
+START_YEAR = _settings.start_year
+MAX_WORKERS = _settings.max_workers
+FRESH_RESERVED_WORKERS = _settings.fresh_reserved_workers  # Download threads the backfill of past years leaves free
+PARSE_PROCESSES = _settings.parse_processes  # 0 parses HTML in the download threads
+# Retry queue of failed PDF downloads: seconds before the first retry (doubled per attempt up to the max) and
+# attempts before a download becomes a dead letter
+RETRY_BASE_DELAY = _settings.retry_base_delay
+RETRY_MAX_DELAY = _settings.retry_max_delay
+RETRY_MAX_ATTEMPTS = _settings.retry_max_attempts
+# Crawl frontier shared between downloaders: 'local' or 'mongo' (a lease queue in DATABASE_NAME)
+WORK_QUEUE = _settings.work_queue
+WORK_QUEUE_COLLECTION = _settings.work_queue_collection
+WORK_LEASE_SECONDS = _settings.work_lease_seconds  # Claims of a downloader that stops renewing them expire after it
+WORK_DONE_TTL = _settings.work_done_ttl  # Seconds finished items stay in the shared queue (0: forever)
+NODE_ID = _settings.node_id  # Empty: host:pid
+
+# Metadata backup configuration
+BACKUP_SNAPSHOT_EVERY = _settings.backup_snapshot_every  # Full snapshot after this many changelogs (one day at a 15 minute cycle)
+BACKUP_KEEP_SNAPSHOTS = _settings.backup_keep_snapshots  # Number of full snapshots to retain
+
+
+# Resident pipeline (src/cron/SpeechPipeline.py)
+PIPELINE_INTERVAL = _settings.pipeline_interval  # Seconds between scheduled cycles
+PIPELINE_QUEUE_SIZE = _settings.pipeline_queue_size  # Bound of the queues between stages
+PIPELINE_EXTRACT_WORKERS = _settings.pipeline_extract_workers  # PDFs extracted at once
+PIPELINE_UPLOAD_BATCH = _settings.pipeline_upload_batch  # Documents per MongoDB insert
+# True: each PDF is extracted and uploaded as soon as it is saved; False: after the download stage of a cycle
+PIPELINE_STREAMING = _settings.pipeline_streaming
+# Seconds between fast-lane polls of the current year's index page (0 disables them)
+PIPELINE_FRESH_INTERVAL = _settings.pipeline_fresh_interval
+# Creating this file (or sending SIGUSR1) starts a cycle right away
+PIPELINE_TRIGGER_FILE = _settings.pipeline_trigger_file
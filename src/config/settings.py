@@ -0,0 +1,212 @@
+"""
+Typed settings of the speech pipeline, the company crawlers and the API, loaded and validated once per process.
+
+get_settings() loads the .env file into the environment (variables already set win), reads every field from its
+environment variable, checks the values and caches the result, so every module of a process sees the same object:
+
+    from src.config.settings import get_settings
+    settings = get_settings()
+    settings.pipeline_interval
+
+config.py (speech) and CompanyConfig.py (company) expose the same values as module constants. A field is read
+from the environment variable named in its metadata (by default its upper-case name); fields without a default
+in the environment keep the default below. Invalid values raise SettingsError listing all of them.
+"""
+import dataclasses
+import functools
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.dirname(SRC_DIR)
+
+
+class SettingsError(ValueError):
+    """One or more settings have an invalid value."""
+
+
+def _env(name=None, minimum=None, path=False):
+    """Field metadata: environment variable (default: the field name in upper case), lower bound, path flag."""
+    return {'env': name, 'minimum': minimum, 'path': path}
+
+
+@dataclass(frozen=True)
+class Settings:
+    # Logging (speech; the company crawlers log to company_log_file)
+    log_dir: str = field(default=os.path.join(SRC_DIR, 'log'), metadata=_env(path=True))
+    speech_log_file: str = field(default='', metadata=_env('SPEECH_LOG_FILE', path=True))  # Default: log_dir
+    log_max_bytes: int = field(default=5 * 1024 * 1024, metadata=_env(minimum=1024))  # Per log file
+    log_backup_count: int = field(default=3, metadata=_env(minimum=0))
+    # Every process (see LogSetup): json or text lines, root level, 1 in N sampled records kept, field length cap
+    log_format: str = field(default='json', metadata=_env())
+    log_level: str = field(default='INFO', metadata=_env())
+    log_sample_every: int = field(default=20, metadata=_env(minimum=1))
+    log_max_field_chars: int = field(default=2000, metadata=_env(minimum=0))  # 0 keeps fields whole
+
+    # Profiling (see Profiling): span timing per run, optionally with a cprofile or pyinstrument capture
+    profile: bool = field(default=False, metadata=_env())
+    profile_capture: str = field(default='', metadata=_env())
+    profile_dir: str = field(default='', metadata=_env(path=True))  # Default: data_dir/profiles
+    profile_top: int = field(default=25, metadata=_env(minimum=1))  # Rows per table in a report
+    metrics_dir: str = field(default='', metadata=_env(path=True))  # .prom files of the batch stages; data_dir/metrics
+
+    # Database
+    mongo_uri: str = field(default='mongodb://localhost:27017/', repr=False, metadata=_env())  # May hold credentials
+    database_name: str = field(default='USA_FED', metadata=_env())
+    collection_name: str = field(default='speeches', metadata=_env())
+
+    # Data directories
+    data_dir: str = field(default=os.path.join(SRC_DIR, 'data'), metadata=_env('SPEECH_DATA_DIR', path=True))
+    pdf_dir: str = field(default='', metadata=_env(path=True))  # Default: data_dir/pdfs
+    # Text extracted by speech-extract and uploaded by speech-upload
+    extracted_file: str = field(default='', metadata=_env(path=True))  # Default: data_dir/all_metadata_and_text.json
+
+    # Download
+    fed_base_url: str = field(default='https://www.federalreserve.gov', metadata=_env())  # A local mirror in benchmarks
+    start_year: int = field(default=2017, metadata=_env(minimum=1996))  # First year of speeches on the site
+    max_workers: int = field(default=5, metadata=_env(minimum=1))
+    # Download threads kept free of historical backfill for the current year's pages (see CrawlFrontier)
+    fresh_reserved_workers: int = field(default=1, metadata=_env(minimum=0))
+    parse_processes: int = field(default=0, metadata=_env(minimum=0))  # 0 parses HTML in the download threads
+    # Failed PDF downloads (see RetryQueue): first retry delay, doubled per attempt up to the max, then dead letter
+    retry_base_delay: int = field(default=60, metadata=_env(minimum=1))
+    retry_max_delay: int = field(default=6 * 3600, metadata=_env(minimum=1))
+    retry_max_attempts: int = field(default=8, metadata=_env(minimum=1))
+    # Crawl frontier: 'local' to this process, or 'mongo' to share it with the downloaders of other processes and
+    # hosts through a lease queue in work_queue_collection (see CrawlFrontier.SharedFrontier)
+    work_queue: str = field(default='local', metadata=_env())
+    work_queue_collection: str = field(default='crawl_queue', metadata=_env())
+    work_lease_seconds: int = field(default=300, metadata=_env(minimum=10))  # Claims not renewed expire after it
+    # Seconds MongoDB keeps a finished page before deleting it (0: forever). Longer than a year, so the pages
+    # listed on the current year's index, which every crawl fetches again, are not queued a second time
+    work_done_ttl: int = field(default=400 * 24 * 3600, metadata=_env(minimum=0))
+    node_id: str = field(default='', metadata=_env())  # Name of this downloader on its leases; default: host:pid
+
+    # Metadata backup
+    backup_snapshot_every: int = field(default=96, metadata=_env(minimum=1))  # Changelogs per full snapshot
+    backup_keep_snapshots: int = field(default=7, metadata=_env(minimum=1))
+
+    # Resident pipeline (src/cron/SpeechPipeline.py)
+    pipeline_interval: int = field(default=900, metadata=_env(minimum=1))  # Seconds between scheduled cycles
+    pipeline_queue_size: int = field(default=32, metadata=_env(minimum=1))  # Bound of the queues between stages
+    pipeline_extract_workers: int = field(default=2, metadata=_env(minimum=1))  # PDFs extracted at once
+    pipeline_upload_batch: int = field(default=50, metadata=_env(minimum=1))  # Documents per MongoDB insert
+    # True: each PDF is extracted and uploaded as soon as it is saved; False: after the download stage of a cycle
+    pipeline_streaming: bool = field(default=True, metadata=_env())
+    # Seconds between fast-lane polls of the current year's index page; 0 disables them
+    pipeline_fresh_interval: int = field(default=60, metadata=_env(minimum=0))
+    # Creating this file (or sending SIGUSR1) starts a cycle right away
+    pipeline_trigger_file: str = field(default='', metadata=_env(path=True))  # Default: data_dir/pipeline.trigger
+
+    # Company crawlers
+    firecrawl_api_key: Optional[str] = field(default=None, repr=False, metadata=_env())
+    company_log_file: str = field(default='', metadata=_env(path=True))  # Default: log_dir/company_crawlers.log
+    company_list_dir: str = field(default=os.path.join(SRC_DIR, 'core', 'Company', 'CompanyList'),
+                                  metadata=_env(path=True))
+    company_data_dir: Optional[str] = field(default=None, metadata=_env('DATA_DIR', path=True))  # One dir for all
+    cache_dir: str = field(default='', metadata=_env(path=True))  # Default: data_dir/cache
+    file_type_cache_ttl: int = field(default=7 * 24 * 3600, metadata=_env(minimum=0))  # Seconds a type stays valid
+    controller_max_workers: int = field(default=16, metadata=_env(minimum=1))  # Total URLs processed at once
+    per_company_concurrency: int = field(default=8, metadata=_env(minimum=1))  # URLs of one company at once
+    per_host_concurrency: int = field(default=4, metadata=_env(minimum=1))  # Requests to one host in flight
+    progress_interval: int = field(default=5, metadata=_env(minimum=1))  # Seconds between progress reports
+    crawl_max_workers: int = field(default=5, metadata=_env(minimum=1))  # Firecrawl scrapes in flight at once
+    crawl_max_pages: int = field(default=50, metadata=_env(minimum=1))  # Upper bound on pages per crawl
+    company_crawler_workers: int = field(default=4, metadata=_env(minimum=1))  # Companies crawled at once
+
+    def __post_init__(self):
+        # Paths left empty default to a place under another setting
+        derived = {
+            'speech_log_file': os.path.join(self.log_dir, 'speech_downloader.log'),
+            'company_log_file': os.path.join(self.log_dir, 'company_crawlers.log'),
+            'pdf_dir': os.path.join(self.data_dir, 'pdfs'),
+            'pipeline_trigger_file': os.path.join(self.data_dir, 'pipeline.trigger'),
+            'extracted_file': os.path.join(self.data_dir, 'all_metadata_and_text.json'),
+            'cache_dir': os.path.join(self.data_dir, 'cache'),
+            'profile_dir': os.path.join(self.data_dir, 'profiles'),
+            'metrics_dir': os.path.join(self.data_dir, 'metrics'),
+        }
+        for name, default in derived.items():
+            if not getattr(self, name):
+                object.__setattr__(self, name, default)
+
+    # Paths under cache_dir
+    @property
+    def file_type_cache_path(self):
+        return os.path.join(self.cache_dir, 'file_types.sqlite')
+
+    @property
+    def firecrawl_cache_dir(self):
+        return os.path.join(self.cache_dir, 'firecrawl')  # Firecrawl results, one directory per day
+
+    @property
+    def seen_urls_dir(self):
+        return os.path.join(self.cache_dir, 'seen')  # Bloom filter + SQLite sets of URLs already processed
+
+
+def _parse(raw, kind):
+    if kind is bool:
+        value = raw.strip().lower()
+        if value in ('1', 'true', 'yes', 'on'):
+            return True
+        if value in ('0', 'false', 'no', 'off', ''):
+            return False
+        raise ValueError(f"expected 1/0, true/false or yes/no, got {raw!r}")
+    if kind is int:
+        return int(raw)
+    return raw
+
+
+def load_settings(environ=None, env_file=None):
+    """
+    Build Settings from environ (default: os.environ, after loading env_file or the .env file found from the
+    working directory into it). Raises SettingsError with every invalid value.
+    """
+    if environ is None:
+        from dotenv import find_dotenv, load_dotenv
+        load_dotenv(env_file or find_dotenv(usecwd=True) or os.path.join(REPO_ROOT, '.env'))
+        environ = os.environ
+
+    values, problems = {}, []
+    for spec in dataclasses.fields(Settings):
+        name = spec.metadata['env'] or spec.name.upper()
+        raw = environ.get(name)
+        if raw is None:
+            continue
+        kind = bool if spec.type is bool else int if spec.type is int else str
+        try:
+            value = _parse(raw, kind)
+        except ValueError as e:
+            problems.append(f"{name}={raw!r}: {e}")
+            continue
+        minimum = spec.metadata['minimum']
+        if minimum is not None and value < minimum:
+            problems.append(f"{name}={raw!r}: must be at least {minimum}")
+            continue
+        if spec.metadata['path'] and value:
+            value = os.path.abspath(os.path.expanduser(value))
+        values[spec.name] = value
+
+    settings = Settings(**values)
+    if not settings.fed_base_url.startswith(('http://', 'https://')):
+        problems.append(f"FED_BASE_URL={settings.fed_base_url!r}: must be an http(s) URL")
+    if settings.work_queue not in ('local', 'mongo'):
+        problems.append(f"WORK_QUEUE={settings.work_queue!r}: must be local or mongo")
+    if settings.log_format.lower() not in ('json', 'text'):
+        problems.append(f"LOG_FORMAT={settings.log_format!r}: must be json or text")
+    if settings.log_level.upper() not in ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'):
+        problems.append(f"LOG_LEVEL={settings.log_level!r}: must be DEBUG, INFO, WARNING, ERROR or CRITICAL")
+    if settings.profile_capture.lower() not in ('', 'cprofile', 'pyinstrument'):
+        problems.append(f"PROFILE_CAPTURE={settings.profile_capture!r}: must be cprofile or pyinstrument")
+    if not settings.mongo_uri.startswith(('mongodb://', 'mongodb+srv://')):
+        problems.append("MONGO_URI: must start with mongodb:// or mongodb+srv://")
+    if problems:
+        raise SettingsError("Invalid settings:\n  " + "\n  ".join(problems))
+    return settings
+
+
+@functools.lru_cache(maxsize=None)
+def get_settings():
+    """The settings of this process, loaded on the first call (see load_settings)."""
+    return load_settings()
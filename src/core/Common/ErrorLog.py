@@ -0,0 +1,38 @@
+"""
+JSON error files: a list of error records that is read, extended and written back whole.
+
+The speech downloader (crawl and retry threads) and the company FileProcessor (one thread per URL) append to
+these files concurrently. Every append goes through append() under one module-level lock, so two threads never
+read the same list and overwrite each other's record.
+"""
+import json
+import os
+import threading
+
+_LOCK = threading.Lock()
+
+
+def _load(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return []
+
+
+def append(path, record, unique_key=None):
+    """
+    Append one record to the JSON error file at path, creating the file if needed.
+    :param unique_key: If given, the record is skipped when an entry with the same value for this key exists.
+    :return: True if the record was written, False if it was a duplicate.
+    """
+    with _LOCK:
+        errors = _load(path)
+        if unique_key is not None and any(e.get(unique_key) == record.get(unique_key) for e in errors):
+            return False
+        errors.append(record)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(errors, f, ensure_ascii=False, indent=4)
+    return True
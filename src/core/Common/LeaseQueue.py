@@ -0,0 +1,286 @@
+"""
+Work queues shared by several processes or hosts, with time-limited leases.
+
+Items are keyed (e.g. by URL): pushing a key that is already queued, leased or done does nothing, so every item
+is worked on once however many workers push it (items that failed are queued again by the next push). A worker
+claims the next item by priority and holds a lease on it for lease_seconds; it renews the lease while it works and
+completes the item at the end. Work whose results are not durable yet can be staged first: a staged item no longer
+holds up the others, but stays leased (and renewed) until it is completed. The lease of a worker that died
+expires and the item is claimed again by another one. Every claim has its own token, so a worker whose lease
+expired cannot complete (or renew) an item that somebody else claimed meanwhile.
+
+Two interchangeable backends:
+
+    MongoLeaseQueue(collection, 'speech_crawl')   # shared through MongoDB, for several hosts
+    MemoryLeaseQueue('speech_crawl')              # one process (threads as workers), e.g. tests and benchmarks
+
+Lease expiry is checked against the clocks of the workers, which therefore have to be synchronized (NTP) to well
+within lease_seconds.
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+
+READY = 'ready'
+LEASED = 'leased'
+STAGED = 'staged'  # Worked on, waiting for its results to be stored; still leased
+DONE = 'done'
+FAILED = 'failed'
+
+# A claimed item; token identifies this claim
+Lease = namedtuple('Lease', ['key', 'payload', 'token', 'attempts'])
+
+
+def default_owner():
+    """Worker name recorded on leases: host:pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class MemoryLeaseQueue:
+    """In-process lease queue with the interface of MongoLeaseQueue. Safe to share between threads."""
+
+    def __init__(self, name, lease_seconds=300, owner=None):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.owner = owner or default_owner()
+        self.lock = threading.Lock()
+        self.items = {}  # key -> dict with the fields of a MongoLeaseQueue document
+        self.state = {}
+
+    def push(self, key, payload, priority=0, group=None, refresh=False):
+        """
+        Queue key unless it is known and did not fail. refresh=True queues a done key once more (e.g. an index
+        page that is fetched again by every crawl). Lower priorities are claimed first. Returns True if queued.
+        """
+        with self.lock:
+            item = self.items.get(key)
+            if item is not None and not (item['status'] == FAILED or (refresh and item['status'] == DONE)):
+                return False
+            self.items[key] = {'payload': payload, 'priority': priority, 'group': group, 'seq': time.time(),
+                               'status': READY, 'owner': None, 'token': None, 'lease_until': None, 'attempts': 0}
+            return True
+
+    def claim(self, groups=None):
+        """Lease the next ready (or expired) item of one of groups (default: any), or return None."""
+        now = time.time()
+        with self.lock:
+            candidates = [
+                (item['priority'], item['seq'], key) for key, item in self.items.items()
+                if (item['status'] == READY or (item['status'] in (LEASED, STAGED) and item['lease_until'] < now))
+                and (groups is None or item['group'] in groups)
+            ]
+            if not candidates:
+                return None
+            key = min(candidates)[2]
+            item = self.items[key]
+            item.update(status=LEASED, owner=self.owner, token=uuid.uuid4().hex,
+                        lease_until=now + self.lease_seconds, attempts=item['attempts'] + 1)
+            return Lease(key, item['payload'], item['token'], item['attempts'])
+
+    def renew(self, leases):
+        """Extend leases still held by this worker. Returns the number renewed."""
+        lease_until = time.time() + self.lease_seconds
+        renewed = 0
+        with self.lock:
+            for lease in leases:
+                item = self.items.get(lease.key)
+                if item is not None and item['token'] == lease.token and item['status'] in (LEASED, STAGED):
+                    item['lease_until'] = lease_until
+                    renewed += 1
+        return renewed
+
+    def stage(self, lease):
+        """
+        Mark the work on the item finished but its results not stored yet: it stops counting in outstanding() and
+        stays leased to this worker, which renews it until complete() or fail(). If the lease expires first (the
+        worker died before storing), the item is claimed again. False if the lease was lost.
+        """
+        with self.lock:
+            item = self.items.get(lease.key)
+            if item is None or item['token'] != lease.token or item['status'] != LEASED:
+                return False
+            item['status'] = STAGED
+            return True
+
+    def complete(self, lease):
+        """Mark the item done. False if the lease was lost to another worker in the meantime."""
+        with self.lock:
+            item = self.items.get(lease.key)
+            if item is None or item['token'] != lease.token:
+                return False
+            item.update(status=DONE, owner=None, lease_until=None)
+            return True
+
+    def release(self, lease):
+        """Give an item back unfinished, for another worker to claim right away."""
+        with self.lock:
+            item = self.items.get(lease.key)
+            if item is None or item['token'] != lease.token or item['status'] != LEASED:
+                return False
+            item.update(status=READY, owner=None, token=None, lease_until=None)
+            return True
+
+    def fail(self, lease):
+        """Mark the item failed: it counts in failed() until a later push queues it again."""
+        with self.lock:
+            item = self.items.get(lease.key)
+            if item is None or item['token'] != lease.token:
+                return False
+            item.update(status=FAILED, owner=None, lease_until=None)
+            return True
+
+    def discard(self, lease):
+        """Forget an item (e.g. one to look at again later), so a later push queues it again."""
+        with self.lock:
+            item = self.items.get(lease.key)
+            if item is None or item['token'] != lease.token:
+                return False
+            del self.items[lease.key]
+            return True
+
+    def outstanding(self):
+        """
+        Number of items ready or leased (expired leases included), and staged items whose lease expired: 0 once
+        all the work is done.
+        """
+        now = time.time()
+        with self.lock:
+            return sum(item['status'] in (READY, LEASED) or (item['status'] == STAGED and item['lease_until'] < now)
+                       for item in self.items.values())
+
+    def failed(self):
+        """Number of items that failed and were not queued again since."""
+        with self.lock:
+            return sum(item['status'] == FAILED for item in self.items.values())
+
+    def get_state(self, name, default=None):
+        with self.lock:
+            return self.state.get(name, default)
+
+    def set_state(self, name, value):
+        with self.lock:
+            self.state[name] = value
+
+
+class MongoLeaseQueue:
+    """
+    Lease queue in a MongoDB collection (pymongo), one document per item: _id '<name>:<key>'. Claims are single
+    find_one_and_update calls, so two workers never hold the same item. Several queues can share a collection.
+
+    Completed items get a done_at date; with done_ttl (seconds) a TTL index has MongoDB delete them that long
+    after, so the collection does not grow by one document per item forever. A key deleted that way is queued
+    again by its next push.
+    """
+
+    def __init__(self, collection, name, lease_seconds=300, owner=None, done_ttl=None):
+        self.collection = collection
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.owner = owner or default_owner()
+        self.collection.create_index([('queue', 1), ('status', 1), ('group', 1), ('priority', 1), ('seq', 1)])
+        self.collection.create_index([('queue', 1), ('status', 1), ('lease_until', 1)])
+        if done_ttl:
+            self._ensure_done_ttl(done_ttl)
+
+    def _ensure_done_ttl(self, done_ttl):
+        from pymongo.errors import OperationFailure
+
+        try:
+            self.collection.create_index('done_at', expireAfterSeconds=done_ttl)
+        except OperationFailure:
+            # The index exists with another TTL (the setting changed): update it in place
+            self.collection.database.command('collMod', self.collection.name,
+                                             index={'keyPattern': {'done_at': 1}, 'expireAfterSeconds': done_ttl})
+
+    def _id(self, key):
+        return f"{self.name}:{key}"
+
+    def push(self, key, payload, priority=0, group=None, refresh=False):
+        """See MemoryLeaseQueue.push."""
+        fields = {'payload': payload, 'priority': priority, 'group': group, 'seq': time.time(), 'status': READY,
+                  'owner': None, 'token': None, 'lease_until': None, 'attempts': 0, 'done_at': None}
+        requeued = [FAILED, DONE] if refresh else [FAILED]
+        result = self.collection.update_one({'_id': self._id(key), 'status': {'$in': requeued}}, {'$set': fields})
+        if result.modified_count:
+            return True
+        result = self.collection.update_one({'_id': self._id(key)},
+                                            {'$setOnInsert': dict(fields, queue=self.name, key=key)}, upsert=True)
+        return result.upserted_id is not None
+
+    def claim(self, groups=None):
+        """See MemoryLeaseQueue.claim."""
+        from pymongo import ReturnDocument
+
+        now = time.time()
+        query = {'queue': self.name,
+                 '$or': [{'status': READY}, {'status': {'$in': [LEASED, STAGED]}, 'lease_until': {'$lt': now}}]}
+        if groups is not None:
+            query['group'] = {'$in': list(groups)}
+        document = self.collection.find_one_and_update(
+            query,
+            {'$set': {'status': LEASED, 'owner': self.owner, 'token': uuid.uuid4().hex,
+                      'lease_until': now + self.lease_seconds},
+             '$inc': {'attempts': 1}},
+            sort=[('priority', 1), ('seq', 1)], return_document=ReturnDocument.AFTER,
+        )
+        if document is None:
+            return None
+        return Lease(document['key'], document['payload'], document['token'], document['attempts'])
+
+    def renew(self, leases):
+        """See MemoryLeaseQueue.renew."""
+        lease_until = time.time() + self.lease_seconds
+        return sum(self.collection.update_one(
+            {'_id': self._id(lease.key), 'token': lease.token, 'status': {'$in': [LEASED, STAGED]}},
+            {'$set': {'lease_until': lease_until}}).modified_count for lease in leases)
+
+    def stage(self, lease):
+        """See MemoryLeaseQueue.stage."""
+        result = self.collection.update_one({'_id': self._id(lease.key), 'token': lease.token, 'status': LEASED},
+                                            {'$set': {'status': STAGED}})
+        return result.modified_count == 1
+
+    def complete(self, lease):
+        """See MemoryLeaseQueue.complete."""
+        result = self.collection.update_one({'_id': self._id(lease.key), 'token': lease.token},
+                                            {'$set': {'status': DONE, 'owner': None, 'lease_until': None,
+                                                      'done_at': datetime.now(timezone.utc)}})
+        return result.modified_count == 1
+
+    def release(self, lease):
+        """See MemoryLeaseQueue.release."""
+        result = self.collection.update_one(
+            {'_id': self._id(lease.key), 'token': lease.token, 'status': LEASED},
+            {'$set': {'status': READY, 'owner': None, 'token': None, 'lease_until': None}})
+        return result.modified_count == 1
+
+    def fail(self, lease):
+        """See MemoryLeaseQueue.fail."""
+        result = self.collection.update_one({'_id': self._id(lease.key), 'token': lease.token},
+                                            {'$set': {'status': FAILED, 'owner': None, 'lease_until': None}})
+        return result.modified_count == 1
+
+    def discard(self, lease):
+        """See MemoryLeaseQueue.discard."""
+        return self.collection.delete_one({'_id': self._id(lease.key), 'token': lease.token}).deleted_count == 1
+
+    def outstanding(self):
+        """See MemoryLeaseQueue.outstanding."""
+        return self.collection.count_documents({'queue': self.name, '$or': [
+            {'status': {'$in': [READY, LEASED]}}, {'status': STAGED, 'lease_until': {'$lt': time.time()}}]})
+
+    def failed(self):
+        """See MemoryLeaseQueue.failed."""
+        return self.collection.count_documents({'queue': self.name, 'status': FAILED})
+
+    def get_state(self, name, default=None):
+        document = self.collection.find_one({'_id': f"{self.name}:state:{name}"})
+        return default if document is None else document['value']
+
+    def set_state(self, name, value):
+        self.collection.update_one({'_id': f"{self.name}:state:{name}"},
+                                   {'$set': {'queue': f"{self.name}:state", 'value': value}}, upsert=True)
@@ -0,0 +1,185 @@
+"""
+Process-wide, non-blocking logging shared by the speech scripts, the company crawlers and the API.
+
+configure() puts a QueueHandler on the root logger and a QueueListener thread behind it, so a log call only
+renders the message and enqueues it; formatting, console output and file writes happen in the listener thread.
+Output is one JSON object per line by default:
+
+    {"ts": "2024-05-01T10:00:00.123", "level": "INFO", "logger": "SpeechDownloader", "msg": "...", "url": "..."}
+
+Fields passed with extra= are included. Per-item messages pass extra={'sample': key} and only every
+LOG_SAMPLE_EVERY-th record of each key is emitted (the first one always, warnings and errors always); emitted
+records carry "sampled": N. Messages and fields longer than LOG_MAX_FIELD_CHARS are truncated.
+
+Settings come from the settings object of the process (src/config/settings.py, read once, at import):
+
+    LOG_FORMAT=json|text     output format (default json)
+    LOG_LEVEL=INFO           root level
+    LOG_SAMPLE_EVERY=20      keep 1 in N sampled records per key (1 keeps all)
+    LOG_MAX_FIELD_CHARS=2000 truncate longer messages and fields
+
+The listener lives on the root handler, so configure() is idempotent across every importer in a process.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from src.config.settings import get_settings
+
+_settings = get_settings()
+FORMAT = _settings.log_format.lower()
+LEVEL = _settings.log_level.upper()
+SAMPLE_EVERY = _settings.log_sample_every
+MAX_FIELD_CHARS = _settings.log_max_field_chars
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+def truncate(value, limit=MAX_FIELD_CHARS):
+    """str(value), cut to limit characters with a note of how much was dropped."""
+    text = value if isinstance(value, str) else str(value)
+    if limit and len(text) > limit:
+        return f"{text[:limit]}... [{len(text) - limit} more chars]"
+    return text
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value if isinstance(value, (int, float, bool, type(None))) else truncate(value)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Passes one in `every` records of each extra 'sample' key; unsampled records and warnings always pass."""
+
+    def __init__(self, every=SAMPLE_EVERY):
+        super().__init__()
+        self.every = every
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def filter(self, record):
+        key = getattr(record, 'sample', None)
+        if key is None or self.every <= 1 or record.levelno >= logging.WARNING:
+            return True
+        with self.lock:
+            count = self.counts.get(key, 0)
+            self.counts[key] = count + 1
+        if count % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    """Enqueues records rendered just enough to be safe to hand over: message and traceback as truncated text."""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = truncate(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = truncate(logging.Formatter().formatException(record.exc_info))
+            record.exc_info = None
+        return record
+
+
+class ContextAdapter(logging.LoggerAdapter):
+    """LoggerAdapter adding fixed fields (e.g. company) to every record while keeping the caller's extra."""
+
+    def process(self, msg, kwargs):
+        kwargs['extra'] = {**self.extra, **(kwargs.get('extra') or {})}
+        return msg, kwargs
+
+
+def _make_formatter():
+    return logging.Formatter(TEXT_FORMAT) if FORMAT == 'text' else JsonFormatter()
+
+
+def _root_queue_handler():
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler) and hasattr(handler, 'listener'):
+            return handler
+    return None
+
+
+def _start(handlers):
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+    queue_handler.listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_handler.listener.start()
+    return queue_handler
+
+
+def _restart_after_fork():
+    # The listener thread does not exist in a forked child; start a new one on the same handlers
+    root = logging.getLogger()
+    queue_handler = _root_queue_handler()
+    if queue_handler is not None:
+        root.removeHandler(queue_handler)
+        root.addHandler(_start(queue_handler.listener.handlers))
+
+
+def shutdown():
+    """Flush the queue and stop the listener; registered with atexit."""
+    queue_handler = _root_queue_handler()
+    if queue_handler is not None and queue_handler.listener._thread is not None:
+        queue_handler.listener.stop()
+
+
+def configure(log_file=None, max_bytes=5 * 1024 * 1024, backup_count=3):
+    """
+    Set up the queue-based logging of this process once: console output, plus a rotating log_file if given.
+    Later calls with another log_file add it to the listener. Safe to call from every module.
+    """
+    root = logging.getLogger()
+    queue_handler = _root_queue_handler()
+    if queue_handler is None:
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(_make_formatter())
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_start([console]))
+        root.setLevel(LEVEL)
+        atexit.register(shutdown)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_after_fork)
+        queue_handler = _root_queue_handler()
+
+    if log_file:
+        listener = queue_handler.listener
+        log_file = os.path.abspath(log_file)
+        if not any(getattr(handler, 'baseFilename', None) == log_file for handler in listener.handlers):
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                               encoding='utf-8')
+            file_handler.setFormatter(_make_formatter())
+            listener.stop()
+            listener.handlers = listener.handlers + (file_handler,)
+            listener.start()
+
+
+def get_logger(name, log_file=None, **context):
+    """configure() and return the logger name, wrapped in a ContextAdapter when context fields are given."""
+    configure(log_file)
+    logger = logging.getLogger(name)
+    return ContextAdapter(logger, context) if context else logger
@@ -0,0 +1,167 @@
+"""
+Opt-in profiling: span timing of the hot-path functions and an optional cProfile / pyinstrument capture per run.
+
+Enabled with environment variables, read once through the settings object of the process (src/config/settings.py):
+
+    PROFILE=1                      time the functions decorated with @span and write a report per run
+    PROFILE_CAPTURE=cprofile       also run cProfile over the run (or 'pyinstrument' if it is installed)
+    PROFILE_DIR=...                where reports go (default SPEECH_DATA_DIR/profiles)
+    PROFILE_TOP=25                 rows per table in the report
+
+When PROFILE is not set, span() returns the function itself and profile_run() does nothing, so there is no
+overhead. Spans are recorded from every thread; cProfile and pyinstrument only see the thread that started
+the run.
+"""
+import functools
+import inspect
+import io
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.config.settings import get_settings
+
+_settings = get_settings()
+ENABLED = _settings.profile
+CAPTURE = _settings.profile_capture.lower()
+PROFILE_DIR = _settings.profile_dir
+TOP = _settings.profile_top
+
+
+class SpanStats:
+    """Per span name: calls, total seconds, max seconds and calls that raised. Thread-safe."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans = {}
+
+    def record(self, name, seconds, error=False):
+        with self.lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = [0, 0.0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += error
+
+    def reset(self):
+        with self.lock:
+            self.spans = {}
+
+    def rows(self):
+        """(name, calls, total, max, errors), slowest total first."""
+        with self.lock:
+            rows = [(name, *stats) for name, stats in self.spans.items()]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+STATS = SpanStats()
+
+
+def span(name=None):
+    """
+    Decorator timing every call of a sync or async function under name (default: its qualified name).
+    Returns the function unchanged when profiling is disabled.
+    """
+    def decorate(func):
+        if not ENABLED:
+            return func
+        label = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                error = True
+                try:
+                    result = await func(*args, **kwargs)
+                    error = False
+                    return result
+                finally:
+                    STATS.record(label, time.perf_counter() - start, error)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            error = True
+            try:
+                result = func(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                STATS.record(label, time.perf_counter() - start, error)
+        return wrapper
+
+    return decorate
+
+
+def _start_capture():
+    if CAPTURE == 'cprofile':
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if CAPTURE == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("PROFILE_CAPTURE=pyinstrument but pyinstrument is not installed; recording spans only")
+            return None
+        profiler = Profiler()
+        profiler.start()
+        return profiler
+    return None
+
+
+def format_report(job, wall_seconds, profiler=None, base_path=None):
+    lines = [f"{job} run at {datetime.now():%Y-%m-%d %H:%M:%S}, wall time {wall_seconds:.2f}s",
+             "Spans nest and run in several threads, so totals can add up to more than the wall time.", "",
+             f"{'span':<48} {'calls':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'errors':>7} {'% wall':>7}"]
+    for name, calls, total, longest, errors in STATS.rows()[:TOP]:
+        share = total / wall_seconds * 100 if wall_seconds else 0.0
+        lines.append(f"{name:<48} {calls:>7} {total:>9.3f} {total / calls * 1000:>9.2f} {longest * 1000:>9.2f} "
+                     f"{errors:>7} {share:>6.1f}%")
+
+    if profiler is not None and CAPTURE == 'cprofile':
+        import pstats
+        if base_path:
+            profiler.dump_stats(f"{base_path}.prof")
+            lines += ["", f"cProfile data: {base_path}.prof"]
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(TOP)
+        lines += ["", "Top functions by cumulative time (cProfile, calling thread only):", output.getvalue()]
+    elif profiler is not None:
+        lines += ["", profiler.output_text(unicode=True, color=False)]
+    return '\n'.join(lines)
+
+
+@contextmanager
+def profile_run(job):
+    """
+    Profile the with block as one run of job: spans are reset at the start and a report with the top spans
+    (and the captured profile) is written to PROFILE_DIR/{job}-{timestamp}.txt at the end.
+    """
+    if not ENABLED:
+        yield
+        return
+    STATS.reset()
+    profiler = _start_capture()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start
+        if profiler is not None:
+            if CAPTURE == 'cprofile':
+                profiler.disable()
+            else:
+                profiler.stop()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base_path = os.path.join(PROFILE_DIR, f"{job}-{datetime.now():%Y%m%d-%H%M%S}")
+        with open(f"{base_path}.txt", 'w', encoding='utf-8') as f:
+            f.write(format_report(job, wall, profiler, base_path))
+        print(f"Profile report written to {base_path}.txt")
@@ -0,0 +1,60 @@
+"""
+Input fingerprints for the "nothing to do" checks of the batch entry points.
+
+After a complete run a stage records the fingerprint of its inputs next to its output (record); the next run
+compares it (is_current) and exits right away when nothing changed, before importing pandas, PyMuPDF or motor.
+A fingerprint is (number of files, newest mtime in ns, total size), so any added, removed or rewritten file
+changes it.
+"""
+import json
+import os
+
+
+def fingerprint(path, suffix=''):
+    """
+    Fingerprint of the file at path, or of the files under the directory at path whose names end with suffix.
+    None if path does not exist.
+    """
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return [1, stat.st_mtime_ns, stat.st_size]
+    if not os.path.isdir(path):
+        return None
+    files = newest = size = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            if name.endswith(suffix):
+                stat = os.stat(os.path.join(root, name))
+                files += 1
+                newest = max(newest, stat.st_mtime_ns)
+                size += stat.st_size
+    return [files, newest, size]
+
+
+def is_current(stamp_path, value):
+    """True if the stamp at stamp_path holds value, i.e. the inputs did not change since it was recorded."""
+    if value is None:
+        return False
+    try:
+        with open(stamp_path, 'r', encoding='utf-8') as f:
+            return json.load(f) == value
+    except (OSError, ValueError):
+        return False
+
+
+def record(stamp_path, value):
+    directory = os.path.dirname(stamp_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{stamp_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(value, f)
+    os.replace(tmp_path, stamp_path)
+
+
+def clear(stamp_path):
+    """Forget the stamp, so the next run does the work again (e.g. after a failure)."""
+    try:
+        os.remove(stamp_path)
+    except FileNotFoundError:
+        pass
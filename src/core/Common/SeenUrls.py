@@ -0,0 +1,319 @@
+"""
+Persistent "already seen this URL" sets shared by the speech downloader, the company crawlers and the
+crawler controller.
+
+A SeenUrlSet combines a memory-mapped Bloom filter (a few MB for millions of URLs, a membership check in
+microseconds) with an exact SQLite index that is only consulted when the filter reports a possible hit,
+so false positives never cause a URL to be skipped.
+"""
+import glob
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, a filter file must then not be shared between processes
+    fcntl = None
+
+ALLOWED_SCHEMES = ('http', 'https')
+ABSOLUTE_URL = re.compile(r'https?://', re.IGNORECASE)
+
+
+# Pages of one site share most of their links, so normalized results are cached
+@lru_cache(maxsize=65536)
+def normalize_url(url, base_url=None):
+    """
+    Normalize a URL: resolve it against base_url, drop the fragment and lower-case the scheme and host.
+    Returns None for anything that is not an http(s) URL (mailto:, javascript:, data:, ...).
+    """
+    url = url.strip()
+    if not url:
+        return None
+    if base_url and not ABSOLUTE_URL.match(url):
+        url = urljoin(base_url, url)
+    url = url.partition('#')[0]
+    try:
+        parts = urlsplit(url)
+    except ValueError:  # e.g. an invalid IPv6 host
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in ALLOWED_SCHEMES or not parts.netloc:
+        return None
+    netloc = parts.netloc
+    host_start = netloc.rfind('@') + 1
+    netloc = netloc[:host_start] + netloc[host_start:].lower()
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+class BloomFilter:
+    """
+    Bloom filter stored in a memory-mapped file, so it is persistent and only the touched pages are resident.
+    Positions are derived from one blake2b digest with double hashing (Kirsch-Mitzenmacher).
+    Threads may share an instance. Processes may share the file too (e.g. downloaders on one SPEECH_DATA_DIR):
+    adds set bits with read-modify-write, so they hold an exclusive flock on the file while they do.
+    """
+
+    MAGIC = b'URLBLOOM'
+    VERSION = 1
+    HEADER = struct.Struct('<8sIQIQ')  # magic, version, bit count, hash count, items added
+    HEADER_SIZE = 64
+
+    def __init__(self, path, capacity=1_000_000, error_rate=0.01):
+        """
+        :param capacity: Expected number of items; the false positive rate rises above it.
+        :param error_rate: Target false positive rate at capacity.
+        Existing files keep the size they were created with.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.created = not os.path.exists(path)
+        if self.created:
+            bits, hashes = self.optimal_size(capacity, error_rate)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, bits, hashes, 0).ljust(self.HEADER_SIZE, b'\0'))
+                f.truncate(self.HEADER_SIZE + (bits + 7) // 8)
+
+        self.file = open(path, 'r+b')
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        magic, version, self.bits, self.hashes, self.count = self.HEADER.unpack_from(self.map, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a Bloom filter file")
+        self.capacity = capacity
+
+    @staticmethod
+    def optimal_size(capacity, error_rate):
+        bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        return bits, hashes
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        data = self.map
+        offset = self.HEADER_SIZE
+        for position in self._positions(key):
+            if not data[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, key):
+        """Add a key; returns False if it was (probably) present already."""
+        return bool(self.add_many([key]))
+
+    def add_many(self, keys):
+        """Add keys under one file lock; returns those that were not (probably) present already."""
+        batch = [(key, self._positions(key)) for key in keys]
+        data = self.map
+        offset = self.HEADER_SIZE
+        added_keys = []
+        with self.lock, self._file_lock():
+            for key, positions in batch:
+                added = False
+                for position in positions:
+                    index = offset + (position >> 3)
+                    mask = 1 << (position & 7)
+                    if not data[index] & mask:
+                        data[index] |= mask
+                        added = True
+                if added:
+                    added_keys.append(key)
+            if added_keys:
+                # Other processes may have added since this one read the header
+                self.count = self.HEADER.unpack_from(data, 0)[4] + len(added_keys)
+                self.HEADER.pack_into(data, 0, self.MAGIC, self.VERSION, self.bits, self.hashes, self.count)
+        return added_keys
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+    @property
+    def size_bytes(self):
+        return self.HEADER_SIZE + (self.bits + 7) // 8
+
+    def flush(self):
+        with self.lock, self._file_lock():
+            self.map.flush()
+
+    def close(self):
+        if not self.map.closed:
+            self.map.flush()
+            self.map.close()
+        self.file.close()
+
+
+class SeenUrlIndex:
+    """
+    Exact, persistent URL index (SQLite): url is unique, seq keeps the order URLs were first seen.
+    WAL mode, so other processes can read and write the same file concurrently.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS urls ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL UNIQUE, first_seen TEXT NOT NULL)"
+            )
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def __contains__(self, url):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def add_new(self, urls, first_seen=None):
+        """
+        Record a batch of URLs in one transaction and return those never seen before,
+        in input order (duplicates within the batch are returned once).
+        """
+        first_seen = first_seen or datetime.now().strftime('%Y-%m-%d')
+        new_urls = []
+        with self.lock, self.conn:
+            for url in urls:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO urls (url, first_seen) VALUES (?, ?)", (url, first_seen)
+                )
+                if cursor.rowcount == 1:
+                    new_urls.append(url)
+        return new_urls
+
+    def forget(self, urls):
+        """Remove URLs again, e.g. when the new URLs could not be written out."""
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM urls WHERE url = ?", ((url,) for url in urls))
+
+    def iter_urls(self, batch_size=1000):
+        """Yield all URLs in the order they were first seen, one batch at a time."""
+        last_seq = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT seq, url FROM urls WHERE seq > ? ORDER BY seq LIMIT ?", (last_seq, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for _, url in rows:
+                yield url
+            last_seq = rows[-1][0]
+
+
+class SeenUrlSet:
+    """
+    Set of normalized URLs: a Bloom filter in front of an exact SeenUrlIndex.
+    Files: {path}.bloom and {path}.sqlite. The filter is rebuilt from the index when its file is missing.
+    """
+
+    def __init__(self, path, capacity=1_000_000, error_rate=0.01):
+        self.path = path
+        self.index = SeenUrlIndex(f"{path}.sqlite")
+        self.bloom = BloomFilter(f"{path}.bloom", capacity=capacity, error_rate=error_rate)
+        if self.bloom.created:
+            batch = []
+            for url in self.index.iter_urls():
+                batch.append(url)
+                if len(batch) >= 1000:
+                    self.bloom.add_many(batch)
+                    batch = []
+            self.bloom.add_many(batch)
+
+    @staticmethod
+    def key(url):
+        return normalize_url(url) or url.strip()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, url):
+        key = self.key(url)
+        # A miss in the filter is definite; a hit is confirmed against the exact index
+        return key in self.bloom and key in self.index
+
+    def add(self, url):
+        """Record a URL; returns True if it was not seen before."""
+        return bool(self.add_many([url]))
+
+    def add_many(self, urls, first_seen=None):
+        """
+        Record URLs and return the normalized keys of those not seen before, in input order.
+        The insert into the unique index is the exact check, so the filter is only updated here.
+        """
+        keys = list(dict.fromkeys(self.key(url) for url in urls))
+        new_keys = self.index.add_new(keys, first_seen=first_seen)
+        self.bloom.add_many(new_keys)
+        return new_keys
+
+    def import_url_files(self, pattern):
+        """
+        Import existing daily URL files ({"urls": [...]}) in file name, i.e. date, order.
+        :return: The number of URLs that were new to the set.
+        """
+        imported = 0
+        for path in sorted(glob.glob(pattern)):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    urls = json.load(f).get('urls', [])
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable URL file {path}: {e}")
+                continue
+            date = os.path.splitext(path)[0].rsplit('_', 1)[-1]
+            imported += len(self.add_many(urls, first_seen=date))
+        return imported
+
+    def forget(self, urls):
+        """
+        Remove URLs from the exact index. The filter cannot forget; the leftover bits only cost an
+        extra index lookup for these URLs.
+        """
+        self.index.forget([self.key(url) for url in urls])
+
+    def close(self):
+        self.bloom.close()
+
+
+_sets = {}
+_sets_lock = threading.Lock()
+
+
+def open_seen_set(path, capacity=1_000_000, error_rate=0.01):
+    """Return the process-wide SeenUrlSet stored at path (without extension), opening it on first use."""
+    path = os.path.abspath(path)
+    with _sets_lock:
+        seen_set = _sets.get(path)
+        if seen_set is None:
+            seen_set = SeenUrlSet(path, capacity=capacity, error_rate=error_rate)
+            _sets[path] = seen_set
+        return seen_set
@@ -1,52 +1,83 @@
-import logging
-import re
 import sys
 import json
 import os
 import hashlib
+import time
 from abc import ABC, abstractmethod
 from firecrawl import FirecrawlApp
 from datetime import datetime
-from urllib.parse import urlparse
-from tenacity import retry, wait_fixed, stop_after_attempt
-from concurrent.futures import ThreadPoolExecutor
-from dotenv import load_dotenv
+from tenacity import retry, wait_exponential, stop_after_attempt
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-# 加载环境变量
-load_dotenv()
+from src.config import CompanyConfig
+from src.core.Common import LogSetup, Metrics
+from src.core.Common.SeenUrls import open_seen_set
+from src.core.Company.Dector.FileTypeDector import file_type_from_extension
+from src.core.Company.FirecrawlCache import FirecrawlCache
+from src.core.Company.HostLimiter import host_of, shared_host_limiter
+from src.core.Company.UrlExtractor import extract_urls, normalize_url
 
 sys.stdout.reconfigure(encoding='utf-8')
 
+FIRECRAWL_SECONDS = Metrics.histogram('firecrawl_scrape_seconds', "Firecrawl scrape_url latency by result",
+                                      ('result',), buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120))
+
+
 class BaseCrawler(ABC):
-    def __init__(self, url, firecrawl_api_key=None, company_name=None):
+    def __init__(self, url, firecrawl_api_key=None, company_name=None, firecrawl_app=None, use_cache=True,
+                 cache=None, host_limiter=shared_host_limiter):
+        """
+        :param firecrawl_app: 直接传入的 Firecrawl 客户端（例如离线测试用的 FirecrawlStub），优先于 firecrawl_api_key。
+        :param use_cache: 是否使用按 (URL, 日期) 的 Firecrawl 结果缓存，同一天重复运行不会重复付费抓取。
+        :param cache: 自定义的 FirecrawlCache，默认使用 CompanyConfig.FIRECRAWL_CACHE_DIR。
+        :param host_limiter: 按主机的并发限制，默认与 CrawlerController 共用。
+        """
         self.url = url
         self.data = None
+        self.pages = {}
+        self.seen_urls = None
         self.company_name = company_name if company_name else "unknown_company"
         self.logger = self.setup_logger()
+        self.host_limiter = host_limiter
+        if use_cache:
+            self.cache = cache or FirecrawlCache(CompanyConfig.FIRECRAWL_CACHE_DIR)
+        else:
+            self.cache = None
 
-        if firecrawl_api_key:
+        if firecrawl_app is not None:
+            self.firecrawl_app = firecrawl_app
+        elif firecrawl_api_key:
             self.firecrawl_app = FirecrawlApp(api_key=firecrawl_api_key)
         else:
             self.firecrawl_app = None
 
-        # URL 提取正则表达式
-        self.url_pattern = re.compile(
-            r"https?://"                     # 匹配 http 或 https
-            r"(?:[a-zA-Z0-9-]+\.)*"           # 匹配域名中的子域名部分 (可选)
-            r"[a-zA-Z0-9-]+"                  # 匹配主域名
-            r"(?:\.[a-zA-Z]{2,})"             # 匹配顶级域名（如 .com, .org）
-            r"(?::\d{1,5})?"                  # 匹配端口号（可选）
-            r"(?:/[^?#\s]*)?"                 # 匹配路径（可选）
-            r"(?:\?[^#\s]*)?"                 # 匹配查询参数（可选）
-            r"(?:#[^\s]*)?"                   # 匹配片段标识符（可选）
-        )
+    def metadata_dir(self):
+        """
+        元数据目录：设置了 DATA_DIR 时为 {DATA_DIR}/metaData，否则为 CompanyList/{company}/data/metaData
+        （CrawlerController 读取的位置），与当前工作目录无关，多个公司可以在同一进程中运行。
+        """
+        return os.path.join(CompanyConfig.company_data_dir(self.company_name), 'metaData')
+
+    def seen_url_set(self):
+        """
+        返回该公司跨天持久的已见 URL 集合（metaData/{company}_seen_urls.sqlite + .bloom）。
+        第一次创建时导入已有的每日 URL 文件。
+        """
+        if self.seen_urls is None:
+            directory = self.metadata_dir()
+            seen_urls = open_seen_set(os.path.join(directory, f"{self.company_name}_seen_urls"))
+            if len(seen_urls) == 0:
+                imported = seen_urls.import_url_files(os.path.join(directory, f"{self.company_name}_urls_*.json"))
+                if imported:
+                    self.logger.info(f"Imported {imported} previously seen URLs into {seen_urls.path}")
+            self.seen_urls = seen_urls
+        return self.seen_urls
 
     def load_existing_urls(self):
         """加载已经保存的 URL 文件，如果存在的话"""
         current_date = datetime.now().strftime('%Y-%m-%d')
         file_name = f"{self.company_name}_urls_{current_date}.json"
-        directory = os.path.join(os.getenv('DATA_DIR', 'data'), 'metaData')
-        file_path = os.path.join(directory, file_name)
+        file_path = os.path.join(self.metadata_dir(), file_name)
 
         if os.path.exists(file_path):
             try:
@@ -62,32 +93,31 @@ class BaseCrawler(ABC):
         return []
 
     def setup_logger(self):
-        logger = logging.getLogger(self.__class__.__name__)
-        if not logger.hasHandlers():
-            handler = logging.StreamHandler(sys.stdout)
-            file_handler = logging.FileHandler(f'logs/{self.company_name}_crawler.log')
-            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-            handler.setFormatter(formatter)
-            file_handler.setFormatter(formatter)
-            logger.addHandler(handler)
-            logger.addHandler(file_handler)
-            logger.setLevel(logging.DEBUG)  # 可配置的日志级别
-        return logger
+        """
+        所有公司共用一个非阻塞的 JSON 日志（控制台 + CompanyConfig.LOG_FILE，见 Common/LogSetup.py），
+        每条记录带 company 字段，日志级别由 LOG_LEVEL 环境变量控制。
+        """
+        return LogSetup.get_logger(self.__class__.__name__, CompanyConfig.LOG_FILE, company=self.company_name)
 
-    def fetch_data(self):
+    def require_firecrawl(self):
         if not self.firecrawl_app:
             self.logger.error("FirecrawlApp not initialized, cannot fetch data.")
             raise ValueError("FirecrawlApp is not initialized")
 
+    def fetch_data(self):
+        self.require_firecrawl()
+
         try:
-            self.data = self.call_firecrawler(self.url)
+            self.data = self.scrape(self.url)
             self.logger.info(f"Successfully fetched data from {self.url}")
         except Exception as e:
             self.logger.error(f"Error fetching data from {self.url}: {e}")
             raise
 
-    @retry(wait=wait_fixed(5), stop=stop_after_attempt(3))  # 重试机制
+    # 重试机制：指数退避（2s、4s……最长 30s）
+    @retry(wait=wait_exponential(multiplier=1, min=2, max=30), stop=stop_after_attempt(3), reraise=True)
     def call_firecrawler(self, url):
+        start = time.perf_counter()
         try:
             scrape_result = self.firecrawl_app.scrape_url(
                 url,
@@ -95,12 +125,101 @@ class BaseCrawler(ABC):
                     'formats': ['markdown', 'html']
                 }
             )
-            self.logger.info(f"Firecrawl successfully scraped: {scrape_result}")
+            FIRECRAWL_SECONDS.observe(time.perf_counter() - start, result='ok')
+            # 只记录摘要：完整的抓取结果（markdown + html）可能有数 MB
+            summary = scrape_result or {}
+            self.logger.info("Firecrawl successfully scraped %s", url, extra={
+                'status': (summary.get('metadata') or {}).get('statusCode'),
+                'markdown_chars': len(summary.get('markdown') or ''),
+                'html_chars': len(summary.get('html') or ''),
+                'sample': 'firecrawl_scraped',
+            })
             return scrape_result
         except Exception as e:
-            self.logger.error(f"Failed to call Firecrawl: {e}")
+            FIRECRAWL_SECONDS.observe(time.perf_counter() - start, result='error')
+            self.logger.error(f"Failed to call Firecrawl for {url}: {e}")
             raise
 
+    def scrape(self, url):
+        """
+        抓取单个 URL：优先使用当天的缓存结果，否则在主机并发限制下调用 Firecrawl，并把结果写入缓存。
+        """
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            Metrics.observe_cache('firecrawl', cached is not None)
+            if cached is not None:
+                self.logger.info("Using cached Firecrawl result for %s", url, extra={'sample': 'firecrawl_cached'})
+                return cached
+
+        with self.host_limiter.acquire(host_of(url)):
+            result = self.call_firecrawler(url)
+
+        if self.cache is not None and result:
+            self.cache.put(url, result)
+        return result
+
+    def page_links(self, result):
+        """返回抓取结果中的链接（规范化、去重），相对链接按页面地址解析。"""
+        page_url = (result.get('metadata') or {}).get('sourceURL') or self.url
+        return self.extract_urls(result.get('markdown'), result.get('html'), page_url)
+
+    def should_follow(self, url, hosts):
+        """多页面抓取时只跟踪种子所在主机上的网页，PDF、图片等文件链接只记录不抓取。"""
+        return host_of(url) in hosts and file_type_from_extension(url) is None
+
+    def crawl(self, seeds=None, depth=1, max_workers=CompanyConfig.CRAWL_MAX_WORKERS,
+              max_pages=CompanyConfig.CRAWL_MAX_PAGES):
+        """
+        多页面抓取：从种子 URL 开始，沿页面中的链接抓取到 depth 层（depth=0 只抓取种子本身）。
+        最多 max_workers 个页面同时抓取，一个页面完成后立即提交它的链接，不等待整层完成。
+        :param seeds: 种子 URL 列表，默认为 self.url。
+        :param max_pages: 本次最多抓取的页面数，用于控制 Firecrawl 用量。
+        :return: {url: 抓取结果}；抓取失败的页面记录日志后跳过。
+        """
+        self.require_firecrawl()
+        seeds = [normalize_url(url) or url for url in (seeds or [self.url])]
+        hosts = {host_of(url) for url in seeds}
+        visited = set()
+        pending = {}
+        pages = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            def submit(url, url_depth):
+                visited.add(url)
+                pending[executor.submit(self.scrape, url)] = (url, url_depth)
+
+            for url in dict.fromkeys(seeds):
+                if len(visited) < max_pages:
+                    submit(url, 0)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, url_depth = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Error scraping {url}: {e}")
+                        continue
+                    if not result:
+                        continue
+                    pages[url] = result
+
+                    if url_depth >= depth:
+                        continue
+                    for link in self.page_links(result):
+                        if len(visited) >= max_pages:
+                            break
+                        if link not in visited and self.should_follow(link, hosts):
+                            submit(link, url_depth + 1)
+
+        self.logger.info(f"Crawled {len(pages)} pages from {len(seeds)} seeds "
+                         f"(depth {depth}, {len(visited) - len(pages)} failed)")
+        self.pages = pages
+        if self.data is None:
+            self.data = pages.get(seeds[0])
+        return pages
+
     def save_data(self, data, file_suffix):
         if not data:
             self.logger.warning("No data to save.")
@@ -110,7 +229,7 @@ class BaseCrawler(ABC):
             current_date = datetime.now().strftime('%Y-%m-%d')
             url_hash = hashlib.md5(self.url.encode()).hexdigest()  # 使用URL的MD5哈希作为文件名的一部分
             file_name = f"{self.company_name}_{file_suffix}_{current_date}.json"
-            directory = os.path.join(os.getenv('DATA_DIR', 'data'), 'metaData')
+            directory = self.metadata_dir()
             os.makedirs(directory, exist_ok=True)
 
             file_path = os.path.join(directory, file_name)
@@ -119,88 +238,69 @@ class BaseCrawler(ABC):
                 json.dump(data, f, ensure_ascii=False, indent=4)
 
             self.logger.info(f"Data successfully saved to {file_path}")
-            print(f"Data successfully saved to {file_path}")
         except Exception as e:
             self.logger.error(f"Error saving data: {e}")
             raise
 
-    def process_data(self):
-        if not self.data:
-            self.logger.warning("No data to process.")
-            return
-
-        # 保存原始抓取的数据
-        self.save_data(self.data, "metaData")
-
-        # 合并 HTML 和 Markdown 内容进行处理
-        content = (self.data.get('markdown', "") + " " + self.data.get('html', "")).strip()
-        all_urls = self.extract_urls(content)
-
-        # 保存提取的 URL 到单独的文件
-        self.save_data({"urls": all_urls}, "urls")
-        self.logger.info(f"Extracted {len(all_urls)} URLs")
-
-    def extract_urls(self, data):
-        # 将数据中的换行和回车替换为空格
-        cleaned_data = data.replace('\n', ' ').replace('\r', ' ')
-
-        # 使用正则表达式提取 URL
-        urls = re.findall(self.url_pattern, cleaned_data)
-
-        # 清理 URL 并验证其合法性，删除 URL 后的无效字符
-        trailing_punctuations = '.,);\'"!?'
-        cleaned_urls = []
-        for url in urls:
-            # 处理掉 "\" 或其他无效部分后面的字符
-            url = re.split(r'[\\>\s]', url)[0]
-            cleaned_url = url.rstrip(trailing_punctuations)
-            # 验证 URL 合法性
-            if urlparse(cleaned_url).scheme in ['http', 'https']:
-                cleaned_urls.append(cleaned_url)
-
-        return cleaned_urls
-
-
-    def fetch_data_concurrently(self, urls):
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            results = list(executor.map(self.call_firecrawler, urls))
+    def extract_urls(self, markdown=None, html=None, base_url=None):
+        """
+        提取页面中的 URL：解析 HTML 的 href/src 属性，并线性扫描 Markdown 中的链接和裸 URL。
+        结果已规范化（解析相对地址、去掉片段、主机名小写）并去重，保持首次出现的顺序。
+        """
+        return extract_urls(html=html, markdown=markdown, base_url=base_url or self.url)
+
+    def fetch_data_concurrently(self, urls, max_workers=CompanyConfig.CRAWL_MAX_WORKERS):
+        """并发抓取一组 URL（使用缓存和主机并发限制），按输入顺序返回结果。"""
+        self.require_firecrawl()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(self.scrape, urls))
         return results
 
     def save_unique_urls(self, new_urls):
-        """保存新的 URL 并确保没有重复"""
-        existing_urls = self.load_existing_urls()
-
-        # 保持顺序，逐个检查新 URL 是否已经在 existing_urls 中
-        for url in new_urls:
-            if url not in existing_urls:
-                existing_urls.append(url)
+        """
+        只保存真正新的 URL：先在持久的已见集合中登记，再把此前任何一天都没见过的 URL
+        追加到当天的 URL 文件（控制器按天读取该文件），因此每天只处理新发现的 URL。
+        :return: 新 URL 列表。
+        """
+        seen_urls = self.seen_url_set()
+        fresh_urls = seen_urls.add_many(new_urls)
 
         # 如果没有新的 URL 要保存，直接返回
-        if len(existing_urls) == len(new_urls):
-            self.logger.info("No new URLs to append, all URLs are already in the list.")
-            return
-
-        # 保存更新后的 URL 列表
-        self.save_data({"urls": existing_urls}, "urls")
-        self.logger.info(f"Appended {len(existing_urls) - len(new_urls)} new URLs. Total URLs: {len(existing_urls)}")
+        if not fresh_urls:
+            self.logger.info("No new URLs to append, all URLs have been seen before.")
+            return []
 
+        # 当天已有的 URL 都已登记在索引中，不会与新 URL 重复
+        todays_urls = self.load_existing_urls() + fresh_urls
+        try:
+            self.save_data({"urls": todays_urls}, "urls")
+        except Exception:
+            # 没有写出的 URL 不算已见，下次运行仍会作为新 URL 输出
+            seen_urls.forget(fresh_urls)
+            raise
+        self.logger.info(f"Appended {len(fresh_urls)} new URLs. URLs for today: {len(todays_urls)}, "
+                         f"seen in total: {len(seen_urls)}")
+        return fresh_urls
 
     def process_data(self):
-        if not self.data:
+        """
+        保存抓取结果并提取其中的 URL。
+        :return: 本次新发现的 URL 列表。
+        """
+        if not self.data and not self.pages:
             self.logger.warning("No data to process.")
-            return
+            return []
 
         # 保存原始抓取的数据
-        self.save_data(self.data, "metaData")
+        if self.data:
+            self.save_data(self.data, "metaData")
+        if len(self.pages) > 1:
+            self.save_data(self.pages, "pages")
 
-        # 合并 HTML 和 Markdown 内容进行处理
-        content = (self.data.get('markdown', "") + " " + self.data.get('html', "")).strip()
-        all_urls = self.extract_urls(content)
+        # 合并所有页面的 HTML 和 Markdown 内容进行处理
+        all_urls = []
+        for result in (self.pages.values() if self.pages else [self.data]):
+            all_urls.extend(self.page_links(result))
 
         # 保存去重后的 URL，并保持顺序
-        self.save_unique_urls(all_urls)
-
-
-
-
-
+        return self.save_unique_urls(list(dict.fromkeys(all_urls)))
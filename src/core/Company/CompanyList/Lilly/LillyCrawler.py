@@ -3,9 +3,9 @@
 from src.core.Company.BaseCrawler import BaseCrawler
 
 class LillyCrawler(BaseCrawler):
-    def __init__(self, url, firecrawl_api_key):
+    def __init__(self, url, firecrawl_api_key=None, **kwargs):
         # 调用父类的构造函数，初始化 url 和 firecrawl_api_key
-        super().__init__(url, firecrawl_api_key, company_name="Lilly")  # 设置公司名为 "Lilly"
+        super().__init__(url, firecrawl_api_key, company_name="Lilly", **kwargs)  # 设置公司名为 "Lilly"
 
     # 不需要重写 process_data，因为父类已经实现了提取 URL 的逻辑
 
@@ -2,9 +2,9 @@
 from src.core.Company.BaseCrawler import BaseCrawler
 
 class NvidiaCrawler(BaseCrawler):
-    def __init__(self, url, firecrawl_api_key):
+    def __init__(self, url, firecrawl_api_key=None, **kwargs):
         # 调用父类的构造函数，初始化 url 和 firecrawl_api_key
-        super().__init__(url, firecrawl_api_key, company_name="Nvidia")
+        super().__init__(url, firecrawl_api_key, company_name="Nvidia", **kwargs)
 
 if __name__ == "__main__":
     url = 'https://investor.nvidia.com/home/default.aspx'
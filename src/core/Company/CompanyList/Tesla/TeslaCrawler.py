@@ -3,9 +3,9 @@
 from src.core.Company.BaseCrawler import BaseCrawler
 
 class TeslaCrawler(BaseCrawler):
-    def __init__(self, url, firecrawl_api_key):
+    def __init__(self, url, firecrawl_api_key=None, **kwargs):
         # 调用父类的构造函数，初始化 url、firecrawl_api_key 和 company_name
-        super().__init__(url, firecrawl_api_key, company_name="Tesla")
+        super().__init__(url, firecrawl_api_key, company_name="Tesla", **kwargs)
 
 if __name__ == "__main__":
     url = 'https://ir.tesla.com/'
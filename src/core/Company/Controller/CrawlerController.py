@@ -1,15 +1,31 @@
 # -*- coding: utf-8 -*-
 import json
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from src.config import CompanyConfig
+from src.core.Common import LogSetup, Metrics, Profiling
+from src.core.Common.SeenUrls import open_seen_set
 from src.core.Company.Dector.FileTypeDector import detect_file_type
+from src.core.Company.HostLimiter import KeyedLimiter, host_of, shared_host_limiter
 from src.core.Company.Processor.FileProcessor import FileProcessor
 
+# 逐个 URL 的消息写入共享的 JSON 日志并抽样，公司级别的进度仍然打印到控制台
+logger = LogSetup.get_logger('CrawlerController', CompanyConfig.LOG_FILE)
+
 
 class CrawlerController:
-    def __init__(self, company_list_file):
+    def __init__(self, company_list_file, max_workers=CompanyConfig.CONTROLLER_MAX_WORKERS,
+                 per_company=CompanyConfig.PER_COMPANY_CONCURRENCY, host_limiter=shared_host_limiter):
         self.company_list_file = company_list_file
         self.company_urls = self.load_company_urls()
+        self.max_workers = max_workers
+        self.company_limiter = KeyedLimiter(per_company)
+        self.host_limiter = host_limiter
+        self.stats = CrawlStats()
 
     def load_company_urls(self):
         """
@@ -24,10 +40,11 @@ class CrawlerController:
         """
         根据公司名称加载该公司存储的 URL 文件。
         路径格式为：CompanyList/{company_name}/data/metaData/{company_name}_urls_{current_date}.json
+        （设置了 DATA_DIR 时为 {DATA_DIR}/metaData/...，与 BaseCrawler.metadata_dir 相同）
         """
         current_date = datetime.now().strftime('%Y-%m-%d')
-        # 修改文件路径为正确的存储位置
-        file_path = f"../CompanyList/{company_name}/data/metaData/{company_name}_urls_{current_date}.json"
+        file_path = os.path.join(CompanyConfig.company_data_dir(company_name), 'metaData',
+                                 f"{company_name}_urls_{current_date}.json")
 
         if not os.path.exists(file_path):
             print(f"URL 文件未找到: {file_path}")
@@ -38,10 +55,18 @@ class CrawlerController:
             data = json.load(f)
         return data.get('urls', [])
 
+    @staticmethod
+    def processed_urls(company_name):
+        """该公司已成功处理过的 URL 集合（Bloom 过滤器 + SQLite 精确索引），跨运行持久保存。"""
+        return open_seen_set(os.path.join(CompanyConfig.SEEN_URLS_DIR, f"processed_{company_name}"))
+
     def start_crawling(self):
         """
-        对每个公司，加载 URL 文件并检测每个 URL 的文件类型，然后调用处理工作流。
+        把所有公司的 URL 放入同一个工作队列，用线程池并发处理（文件类型检测 + 下载）。
+        同一公司、同一主机同时处理的 URL 数分别受 per_company / host_limiter 限制，
+        达到上限的任务留在队列中，不占用工作线程。
         """
+        pending = {}
         for company_name, homepage_url in self.company_urls.items():
             print(f"开始处理公司: {company_name}")
 
@@ -52,14 +77,143 @@ class CrawlerController:
                 print(f"未找到 {company_name} 的 URL，跳过。")
                 continue
 
-            # 处理每个 URL
-            for url in urls:
-                # 检测文件类型
-                file_type = detect_file_type(url)
-                print(f"Processing URL: {url}, detected as {file_type}")
+            # 跳过之前已经成功处理过的 URL（任何一次运行）
+            processed = self.processed_urls(company_name)
+            new_urls = [url for url in urls if url not in processed]
+            if len(new_urls) < len(urls):
+                print(f"{company_name}: {len(urls) - len(new_urls)} 个 URL 已处理过，跳过。")
+            urls = new_urls
+            if not urls:
+                continue
+
+            pending[company_name] = deque(urls)
+            self.stats.add_company(company_name, len(urls))
+
+        if not pending:
+            return self.stats
+
+        condition = threading.Condition()
+        in_flight = [0]
+
+        def on_done(company_name, host, future):
+            self.company_limiter.release(company_name)
+            self.host_limiter.release(host)
+            self.stats.finish(company_name, ok=future.exception() is None and future.result())
+            with condition:
+                in_flight[0] -= 1
+                condition.notify_all()
+
+        reporter = ProgressReporter(self.stats, CompanyConfig.PROGRESS_INTERVAL)
+        reporter.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                with condition:
+                    while pending or in_flight[0]:
+                        submitted = False
+                        # 轮询各公司，每轮每个公司最多提交一个 URL，避免单个公司占满所有线程
+                        for company_name in list(pending):
+                            if in_flight[0] >= self.max_workers:
+                                break
+                            queue = pending[company_name]
+                            url = queue[0]
+                            host = host_of(url)
+                            if not self.company_limiter.try_acquire(company_name):
+                                continue
+                            if not self.host_limiter.try_acquire(host):
+                                self.company_limiter.release(company_name)
+                                continue
+                            queue.popleft()
+                            if not queue:
+                                del pending[company_name]
+                            in_flight[0] += 1
+                            future = executor.submit(process_url, company_name, url,
+                                                     self.processed_urls(company_name))
+                            future.add_done_callback(
+                                lambda f, c=company_name, h=host: on_done(c, h, f))
+                            submitted = True
+                        if not submitted:
+                            # 等待任一任务完成（或超时后重试，主机限流器可能被其他组件释放）
+                            condition.wait(timeout=0.5)
+        finally:
+            reporter.stop()
+
+        print(self.stats.summary())
+        return self.stats
+
+
+class CrawlStats:
+    """线程安全的进度统计：各公司总数、完成数、失败数以及整体吞吐量。"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.totals = {}
+        self.done = {}
+        self.failed = {}
+
+    def add_company(self, company_name, total):
+        with self.lock:
+            self.totals[company_name] = total
+            self.done[company_name] = 0
+            self.failed[company_name] = 0
+
+    def finish(self, company_name, ok):
+        with self.lock:
+            self.done[company_name] += 1
+            if not ok:
+                self.failed[company_name] += 1
 
-                # 根据文件类型调用相应的工作流处理
-                process_workflow(company_name, url, file_type)
+    def summary(self):
+        with self.lock:
+            total = sum(self.totals.values())
+            done = sum(self.done.values())
+            failed = sum(self.failed.values())
+            elapsed = time.monotonic() - self.started_at
+            per_company = ", ".join(f"{name} {self.done[name]}/{self.totals[name]}" for name in self.totals)
+        rate = done / elapsed if elapsed > 0 else 0.0
+        return (f"进度: {done}/{total} 个 URL, 失败 {failed}, 用时 {elapsed:.1f}s, "
+                f"吞吐量 {rate:.2f} URL/s [{per_company}]")
+
+
+class ProgressReporter:
+    """后台线程，每隔 interval 秒打印一次进度。"""
+
+    def __init__(self, stats, interval):
+        self.stats = stats
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="crawl-progress", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            print(self.stats.summary())
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def process_url(company_name, url, processed=None):
+    """
+    处理单个 URL，返回是否处理成功。
+    文件类型只从扩展名和类型缓存获取，不单独发检测请求；未知类型由 FileProcessor 在下载时嗅探，
+    因此每个 URL 只请求一次。
+    :param processed: 已处理 URL 集合，处理成功后登记，之后的运行不再处理。
+    """
+    try:
+        file_type = detect_file_type(url, allow_request=False)
+        logger.info("Processing URL: %s, expected as %s", url, file_type or 'unknown (sniffed on download)',
+                    extra={'company': company_name, 'sample': 'url_processing'})
+        ok = process_workflow(company_name, url, file_type)
+        if ok and processed is not None:
+            processed.add(url)
+        return ok
+    except Exception as e:
+        logger.error(f"处理 URL 失败: {url}, 错误: {e}", extra={'company': company_name})
+        return False
 
 
 def process_workflow(company_name, url, file_type):
@@ -67,11 +221,17 @@ def process_workflow(company_name, url, file_type):
     根据文件类型处理 URL 的工作流函数。
     """
     file_processor = FileProcessor(company_name, url, file_type)
-    file_processor.process()
+    return file_processor.process()
 
 
-if __name__ == "__main__":
-    # 将目标公司 JSON 文件路径更改为正确的位置
-    company_list_file = '../CompanyList/CompanyPage.json'
+def main():
+    # 目标公司列表 CompanyList/CompanyPage.json，与当前工作目录无关
+    company_list_file = os.path.join(CompanyConfig.COMPANY_LIST_DIR, 'CompanyPage.json')
     crawler = CrawlerController(company_list_file)
-    crawler.start_crawling()
+    with Profiling.profile_run('company_controller'):
+        crawler.start_crawling()
+    Metrics.write_textfile(Metrics.textfile_path('company_controller'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import importlib
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from importlib import metadata
+
+from firecrawl import FirecrawlApp
+
+from src.config import CompanyConfig
+from src.core.Company.BaseCrawler import BaseCrawler
+from src.core.Company.FirecrawlStub import FirecrawlStub
+
+# 外部包可以通过这个 entry point 组注册爬虫类，名称为公司名，例如：
+#   [project.entry-points."task.company_crawlers"]
+#   Tesla = "my_package.crawlers:TeslaCrawler"
+ENTRY_POINT_GROUP = 'task.company_crawlers'
+COMPANY_PAGE_FILE = os.path.join(CompanyConfig.COMPANY_LIST_DIR, 'CompanyPage.json')
+
+
+def load_company_pages(path=COMPANY_PAGE_FILE):
+    """读取 CompanyPage.json：{公司名: 主页 URL}。"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _entry_points():
+    try:
+        return {entry_point.name: entry_point for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP)}
+    except TypeError:  # Python < 3.10
+        return {entry_point.name: entry_point for entry_point in metadata.entry_points().get(ENTRY_POINT_GROUP, [])}
+
+
+def find_crawler_class(company_name):
+    """
+    查找公司的爬虫类：先查 entry point，再导入 CompanyList/{company}/{company}Crawler.py，
+    取其中的 {company}Crawler（或模块中定义的任一 BaseCrawler 子类）。找不到时返回 None。
+    """
+    entry_point = _entry_points().get(company_name)
+    if entry_point is not None:
+        return entry_point.load()
+
+    crawler_file = os.path.join(CompanyConfig.COMPANY_LIST_DIR, company_name, f"{company_name}Crawler.py")
+    if not os.path.exists(crawler_file):
+        return None
+    module = importlib.import_module(f"src.core.Company.CompanyList.{company_name}.{company_name}Crawler")
+    crawler_class = getattr(module, f"{company_name}Crawler", None)
+    if crawler_class is None:
+        subclasses = [member for _, member in inspect.getmembers(module, inspect.isclass)
+                      if issubclass(member, BaseCrawler) and member is not BaseCrawler
+                      and member.__module__ == module.__name__]
+        crawler_class = subclasses[0] if subclasses else None
+    return crawler_class
+
+
+def discover_crawlers(company_pages):
+    """
+    返回 {公司名: 爬虫类}。没有专用爬虫的公司使用通用的 BaseCrawler。
+    """
+    registry = {}
+    for company_name in company_pages:
+        try:
+            crawler_class = find_crawler_class(company_name)
+        except Exception as e:
+            print(f"Failed to load crawler for {company_name}: {e}")
+            continue
+        if crawler_class is None:
+            print(f"No crawler found for {company_name}, using BaseCrawler")
+            crawler_class = BaseCrawler
+        registry[company_name] = crawler_class
+    return registry
+
+
+def create_crawler(crawler_class, company_name, url, **kwargs):
+    """实例化爬虫。公司爬虫子类自己设置公司名，通用的 BaseCrawler 需要传入。"""
+    if crawler_class is BaseCrawler:
+        return BaseCrawler(url, company_name=company_name, **kwargs)
+    return crawler_class(url, **kwargs)
+
+
+def create_firecrawl_app(offline=False):
+    """创建所有公司共用的 Firecrawl 客户端；offline 时使用 FirecrawlStub。"""
+    if offline:
+        return FirecrawlStub()
+    if not CompanyConfig.FIRECRAWL_API_KEY:
+        raise ValueError("FIRECRAWL_API_KEY is not set; set it in the environment or .env, or run offline")
+    return FirecrawlApp(api_key=CompanyConfig.FIRECRAWL_API_KEY)
+
+
+def run_company(company_name, url, depth=0, offline=False, firecrawl_app=None, crawler_class=None):
+    """
+    抓取单个公司并提取新 URL，记录耗时。异常不会抛出，而是记录在结果中。
+    :param depth: 0 只抓取主页，大于 0 时用 BaseCrawler.crawl 沿链接抓取多层。
+    :return: {'company', 'seconds', 'pages', 'new_urls', 'error'}
+    """
+    start = time.perf_counter()
+    result = {'company': company_name, 'seconds': 0.0, 'pages': 0, 'new_urls': 0, 'error': None}
+    try:
+        crawler_class = crawler_class or find_crawler_class(company_name) or BaseCrawler
+        firecrawl_app = firecrawl_app or create_firecrawl_app(offline)
+        crawler = create_crawler(crawler_class, company_name, url, firecrawl_app=firecrawl_app)
+        if depth > 0:
+            crawler.crawl(depth=depth)
+            result['pages'] = len(crawler.pages)
+        else:
+            crawler.fetch_data()
+            result['pages'] = 1 if crawler.data else 0
+        result['new_urls'] = len(crawler.process_data())
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_all(company_pages=None, companies=None, max_workers=CompanyConfig.COMPANY_CRAWLER_WORKERS, processes=0,
+            depth=0, offline=False):
+    """
+    在一个进程中并发运行所有公司的爬虫（共用 Firecrawl 客户端、结果缓存和主机限流器）。
+    :param companies: 只运行这些公司，默认为 CompanyPage.json 中的全部公司。
+    :param processes: 大于 0 时每个公司在进程池中运行，相互隔离（各进程有自己的客户端和缓存连接）。
+    :return: 每个公司的结果列表，见 run_company。
+    """
+    company_pages = company_pages or load_company_pages()
+    if companies:
+        company_pages = {name: url for name, url in company_pages.items() if name in companies}
+    registry = discover_crawlers(company_pages)
+
+    results = []
+    start = time.perf_counter()
+    if processes > 0:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(run_company, name, company_pages[name], depth, offline)
+                       for name in registry]
+            for future in as_completed(futures):
+                results.append(future.result())
+    else:
+        firecrawl_app = create_firecrawl_app(offline)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(run_company, name, company_pages[name], depth, offline, firecrawl_app,
+                                       crawler_class) for name, crawler_class in registry.items()]
+            for future in as_completed(futures):
+                results.append(future.result())
+
+    print_report(results, time.perf_counter() - start)
+    return results
+
+
+def print_report(results, total_seconds):
+    print(f"{'company':<20} {'seconds':>8} {'pages':>6} {'new urls':>9}  status")
+    for result in sorted(results, key=lambda item: item['company']):
+        status = result['error'] or 'ok'
+        print(f"{result['company']:<20} {result['seconds']:>8.2f} {result['pages']:>6} {result['new_urls']:>9}  {status}")
+    failed = sum(1 for result in results if result['error'])
+    print(f"{len(results)} companies in {total_seconds:.2f}s, {failed} failed")
@@ -0,0 +1,67 @@
+from src.core.Company.Dector.FileTypeDector import file_type_from_content_type, file_type_from_extension
+
+# Number of leading bytes needed by sniff_file_type
+SNIFF_BYTES = 8192
+
+_IMAGE_SIGNATURES = (
+    b'\x89PNG\r\n\x1a\n',  # PNG
+    b'\xff\xd8\xff',  # JPEG
+    b'GIF87a', b'GIF89a',  # GIF
+    b'II*\x00', b'MM\x00*',  # TIFF
+)
+_OLE2_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'  # Legacy .doc/.ppt/.xls container
+_ARCHIVE_SIGNATURES = (b'\x1f\x8b', b'Rar!\x1a\x07', b'7z\xbc\xaf\x27\x1c')
+_HTML_MARKERS = (b'<!doctype html', b'<html', b'<head', b'<body')
+
+
+def _sniff_zip(head, hint):
+    # OOXML files are ZIP containers; the first entries usually name the document's main part
+    if b'ppt/' in head:
+        return 'ppt'
+    if b'word/' in head:
+        return 'word'
+    if hint in ('ppt', 'word'):
+        return hint
+    return 'archive'
+
+
+def sniff_file_type(head, content_type=None, url=None):
+    """
+    Determine the file type from the first bytes of a response, falling back to the
+    Content-Type header and then the URL extension.
+    Magic bytes win over the header, so mislabelled responses (e.g. a PDF served as
+    application/octet-stream or an HTML error page served for a .pdf URL) are routed correctly.
+    :param head: The first bytes of the (decoded) response body.
+    :param content_type: The Content-Type header, if any.
+    :param url: The URL, used for the extension fallback.
+    :return: One of 'pdf', 'image', 'svg', 'ppt', 'word', 'archive', 'html', 'json', 'text'.
+    """
+    head = head or b''
+    header_type = file_type_from_content_type(content_type) if content_type else None
+    extension_type = file_type_from_extension(url) if url else None
+    hint = extension_type or header_type
+
+    # PDFs may have a few junk bytes before the header; readers accept it within the first 1 KB
+    if b'%PDF-' in head[:1024]:
+        return 'pdf'
+    if head.startswith(_IMAGE_SIGNATURES) or (head[:4] == b'RIFF' and head[8:12] == b'WEBP'):
+        return 'image'
+    if head.startswith(b'PK\x03\x04'):
+        return _sniff_zip(head, hint)
+    if head.startswith(_OLE2_SIGNATURE):
+        return hint if hint in ('ppt', 'word') else 'word'
+    if head.startswith(_ARCHIVE_SIGNATURES):
+        return 'archive'
+
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if text.startswith(b'<svg') or (text.startswith(b'<?xml') and b'<svg' in text):
+        return 'svg'
+    if text.startswith(_HTML_MARKERS) or any(marker in text[:2048] for marker in _HTML_MARKERS[1:]):
+        return 'html'
+    if text[:1] in (b'{', b'[') and header_type in (None, 'json', 'text'):
+        return 'json'
+
+    # No recognizable signature: trust the header, then the extension
+    if header_type and header_type != 'text':
+        return header_type
+    return extension_type or 'text'
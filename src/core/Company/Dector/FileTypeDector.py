@@ -1,6 +1,89 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
 import requests
 
-def detect_file_type(url):
+from src.config import CompanyConfig
+from src.core.Common import LogSetup, Metrics
+from src.core.Company.HostLimiter import host_of, shared_host_limiter
+
+logger = LogSetup.get_logger('FileTypeDector', CompanyConfig.LOG_FILE)
+
+
+class FileTypeCache:
+    """
+    Persistent URL -> file type cache backed by SQLite, with a time-to-live per entry.
+    Safe to share between threads; several processes may use the same file.
+    """
+
+    def __init__(self, path, ttl=CompanyConfig.FILE_TYPE_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_types ("
+                "url TEXT PRIMARY KEY, file_type TEXT NOT NULL, content_type TEXT, checked_at REAL NOT NULL)"
+            )
+
+    def get(self, url):
+        """Return the cached file type for the URL, or None if missing or expired."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT file_type, checked_at FROM file_types WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def get_many(self, urls):
+        """Return {url: file_type} for the URLs that have a fresh cache entry."""
+        found = {}
+        urls = list(urls)
+        oldest = time.time() - self.ttl
+        with self.lock:
+            # Stay below SQLite's default limit on bound parameters
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT url, file_type FROM file_types WHERE checked_at >= ? AND url IN ({placeholders})",
+                    [oldest, *chunk],
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put(self, url, file_type, content_type=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO file_types (url, file_type, content_type, checked_at) VALUES (?, ?, ?, ?)",
+                (url, file_type, content_type, time.time()),
+            )
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Return the process-wide cache stored at CompanyConfig.FILE_TYPE_CACHE_PATH."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = FileTypeCache(CompanyConfig.FILE_TYPE_CACHE_PATH)
+        return _default_cache
+
+
+def file_type_from_extension(url):
     # Perform initial detection based on URL extension (case insensitive)
     url_lower = url.lower()
 
@@ -16,37 +99,115 @@ def detect_file_type(url):
         return 'word'
     elif url_lower.endswith(('.zip', '.tar', '.gz', '.rar')):
         return 'archive'
+    return None
+
 
-    # If unable to determine from the extension, request the URL and check the Content-Type
+def file_type_from_content_type(content_type):
+    content_type = (content_type or '').lower()
+
+    # Detect the Content-Type main type
+    if 'image' in content_type:
+        return 'image'
+    elif 'pdf' in content_type:
+        return 'pdf'
+    elif 'html' in content_type:
+        return 'html'
+    elif 'application/vnd.ms-powerpoint' in content_type or 'application/vnd.openxmlformats-officedocument.presentationml' in content_type:
+        return 'ppt'
+    elif 'svg' in content_type:
+        return 'svg'
+    elif 'application/msword' in content_type or 'application/vnd.openxmlformats-officedocument.wordprocessingml' in content_type:
+        return 'word'
+    elif 'application/zip' in content_type or 'application/x-tar' in content_type:
+        return 'archive'
+    elif 'json' in content_type:
+        return 'json'
+    else:
+        return 'text'  # Default to text if no other type is matched
+
+
+def record_file_type(url, content_type, cache=None):
+    """
+    Store the type observed for a URL, e.g. from the Content-Type of an actual download,
+    so later runs do not need a detection request for it.
+    """
+    file_type = file_type_from_content_type(content_type)
+    (cache or get_default_cache()).put(url, file_type, content_type)
+    return file_type
+
+
+def detect_file_type(url, cache=None, allow_request=True):
+    """
+    Return the file type of a URL from its extension, the cache or, if allowed, a HEAD/GET request.
+    With allow_request=False, None is returned when the type is not known without a request;
+    the caller can then sniff it from the download itself (see ContentSniffer).
+    """
+    extension_type = file_type_from_extension(url)
+    if extension_type:
+        return extension_type
+
+    cache = cache or get_default_cache()
+    cached_type = cache.get(url)
+    Metrics.observe_cache('file_type', bool(cached_type))
+    if cached_type:
+        return cached_type
+    if not allow_request:
+        return None
+
+    # If unable to determine from the extension or the cache, request the URL and check the Content-Type
+    host = urlsplit(url).hostname or ''
+    start = time.perf_counter()
     try:
         # Prefer using a HEAD request to improve efficiency
-        response = requests.head(url, allow_redirects=True, timeout=5)
-
-        # If the HEAD request fails, try a GET request and only fetch the headers
-        if response.status_code != 200:
-            response = requests.get(url, stream=True, timeout=5)
-
-        content_type = response.headers.get('Content-Type', '').lower()
-
-        # Detect the Content-Type main type
-        if 'image' in content_type:
-            return 'image'
-        elif 'pdf' in content_type:
-            return 'pdf'
-        elif 'html' in content_type:
-            return 'html'
-        elif 'application/vnd.ms-powerpoint' in content_type or 'application/vnd.openxmlformats-officedocument.presentationml' in content_type:
-            return 'ppt'
-        elif 'svg' in content_type:
-            return 'svg'
-        elif 'application/msword' in content_type or 'application/vnd.openxmlformats-officedocument.wordprocessingml' in content_type:
-            return 'word'
-        elif 'application/zip' in content_type or 'application/x-tar' in content_type:
-            return 'archive'
-        elif 'json' in content_type:
-            return 'json'
-        else:
-            return 'text'  # Default to text if no other type is matched
+        with requests.head(url, allow_redirects=True, timeout=5) as response:
+            status_code = response.status_code
+            content_type = response.headers.get('Content-Type', '')
+        Metrics.observe_http(host, status_code, time.perf_counter() - start)
+
+        # If the HEAD request fails, try a GET request and only read the headers; the body is never downloaded
+        if status_code != 200:
+            start = time.perf_counter()
+            with requests.get(url, stream=True, timeout=5) as response:
+                content_type = response.headers.get('Content-Type', '')
+            Metrics.observe_http(host, response.status_code, time.perf_counter() - start)
+
+        return record_file_type(url, content_type, cache)
     except requests.RequestException as e:
-        print(f"Error detecting file type for URL {url}: {e}")
-        return 'unknown'
\ No newline at end of file
+        Metrics.observe_http(host, 'error', time.perf_counter() - start)
+        logger.warning(f"Error detecting file type for URL {url}: {e}")
+        return 'unknown'
+
+
+def detect_file_types(urls, max_workers=8, cache=None, host_limiter=shared_host_limiter):
+    """
+    Detect the file types of many URLs at once.
+    Extensions and the cache are checked first; only the remaining URLs are requested,
+    concurrently and subject to the per-host limiter.
+    :return: A dict mapping each URL to its file type.
+    """
+    cache = cache or get_default_cache()
+    results = {}
+    unresolved = []
+    for url in dict.fromkeys(urls):
+        extension_type = file_type_from_extension(url)
+        if extension_type:
+            results[url] = extension_type
+        else:
+            unresolved.append(url)
+
+    cached = cache.get_many(unresolved)
+    results.update(cached)
+    # Misses are counted by detect_file_type below
+    Metrics.CACHE_REQUESTS.inc(len(cached), cache='file_type', result='hit')
+    to_request = [url for url in unresolved if url not in cached]
+    if not to_request:
+        return results
+
+    def detect(url):
+        with host_limiter.acquire(host_of(url)):
+            return url, detect_file_type(url, cache)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for url, file_type in executor.map(detect, to_request):
+            results[url] = file_type
+    return results
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+
+
+class FirecrawlCache:
+    """
+    Firecrawl 抓取结果的磁盘缓存，按 (URL, 日期) 缓存：同一天内重复抓取同一 URL 直接读缓存，
+    第二天自动重新抓取。文件布局：{cache_dir}/{YYYY-MM-DD}/{sha1(url)}.json
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def today():
+        return datetime.now().strftime('%Y-%m-%d')
+
+    def path_for(self, url, day=None):
+        url_hash = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, day or self.today(), f"{url_hash}.json")
+
+    def get(self, url, day=None):
+        """返回缓存的抓取结果，没有缓存时返回 None。"""
+        path = self.path_for(url, day)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)['result']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable Firecrawl cache entry {path}: {e}")
+            return None
+
+    def put(self, url, result, day=None):
+        path = self.path_for(url, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再替换，并发写入同一 URL 时不会留下半个文件
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'result': result}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def prune(self, keep_days=7):
+        """删除 keep_days 天之前的缓存目录。"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        oldest = (datetime.now() - timedelta(days=keep_days)).strftime('%Y-%m-%d')
+        for day in os.listdir(self.cache_dir):
+            if len(day) == 10 and day < oldest:
+                shutil.rmtree(os.path.join(self.cache_dir, day), ignore_errors=True)
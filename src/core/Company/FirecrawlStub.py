@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import copy
+import glob
+import json
+import os
+import threading
+import time
+
+from src.config import CompanyConfig
+
+
+class FirecrawlStub:
+    """
+    离线的 FirecrawlApp 替身，接口与 FirecrawlApp.scrape_url 一致，用于在没有网络和 API key 的情况下测试爬虫。
+    默认加载 CompanyList/*/data/metaData/*_metaData_*.json 中保存的抓取结果（按 metadata.sourceURL 索引），
+    也可以用 add_page 添加页面；未知 URL 与真实接口一样抛出异常。
+    """
+
+    def __init__(self, pages=None, company_list_dir=CompanyConfig.COMPANY_LIST_DIR, latency=0.0):
+        """
+        :param pages: 额外的页面 {url: 抓取结果}。
+        :param company_list_dir: 从中加载已保存抓取结果的目录，为 None 时不加载。
+        :param latency: 每次调用模拟的网络延迟（秒）。
+        """
+        self.pages = {}
+        self.latency = latency
+        self.calls = []
+        self.lock = threading.Lock()
+        if company_list_dir:
+            self.load_saved_results(company_list_dir)
+        self.pages.update(pages or {})
+
+    def load_saved_results(self, company_list_dir):
+        pattern = os.path.join(company_list_dir, '*', 'data', 'metaData', '*_metaData_*.json')
+        for path in sorted(glob.glob(pattern)):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable Firecrawl result {path}: {e}")
+                continue
+            source_url = (result.get('metadata') or {}).get('sourceURL')
+            if source_url:
+                self.pages[source_url] = result
+
+    def add_page(self, url, html, markdown=''):
+        self.pages[url] = {
+            'markdown': markdown,
+            'html': html,
+            'metadata': {'sourceURL': url, 'statusCode': 200},
+        }
+
+    def scrape_url(self, url, params=None):
+        with self.lock:
+            self.calls.append(url)
+        if self.latency:
+            time.sleep(self.latency)
+        result = self.pages.get(url)
+        if result is None:
+            raise Exception(f"Failed to scrape URL. Status code: 404. Error: {url} not found in FirecrawlStub")
+        result = copy.deepcopy(result)
+        formats = (params or {}).get('formats')
+        if formats:
+            # 与真实接口一样只返回请求的格式
+            for key in ('markdown', 'html'):
+                if key not in formats:
+                    result.pop(key, None)
+        return result
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from src.config import CompanyConfig
+
+
+def host_of(url):
+    """返回 URL 的主机名（小写），用于按主机限流。"""
+    return (urlparse(url).hostname or '').lower()
+
+
+class KeyedLimiter:
+    """
+    按 key（公司名或主机名）限制并发数。
+    try_acquire/release 供调度器非阻塞使用，acquire 上下文管理器供工作线程阻塞使用。
+    """
+
+    def __init__(self, limit):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.limit = limit
+        self.in_flight = {}
+        self.condition = threading.Condition()
+
+    def try_acquire(self, key):
+        with self.condition:
+            if self.in_flight.get(key, 0) >= self.limit:
+                return False
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+            return True
+
+    def release(self, key):
+        with self.condition:
+            count = self.in_flight.get(key, 0) - 1
+            if count > 0:
+                self.in_flight[key] = count
+            else:
+                self.in_flight.pop(key, None)
+            self.condition.notify_all()
+
+    @contextmanager
+    def acquire(self, key):
+        with self.condition:
+            while self.in_flight.get(key, 0) >= self.limit:
+                self.condition.wait()
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            self.release(key)
+
+
+# 进程内共享的主机限流器，控制器和各公司爬虫共用
+shared_host_limiter = KeyedLimiter(CompanyConfig.PER_HOST_CONCURRENCY)
@@ -1,25 +1,55 @@
 # -*- coding: utf-8 -*-
-import json
+import itertools
 import os
 import requests
-import html2text  # 引入 html2text 库
 import time
 import random
+from urllib.parse import urlsplit
 
 from PyPDF2 import PdfReader
+from requests.compat import chardet
+
+from src.config import CompanyConfig
+from src.core.Common import ErrorLog, LogSetup, Metrics, Profiling
+from src.core.Company.Dector.ContentSniffer import SNIFF_BYTES, sniff_file_type
+from src.core.Company.Dector.FileTypeDector import get_default_cache
+from src.core.Company.Processor.HtmlConverter import BoilerplateFilter, html_to_text
+from src.core.Company.Processor.HtmlStore import open_html_store
+
+try:
+    import brotli  # noqa: F401  requests 只有在安装了 brotli 时才能解压 br 编码
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+FILES_PROCESSED = Metrics.counter('company_files_processed_total', "Company URLs processed by file type and result",
+                                  ('file_type', 'result'))
+
+# 可以处理（下载/保存）的文件类型及其保存目录
+SAVED_FILE_DIRS = {
+    'pdf': 'pdf',
+    'ppt': 'ppt',
+    'image': 'image',
+}
 
 
 class FileProcessor:
-    def __init__(self, company_name, url, file_type):
+    def __init__(self, company_name, url, file_type=None):
+        """
+        :param file_type: 预期的文件类型（来自扩展名或类型缓存）。为 None 时根据下载内容嗅探类型。
+        """
         self.company_name = company_name
         self.url = url
         self.file_type = file_type
-        self.base_dir = f"../CompanyList/{self.company_name}/data"
+        # 与爬虫的 metaData 同一个数据目录（CompanyList/{company}/data 或 DATA_DIR），与当前工作目录无关
+        self.base_dir = CompanyConfig.company_data_dir(company_name)
+        # 每条日志带 company 和 url 字段；逐条成功/跳过的消息按 LOG_SAMPLE_EVERY 抽样
+        self.logger = LogSetup.get_logger('FileProcessor', CompanyConfig.LOG_FILE, company=company_name, url=url)
         self.session = requests.Session()  # 使用会话对象
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/93.0.4577.63 Safari/537.36",
             "Accept-Language": "en-US,en;q=0.9",
-            "Accept-Encoding": "gzip, deflate, br",
+            "Accept-Encoding": ACCEPT_ENCODING,
             "Connection": "keep-alive"
         }
         self.session.headers.update(self.headers)  # 在会话中更新头信息
@@ -47,179 +77,153 @@ class FileProcessor:
             "error": error_message
         }
 
-        if os.path.exists(error_file_path):
-            with open(error_file_path, 'r', encoding='utf-8') as error_file:
-                try:
-                    errors = json.load(error_file)
-                except json.JSONDecodeError:
-                    errors = []
-        else:
-            errors = []
-
-        errors.append(error_data)
-
-        with open(error_file_path, 'w', encoding='utf-8') as error_file:
-            json.dump(errors, error_file, ensure_ascii=False, indent=4)
-
-        print(f"Error logged to {error_file_path}")
+        ErrorLog.append(error_file_path, error_data)
+        self.logger.debug(f"Error logged to {error_file_path}")
 
+    @Profiling.span()
     def process(self):
-        """根据文件类型调用不同的处理逻辑。"""
-        if self.file_type == 'pdf':
-            self.process_pdf()
-        elif self.file_type == 'ppt':
-            self.process_ppt()
-        elif self.file_type == "image":
-            self.process_image()
-        elif self.file_type == 'html':
-            self.process_html()
-        else:
-            print(f"Unsupported file type: {self.file_type}")
-
-    def download_file(self, download_dir, file_extension):
-        """下载文件并保存到指定目录，避免重复下载。"""
-        os.makedirs(download_dir, exist_ok=True)
-        file_name = self.url.split('/')[-1]
-        file_path = os.path.join(download_dir, file_name)
-
-        if os.path.exists(file_path):
-            print(f"File already exists, skipping download: {file_path}")
-            return file_path
+        """
+        下载并处理 URL，每个 URL 只请求一次：
+        以流的方式获取响应，根据响应头和前几个字节（魔数）判断真实类型，再把同一个响应流交给对应的处理逻辑。
+        如果预期类型已知且文件已经保存过，则不发请求直接跳过。
+        :return: 该 URL 是否已处理完毕（已保存、此前已保存或类型不支持）；下载或处理失败时返回 False。
+        """
+        if self.file_type is not None:
+            if self.file_type not in SAVED_FILE_DIRS and self.file_type != 'html':
+                self.logger.info("Unsupported file type: %s", self.file_type, extra={'sample': 'unsupported_type'})
+                return True
+            if self.already_saved(self.file_type):
+                return True
 
+        # IP轮换
         self.rotate_ip()
 
+        host = urlsplit(self.url).hostname or ''
+        start = time.perf_counter()
+        response = None
         try:
-            response = self.session.get(self.url)
+            response = self.session.get(self.url, stream=True)
+            # 流式下载：记录到响应头为止的延迟，字节数取 Content-Length
+            Metrics.observe_http(host, response.status_code, time.perf_counter() - start,
+                                 int(response.headers.get('Content-Length') or 0))
             response.raise_for_status()
-
-            with open(file_path, 'wb') as file:
-                file.write(response.content)
-
-            print(f"Downloaded and saved {file_extension.upper()} to: {file_path}")
-            return file_path
-
         except Exception as e:
-            error_message = f"Failed to download {file_extension.upper()} from {self.url}. Error: {e}"
-            print(error_message)
-            self.log_error(error_message)
-            return None
-
-    def process_pdf(self):
-        """处理 PDF 文件：仅下载并保存到公司 PDF 目录。"""
-        download_dir = os.path.join(self.base_dir, 'pdf')
-        pdf_path = self.download_file(download_dir, 'pdf')
-
-        if pdf_path:
-            print(f"PDF successfully downloaded to: {pdf_path}")
-        else:
-            error_message = f"Failed to download PDF from {self.url}."
-            print(error_message)
+            if response is None:
+                Metrics.observe_http(host, 'error', time.perf_counter() - start)
+            FILES_PROCESSED.inc(file_type=self.file_type or 'unknown', result='error')
+            error_message = f"Failed to download {(self.file_type or 'file').upper()} from {self.url}. Error: {e}"
+            self.logger.error(error_message)
             self.log_error(error_message)
+            return False
+
+        with response:
+            chunks = response.iter_content(chunk_size=SNIFF_BYTES)
+            head = next(chunks, b'')
+            content_type = response.headers.get('Content-Type', '')
+            sniffed_type = sniff_file_type(head, content_type, self.url)
+
+            if self.file_type is not None and sniffed_type != self.file_type:
+                self.logger.warning(f"URL {self.url} expected as {self.file_type} but content is {sniffed_type} "
+                                    f"(Content-Type: {content_type})")
+            self.file_type = sniffed_type
+            self.remember_file_type(sniffed_type, content_type)
+
+            body = itertools.chain([head], chunks)
+            if sniffed_type in SAVED_FILE_DIRS:
+                ok = self.already_saved(sniffed_type) or self.save_file(sniffed_type, body) is not None
+            elif sniffed_type == 'html':
+                ok = self.already_saved('html') or self.process_html(response, body)
+            else:
+                self.logger.info("Unsupported file type: %s", sniffed_type, extra={'sample': 'unsupported_type'})
+                ok = True
+            FILES_PROCESSED.inc(file_type=sniffed_type, result='ok' if ok else 'error')
+            return ok
+
+    def remember_file_type(self, file_type, content_type):
+        """把嗅探得到的类型写入类型缓存，下次运行无需再发检测请求。"""
+        try:
+            get_default_cache().put(self.url, file_type, content_type)
+        except Exception as e:
+            self.logger.warning(f"Failed to cache file type for {self.url}: {e}")
 
-
-
-    def process_ppt(self):
-        """
-        处理 PPT 文件：下载并保存到公司 PPT 目录。
-        """
-        download_dir = os.path.join(self.base_dir, 'ppt')
-        self.download_file(download_dir, 'ppt')
-
-    def process_image(self):
-        """
-        处理图像文件：下载并保存到公司图像目录。
-        """
-        download_dir = os.path.join(self.base_dir, 'image')
-        os.makedirs(download_dir, exist_ok=True)
-        file_name = self.url.split('/')[-1]  # 获取文件名
-        file_path = os.path.join(download_dir, file_name)
-
-        # 如果文件已经存在，避免重复下载
+    def file_path_for(self, file_type):
+        """返回某类型文件在公司目录下的保存路径。"""
+        download_dir = os.path.join(self.base_dir, SAVED_FILE_DIRS[file_type])
+        file_name = self.url.split('/')[-1]
+        return os.path.join(download_dir, file_name)
+
+    def already_saved(self, file_type):
+        """检查该 URL 是否已经以给定类型保存过，避免重复下载。"""
+        if file_type == 'html':
+            if self.html_store().contains(self.url):
+                self.logger.info("URL already exists in the HTML store, skipping: %s", self.url,
+                                 extra={'sample': 'already_saved'})
+                return True
+            return False
+        file_path = self.file_path_for(file_type)
         if os.path.exists(file_path):
-            print(f"Image file already exists, skipping download: {file_path}")
-            return
-
-        # IP轮换
-        self.rotate_ip()
-
+            self.logger.info("File already exists, skipping download: %s", file_path, extra={'sample': 'already_saved'})
+            return True
+        return False
+
+    @Profiling.span()
+    def save_file(self, file_type, body):
+        """把响应流写入公司对应类型的目录。"""
+        file_path = self.file_path_for(file_type)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.part"
         try:
-            # 下载图像文件
-            response = self.session.get(self.url)  # 使用 session 发送请求
-            response.raise_for_status()  # 检查响应状态
-
-            # 将图像保存到文件中
-            with open(file_path, 'wb') as file:
-                file.write(response.content)
-
-            print(f"Downloaded and saved image to: {file_path}")
-
+            with open(tmp_path, 'wb') as file:
+                for chunk in body:
+                    file.write(chunk)
+            os.replace(tmp_path, file_path)
+            self.logger.info("Downloaded and saved %s to: %s", file_type.upper(), file_path, extra={'sample': 'file_saved'})
+            return file_path
         except Exception as e:
-            error_message = f"Failed to download image from {self.url}. Error: {e}"
-            print(error_message)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            error_message = f"Failed to download {file_type.upper()} from {self.url}. Error: {e}"
+            self.logger.error(error_message)
             self.log_error(error_message)
+            return None
 
-    def process_html(self):
+    def html_store(self):
+        """返回该公司共享的 HTML 文本存储（html/html_data.sqlite）。"""
+        return open_html_store(os.path.join(self.base_dir, 'html'))
+
+    @staticmethod
+    def decode_html(response, content):
+        """优先使用响应头中的字符集，否则根据内容检测编码。"""
+        encoding = None
+        if 'charset' in response.headers.get('Content-Type', '').lower():
+            encoding = response.encoding
+        if not encoding:
+            encoding = chardet.detect(content[:65536])['encoding'] or 'utf-8'
+        return content.decode(encoding, errors='replace')
+
+    @Profiling.span()
+    def process_html(self, response, body):
         """
-        处理 HTML 文件：将 HTML 转换为纯文本，并保存到公司 HTML 数据 JSON 文件中。
-        如果 'html_data.json' 文件已存在，会加载并检查是否存在重复 URL。
-        如果没有重复，则添加新的 URL 和转换的文本数据。
+        处理 HTML 文件：提取正文并转换为纯文本（去掉导航、页眉页脚及跨页面重复的样板行），追加到公司的 HTML 文本存储中。
+        存储以 URL 为主键，重复的 URL 不会被覆盖；可用 HtmlStore.py 导出为旧的 html_data.json 格式。
+        :return: 是否处理成功。
         """
-        download_dir = os.path.join(self.base_dir, 'html')
-        os.makedirs(download_dir, exist_ok=True)
-        json_file_path = os.path.join(download_dir, 'html_data.json')
-
-        # 初始化用于保存 URL 和文本数据的字典
-        data = {
-            "entries": []
-        }
-
-        # 如果 json 文件已经存在，读取现有数据
-        if os.path.exists(json_file_path):
-            with open(json_file_path, 'r', encoding='utf-8') as json_file:
-                try:
-                    data = json.load(json_file)  # 加载已有数据
-                except json.JSONDecodeError:
-                    print(f"Error decoding JSON from {json_file_path}. Starting with an empty structure.")
-
-        # 检查是否已经存在相同的 URL
-        existing_urls = {entry['url'] for entry in data['entries']}
-        if self.url in existing_urls:
-            print(f"URL already exists in html_data.json, skipping: {self.url}")
-            return
-
-        # IP轮换
-        self.rotate_ip()
-
         try:
-            # 下载 HTML 内容并设置正确的编码
-            response = self.session.get(self.url)  # 使用 session 发送请求
-            response.encoding = response.apparent_encoding  # 使用 requests 的编码检测功能
-            response.raise_for_status()  # 检查响应状态
-            html_content = response.text
-
-            # 使用 html2text 将 HTML 转换为纯文本
-            h = html2text.HTML2Text()
-            h.ignore_links = True  # 忽略超链接
-            text = h.handle(html_content)
-
-
+            html_content = self.decode_html(response, b''.join(body))
 
-            # 将新的 URL 和转换的文本数据添加到现有的数据中
-            new_entry = {
-                "url": self.url,
-                "text": text
-            }
-            data['entries'].append(new_entry)
+            # 提取正文，用共享的 html2text 转换器池转为纯文本，并去掉该公司页面间重复的样板行
+            store = self.html_store()
+            text = html_to_text(html_content, boilerplate=BoilerplateFilter(store))
 
-            # 保存更新后的数据回到 json 文件
-            with open(json_file_path, 'w', encoding='utf-8') as json_file:
-                json.dump(data, json_file, ensure_ascii=False, indent=4)
-
-            print(f"Converted HTML to text and added to JSON at: {json_file_path}")
+            if store.add(self.url, text):
+                self.logger.info("Converted HTML to text and added to %s", store.path, extra={'sample': 'html_added'})
+            else:
+                self.logger.info("URL already exists in the HTML store, skipping: %s", self.url,
+                                 extra={'sample': 'already_saved'})
+            return True
 
         except Exception as e:
             error_message = f"Failed to process HTML from {self.url}. Error: {e}"
-            print(error_message)
+            self.logger.error(error_message)
             self.log_error(error_message)
-
-
+            return False
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import queue
+import re
+import threading
+
+import html2text
+
+try:
+    import lxml.html
+    HAS_LXML = True
+except ImportError:  # lxml 为可选依赖，缺失时使用 BeautifulSoup
+    from bs4 import BeautifulSoup
+    HAS_LXML = False
+
+# 页面框架（导航、页眉页脚等）所用的标签、role 以及 class/id 关键字
+CHROME_TAGS = ('script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'iframe', 'svg', 'button')
+CHROME_ROLES = ('navigation', 'banner', 'contentinfo', 'search', 'menu', 'menubar', 'dialog')
+CHROME_KEYWORDS = re.compile(
+    r'(?:^|[\s_-])(?:nav|navbar|menu|footer|header|breadcrumbs?|cookies?|sidebar|skip|share|social|subscribe|modal)'
+    r'(?:$|[\s_-])', re.IGNORECASE)
+MAIN_XPATHS = ('//main', "//*[@role='main']", '//article', "//*[@id='main' or @id='content' or @id='main-content']")
+
+CONVERTER_OPTIONS = {
+    'ignore_links': True,  # 忽略超链接
+    'ignore_images': True,
+    'body_width': 0,  # 不自动换行，便于逐行识别重复内容
+}
+
+
+class Html2TextPool:
+    """
+    可复用的 html2text 转换器池，转换器数量上限为 size（通常等于工作线程数）。
+    html2text 的实例在一次 handle() 之后会保留上一篇文档的状态，因此归还时就地重新初始化。
+    """
+
+    def __init__(self, size=8, **options):
+        self.options = dict(CONVERTER_OPTIONS, **options)
+        self.size = size
+        self.created = 0
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+
+    def _new_converter(self):
+        converter = html2text.HTML2Text()
+        self._configure(converter)
+        return converter
+
+    def _configure(self, converter):
+        for name, value in self.options.items():
+            setattr(converter, name, value)
+
+    def _reset(self, converter):
+        html2text.HTML2Text.__init__(converter)
+        self._configure(converter)
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                return self._new_converter()
+        return self.idle.get()
+
+    def release(self, converter):
+        self._reset(converter)
+        self.idle.put(converter)
+
+    def convert(self, html):
+        converter = self.acquire()
+        try:
+            return converter.handle(html)
+        finally:
+            self.release(converter)
+
+
+# 正文容器本身以及文档根节点不会被当作框架删除
+CONTENT_TAGS = ('html', 'body', 'main', 'article')
+
+
+def _is_chrome(tag, attrs):
+    if tag in CONTENT_TAGS or (attrs.get('role') or '').lower() == 'main':
+        return False
+    if tag in CHROME_TAGS:
+        return True
+    if (attrs.get('role') or '').lower() in CHROME_ROLES:
+        return True
+    if attrs.get('aria-hidden') == 'true':
+        return True
+    marker = f"{attrs.get('id') or ''} {attrs.get('class') or ''}"
+    return bool(CHROME_KEYWORDS.search(marker))
+
+
+def extract_main_content(html):
+    """
+    去掉导航、页眉页脚、脚本等页面框架，只返回正文部分的 HTML。
+    优先使用 <main>、role=main、<article> 或 id 为 main/content 的元素，否则使用去掉框架后的 <body>。
+    """
+    if not html or not html.strip():
+        return ''
+    if not HAS_LXML:
+        return _extract_main_content_bs4(html)
+
+    try:
+        tree = lxml.html.fromstring(html)
+    except Exception:
+        return html
+
+    for element in list(tree.iter()):
+        # 跳过注释/处理指令，以及已随祖先节点一起删除的元素
+        if not isinstance(element.tag, str) or element.getparent() is None:
+            continue
+        tag = element.tag.lower()
+        if tag in ('header', 'footer') and element.xpath('ancestor::main|ancestor::article'):
+            # 正文内部的 <header>/<footer>（例如文章标题）保留
+            continue
+        if _is_chrome(tag, element.attrib):
+            element.drop_tree()
+
+    for xpath in MAIN_XPATHS:
+        candidates = tree.xpath(xpath)
+        if candidates:
+            return lxml.html.tostring(candidates[0], encoding='unicode')
+    body = tree.find('body')
+    return lxml.html.tostring(body if body is not None else tree, encoding='unicode')
+
+
+def _extract_main_content_bs4(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup.find_all(True):
+        if element.decomposed:
+            continue
+        if element.name in ('header', 'footer') and element.find_parent(['main', 'article']):
+            continue
+        attrs = {
+            'role': element.get('role'),
+            'aria-hidden': element.get('aria-hidden'),
+            'id': element.get('id'),
+            'class': ' '.join(element.get('class') or []),
+        }
+        if _is_chrome(element.name.lower(), attrs):
+            element.decompose()
+    main = (soup.find('main') or soup.find(attrs={'role': 'main'}) or soup.find('article')
+            or soup.find(id=['main', 'content', 'main-content']) or soup.body or soup)
+    return str(main)
+
+
+def line_key(line):
+    """用于跨页统计的行指纹：空白归一化后取哈希。"""
+    normalized = ' '.join(line.split()).lower()
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class InMemoryLineStats:
+    """BoilerplateFilter 的内存统计实现（用于基准测试等），接口与 HtmlStore 中的行统计一致。"""
+
+    def __init__(self):
+        self.pages = 0
+        self.frequencies = {}
+
+    def observe_lines(self, keys):
+        self.pages += 1
+        for key in keys:
+            self.frequencies[key] = self.frequencies.get(key, 0) + 1
+
+    def line_frequencies(self, keys):
+        return {key: self.frequencies[key] for key in keys if key in self.frequencies}
+
+    def page_count(self):
+        return self.pages
+
+
+class BoilerplateFilter:
+    """
+    跨页面的样板内容识别：统计每一行（块）在同一公司多少个页面中出现过，
+    在已见页面数达到 min_pages 之后，出现比例不低于 threshold 的行视为样板并删除。
+    """
+
+    def __init__(self, stats, threshold=0.6, min_pages=5):
+        self.stats = stats
+        self.threshold = threshold
+        self.min_pages = min_pages
+
+    def clean(self, text):
+        lines = text.splitlines()
+        keyed = [(line, line_key(line)) for line in lines]
+        keys = {key for line, key in keyed if line.strip()}
+
+        pages = self.stats.page_count()
+        frequencies = self.stats.line_frequencies(keys) if pages >= self.min_pages else {}
+        self.stats.observe_lines(keys)
+        if not frequencies:
+            return text
+
+        cutoff = self.threshold * pages
+        kept = [line for line, key in keyed if frequencies.get(key, 0) < cutoff]
+        # 合并删除样板后留下的多余空行
+        return re.sub(r'\n{3,}', '\n\n', '\n'.join(kept)).strip() + '\n'
+
+
+_default_pool = Html2TextPool()
+
+
+def html_to_text(html, pool=None, boilerplate=None):
+    """
+    HTML -> 纯文本：提取正文，用转换器池转换，并在提供 boilerplate 时去掉跨页面的样板行。
+    """
+    text = (pool or _default_pool).convert(extract_main_content(html))
+    if boilerplate is not None:
+        text = boilerplate.clean(text)
+    return text
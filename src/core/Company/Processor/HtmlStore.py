@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import os
+import sqlite3
+import threading
+
+from src.config import CompanyConfig
+
+
+class HtmlStore:
+    """
+    单个公司的 HTML 文本存储（SQLite，url -> text），替代整体读写的 html_data.json。
+    - url 为主键，存在性检查为索引查找；
+    - 只追加写入，按插入顺序导出；
+    - WAL 模式 + busy timeout，支持多线程/多进程并发写入。
+    """
+
+    def __init__(self, path, legacy_json=None):
+        """
+        :param path: SQLite 文件路径，例如 CompanyList/Tesla/data/html/html_data.sqlite
+        :param legacy_json: 旧的 html_data.json；当存储为空时自动导入一次。
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL UNIQUE, text TEXT NOT NULL)"
+            )
+            # 跨页面的行频统计，供 HtmlConverter.BoilerplateFilter 识别样板内容
+            self.conn.execute("CREATE TABLE IF NOT EXISTS line_stats (key TEXT PRIMARY KEY, pages INTEGER NOT NULL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+        if legacy_json and len(self) == 0 and os.path.exists(legacy_json):
+            self.import_json(legacy_json)
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def __contains__(self, url):
+        return self.contains(url)
+
+    def contains(self, url):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM pages WHERE url = ?", (url,)).fetchone() is not None
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute("SELECT text FROM pages WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, url, text):
+        """
+        追加一条记录。URL 已存在时不覆盖。
+        :return: 是否实际写入了新记录。
+        """
+        with self.lock, self.conn:
+            cursor = self.conn.execute("INSERT OR IGNORE INTO pages (url, text) VALUES (?, ?)", (url, text))
+        return cursor.rowcount == 1
+
+    def observe_lines(self, keys):
+        """记录一个页面中出现的行指纹（每个页面每行只计一次）。"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO line_stats (key, pages) VALUES (?, 1) ON CONFLICT(key) DO UPDATE SET pages = pages + 1",
+                ((key,) for key in keys),
+            )
+            self.conn.execute(
+                "INSERT INTO stats (name, value) VALUES ('pages', 1) ON CONFLICT(name) DO UPDATE SET value = value + 1"
+            )
+
+    def line_frequencies(self, keys):
+        """返回 {行指纹: 出现过的页面数}，只包含出现过的指纹。"""
+        keys = list(keys)
+        found = {}
+        with self.lock:
+            # 每批不超过 SQLite 默认的参数个数上限
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self.conn.execute(
+                    f"SELECT key, pages FROM line_stats WHERE key IN ({placeholders})", chunk
+                ).fetchall())
+        return found
+
+    def page_count(self):
+        """参与行频统计的页面数。"""
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM stats WHERE name = 'pages'").fetchone()
+        return row[0] if row else 0
+
+    def iter_entries(self, batch_size=500):
+        """按插入顺序逐批返回 {"url", "text"}，不会一次性把所有文本读入内存。"""
+        last_seq = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT seq, url, text FROM pages WHERE seq > ? ORDER BY seq LIMIT ?", (last_seq, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for seq, url, text in rows:
+                yield {"url": url, "text": text}
+            last_seq = rows[-1][0]
+
+    def import_json(self, json_path):
+        """导入旧格式的 html_data.json（{"entries": [{"url", "text"}]}）。"""
+        with open(json_path, 'r', encoding='utf-8') as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                print(f"Error decoding JSON from {json_path}. Nothing imported.")
+                return 0
+        entries = [(entry['url'], entry.get('text', '')) for entry in data.get('entries', [])]
+        with self.lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO pages (url, text) VALUES (?, ?)", entries)
+            imported = self.conn.total_changes - before
+        print(f"Imported {imported} HTML entries from {json_path}")
+        return imported
+
+    def export_json(self, json_path):
+        """导出为旧的 html_data.json 格式，逐条写出以控制内存占用。"""
+        tmp_path = f"{json_path}.tmp"
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('{\n    "entries": [')
+            for entry in self.iter_entries():
+                f.write(',' if count else '')
+                f.write('\n        ' + json.dumps(entry, ensure_ascii=False))
+                count += 1
+            f.write('\n    ]\n}\n')
+        os.replace(tmp_path, json_path)
+        print(f"Exported {count} HTML entries to {json_path}")
+        return count
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_html_store(html_dir):
+    """
+    返回某个公司 html 目录对应的共享 HtmlStore（同一进程内复用同一个连接）。
+    旧的 html_data.json 会在第一次打开时导入。
+    """
+    html_dir = os.path.abspath(html_dir)
+    with _stores_lock:
+        store = _stores.get(html_dir)
+        if store is None:
+            store = HtmlStore(os.path.join(html_dir, 'html_data.sqlite'),
+                              legacy_json=os.path.join(html_dir, 'html_data.json'))
+            _stores[html_dir] = store
+        return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出公司 HTML 文本存储为旧的 html_data.json 格式")
+    parser.add_argument('company', help="公司名称，例如 Tesla")
+    parser.add_argument('--output', help="输出文件，默认写到该公司 html 目录下的 html_data.json")
+    args = parser.parse_args()
+
+    html_dir = os.path.join(CompanyConfig.COMPANY_LIST_DIR, args.company, 'data', 'html')
+    store = open_html_store(html_dir)
+    store.export_json(args.output or os.path.join(html_dir, 'html_data.json'))
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import re
+import string
+from html import unescape
+from urllib.parse import urljoin
+
+from src.core.Common.SeenUrls import normalize_url
+
+# Markdown 链接 [text](url "title") / ![alt](url) 中的 url，以及正文中的裸 URL。
+# 两个表达式都只有单个字符类的重复，没有嵌套的可选分组，扫描时间与文本长度成线性关系。
+MARKDOWN_LINK = re.compile(r'\]\(\s*<?([^\s)>]+)')
+BARE_URL = re.compile(r'https?://[^\s<>"\'()\[\]{}\\|^`]+', re.IGNORECASE)
+TRAILING_PUNCTUATION = '.,;:!?\'"*_~'
+
+# 直接扫描 href/src 属性（带引号或不带引号的值），同样是线性时间；比先用 lxml 解析整棵树再取属性更快。
+# 在小写副本上用以字面量开头的表达式匹配（比 IGNORECASE 快一个数量级），再按位置从原文取值。
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+ATTRIBUTE_VALUE = r'''\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))'''
+ATTRIBUTE_LINKS = tuple(re.compile(name + ATTRIBUTE_VALUE) for name in ('href', 'src'))
+BASE_TAG = re.compile(r'<base\s[^>]*>')
+SCRIPT_OR_STYLE = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.DOTALL)
+
+
+def _attribute_value(html, match):
+    group = next(index for index in (1, 2, 3) if match.start(index) != -1)
+    return unescape(html[match.start(group):match.end(group)])
+
+
+def _scan_html_links(html):
+    lowered = html.lower()
+    if len(lowered) != len(html):  # 个别非 ASCII 字符小写后长度会变，此时只转换 ASCII 字母以保持位置对应
+        lowered = html.translate(ASCII_LOWER)
+    skipped = [match.span() for match in SCRIPT_OR_STYLE.finditer(lowered)]
+    base_tag = BASE_TAG.search(lowered)
+
+    found = []
+    for pattern in ATTRIBUTE_LINKS:
+        for match in pattern.finditer(lowered):
+            start = match.start()
+            # 属性名前必须是分隔符，排除 data-src、xhref 之类的属性
+            if start and (lowered[start - 1].isalnum() or lowered[start - 1] in '-_'):
+                continue
+            if base_tag and base_tag.start() <= start < base_tag.end():
+                continue
+            if any(begin <= start < end for begin, end in skipped):
+                continue
+            found.append((start, _attribute_value(html, match)))
+    found.sort()
+
+    base_href = None
+    if base_tag:
+        match = ATTRIBUTE_LINKS[0].search(lowered, base_tag.start(), base_tag.end())
+        if match:
+            base_href = _attribute_value(html, match)
+    return [value for _, value in found], base_href
+
+
+def html_links(html):
+    """
+    返回 HTML 中所有 href/src 属性值（按出现顺序）以及 <base href>（没有时为 None）。
+    """
+    if not html:
+        return [], None
+    return _scan_html_links(html)
+
+
+def markdown_links(markdown):
+    """返回 Markdown 中的链接地址和裸 URL（按出现顺序）。"""
+    if not markdown:
+        return []
+    links = MARKDOWN_LINK.findall(markdown)
+    links.extend(url.rstrip(TRAILING_PUNCTUATION) for url in BARE_URL.findall(markdown))
+    return links
+
+
+def extract_urls(html=None, markdown=None, base_url=None):
+    """
+    从页面的 HTML（href/src 属性）和 Markdown（链接和裸 URL）中提取 URL，
+    规范化后一次遍历去重，保持首次出现的顺序。
+    :param base_url: 页面地址，用于解析相对链接；HTML 中的 <base href> 优先。
+    """
+    raw_html_links, base_href = html_links(html)
+    html_base = urljoin(base_url, base_href) if base_url and base_href else (base_href or base_url)
+
+    seen = {}
+    for candidates, base in ((raw_html_links, html_base), (markdown_links(markdown), base_url)):
+        for candidate in candidates:
+            url = normalize_url(candidate, base)
+            if url is not None and url not in seen:
+                seen[url] = None
+    return list(seen)
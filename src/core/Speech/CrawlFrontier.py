@@ -0,0 +1,275 @@
+"""
+Priority frontier of the speech crawl: the year index pages and speech pages of one download run, ordered so the
+current year is fetched before historical backfill.
+
+Items are in one of two lanes. The fresh lane holds the current year's index page and its speech pages, plus the
+pages the fast-lane poll of the resident pipeline adds while a crawl runs (SpeechDownloader.poll_fresh). The
+backfill lane holds the older years; in it, speech pages come before index pages (years already started are
+finished first) and newer years before older ones. Workers always take fresh items first, and at most
+backfill_slots workers work on backfill at once, so a worker stays free for fresh items that arrive while a long
+backfill runs.
+
+CrawlFrontier lives in one process for one crawl. SharedFrontier has the same interface on a LeaseQueue, so the
+crawlers of several processes or hosts (WORK_QUEUE=mongo) share one frontier: each page is claimed by one of
+them under a lease, and the pages of a crawler that dies are claimed again by the others once its leases expire.
+"""
+import heapq
+import itertools
+import logging
+import threading
+from collections import namedtuple
+
+from src.core.Common import Metrics
+
+logger = logging.getLogger(__name__)
+
+CLAIMS = Metrics.counter('speech_frontier_claims_total', "Items claimed from the shared crawl frontier",
+                         ('result',))
+
+# Lanes, in priority order
+FRESH = 0
+BACKFILL = 1
+
+# Item kinds: speech pages before index pages of the same lane
+PAGE = 0
+INDEX = 1
+
+# seen_at: Unix time the page was first listed on an index page, carried along for the time-to-availability
+FrontierItem = namedtuple('FrontierItem', ['lane', 'kind', 'year', 'url', 'seen_at'], defaults=(None,))
+
+
+class CrawlFrontier:
+    """Thread-safe priority queue of FrontierItems, finished once every pushed item is done."""
+
+    def __init__(self, backfill_slots):
+        self.backfill_slots = max(1, backfill_slots)
+        self.cond = threading.Condition()
+        self.lanes = {FRESH: [], BACKFILL: []}
+        self.order = itertools.count()
+        self.queued = set()  # URLs pushed during this crawl, so each page is processed once
+        self.pending = 0  # Items pushed and not done yet
+        self.running_backfill = 0
+        self.pushed = 0
+        self.closed = False
+
+    def push(self, lane, kind, year, url, refresh=False, seen_at=None):
+        """
+        Queue url unless it was queued before in this crawl or the crawl is over. Returns True if queued.
+        refresh only matters to SharedFrontier: a CrawlFrontier starts empty with every crawl.
+        """
+        with self.cond:
+            if self.closed or url in self.queued:
+                return False
+            self.queued.add(url)
+            item = FrontierItem(lane, kind, year, url, seen_at)
+            heapq.heappush(self.lanes[lane], (kind, -year, next(self.order), item))
+            self.pending += 1
+            self.pushed += 1
+            self.cond.notify()
+            return True
+
+    def get(self):
+        """
+        The next item to work on, waiting while every queued item is backfill and the backfill slots are taken.
+        None once the crawl is finished or closed.
+        """
+        with self.cond:
+            while not self.closed:
+                if self.lanes[FRESH]:
+                    return heapq.heappop(self.lanes[FRESH])[-1]
+                if self.lanes[BACKFILL] and self.running_backfill < self.backfill_slots:
+                    self.running_backfill += 1
+                    return heapq.heappop(self.lanes[BACKFILL])[-1]
+                if self.pending == 0:
+                    self.closed = True
+                    break
+                self.cond.wait()
+            return None
+
+    def task_done(self, item, processed=True):
+        """processed False (failed) or None (look again later) only matters to SharedFrontier (see there)."""
+        with self.cond:
+            self.pending -= 1
+            if item.lane == BACKFILL:
+                self.running_backfill -= 1
+            if self.pending == 0:
+                self.closed = True  # Nothing queued or running: no item can push more work
+            self.cond.notify_all()
+
+    def settle(self, stored):
+        """Nothing to do: only a SharedFrontier keeps the pages of a crawl until their metadata is stored."""
+
+    def close(self):
+        """Stop handing out items, e.g. after an error; pushes are refused from now on."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def wait_finished(self, timeout):
+        """Wait up to timeout seconds for the crawl to finish or be closed. Returns True once it is."""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.closed, timeout)
+
+    def accepting(self):
+        with self.cond:
+            return not self.closed
+
+
+def queue_item(queue, lane, kind, year, url, refresh=False, seen_at=None):
+    """Push a frontier item to a LeaseQueue, with the priority order of CrawlFrontier (lane, kind, newer year)."""
+    return queue.push(url, {'lane': lane, 'kind': kind, 'year': year, 'seen_at': seen_at},
+                      priority=kind * 10000 - year, group=lane, refresh=refresh)
+
+
+class SharedFrontier:
+    """
+    CrawlFrontier on a LeaseQueue shared with the crawlers of other processes. The crawl is finished once the
+    queue has no item left that is ready or leased, by any crawler. Leases held by this crawler are renewed by a
+    heartbeat thread until their items are done.
+
+    A processed speech page is only staged in the queue: it stays leased to this crawler until settle() is called
+    once its metadata is stored (SpeechDownloader.save_metadata). If the crawler dies before, its lease expires
+    and another crawler claims the page again, so its PDFs and metadata are not lost.
+    """
+
+    def __init__(self, queue, backfill_slots, poll_interval=1.0):
+        self.queue = queue
+        self.backfill_slots = max(1, backfill_slots)
+        self.poll_interval = poll_interval
+        self.cond = threading.Condition()
+        self.leases = {}  # URL -> Lease of the items this crawler works on
+        self.staged = {}  # URL -> Lease of the pages processed, waiting for settle()
+        self.running_backfill = 0
+        self.pushed = 0
+        self.closed = False
+        self.heartbeat = None
+
+    @property
+    def pending(self):
+        return self.queue.outstanding()
+
+    def push(self, lane, kind, year, url, refresh=False, seen_at=None):
+        """
+        Queue url unless any crawler queued it before (refresh=True: unless it is queued or being worked on, for
+        the index pages every crawl fetches again) or this crawl is over. Returns True if queued.
+        """
+        if not self.accepting() or not queue_item(self.queue, lane, kind, year, url, refresh, seen_at):
+            return False
+        with self.cond:
+            self.pushed += 1
+            self.cond.notify()
+        return True
+
+    def get(self):
+        """
+        The next item to work on, polling while nothing is claimable but other crawlers still hold leases (they
+        may push more work or die). None once the crawl is finished or closed.
+        """
+        with self.cond:
+            if self.heartbeat is None:
+                self.heartbeat = threading.Thread(target=self._renew_leases, name='frontier-heartbeat', daemon=True)
+                self.heartbeat.start()
+        # The queue calls are round trips to MongoDB: they run without the lock, so the other crawl threads, the
+        # heartbeat and task_done are not held up by them. A backfill slot is reserved before claiming.
+        while True:
+            with self.cond:
+                if self.closed:
+                    return None
+                backfill = self.running_backfill < self.backfill_slots
+                if backfill:
+                    self.running_backfill += 1
+            lease = self.queue.claim([FRESH, BACKFILL] if backfill else [FRESH])
+            item = None
+            if lease is not None:
+                payload = lease.payload
+                item = FrontierItem(payload['lane'], payload['kind'], payload['year'], lease.key,
+                                    payload.get('seen_at'))
+            with self.cond:
+                if backfill and (item is None or item.lane != BACKFILL or self.closed):
+                    self.running_backfill -= 1
+                if item is not None and not self.closed:
+                    CLAIMS.inc(result='reclaimed' if lease.attempts > 1 else 'claimed')
+                    self.leases[item.url] = lease
+                    return item
+            if item is not None:  # Closed meanwhile: give it back
+                self.queue.release(lease)
+                return None
+            if self.queue.outstanding() == 0:
+                with self.cond:
+                    self.closed = True
+                    self.cond.notify_all()
+                return None
+            with self.cond:
+                if not self.closed:
+                    self.cond.wait(self.poll_interval)
+
+    def task_done(self, item, processed=True):
+        """
+        Mark item done for every crawler; a processed speech page is staged until settle(). An item that failed
+        (processed=False) is marked failed and one to look at again later (None) is forgotten instead; either is
+        queued again when a later crawl's index page lists it, as seen-sets do for a CrawlFrontier.
+        """
+        with self.cond:
+            lease = self.leases.pop(item.url, None)
+            if lease is None:  # Given back by close()
+                return
+            if item.lane == BACKFILL:
+                self.running_backfill -= 1
+            if processed is True and item.kind == PAGE:
+                self.staged[item.url] = lease
+            self.cond.notify_all()
+        if processed is True:
+            kept = self.queue.stage(lease) if item.kind == PAGE else self.queue.complete(lease)
+        else:
+            kept = self.queue.fail(lease) if processed is False else self.queue.discard(lease)
+        if not kept:
+            CLAIMS.inc(result='lost')
+            logger.warning(f"Lease on {item.url} expired before it was done, another crawler claimed it")
+
+    def settle(self, stored):
+        """
+        Finish the staged pages once save_metadata ran: done for every crawler if their metadata was stored,
+        failed otherwise, so the next index page that lists them queues them again.
+        """
+        with self.cond:
+            staged, self.staged = list(self.staged.values()), {}
+            self.cond.notify_all()
+        for lease in staged:
+            if not (self.queue.complete(lease) if stored else self.queue.fail(lease)):
+                CLAIMS.inc(result='lost')
+                logger.warning(f"Lease on {lease.key} expired before its metadata was stored, another crawler "
+                               f"claimed it")
+
+    def close(self):
+        """
+        Stop handing out items; items claimed and not done yet are given back for other crawlers. Staged pages stay
+        leased until settle().
+        """
+        with self.cond:
+            self.closed = True
+            leases, self.leases = list(self.leases.values()), {}
+            self.cond.notify_all()
+        for lease in leases:
+            self.queue.release(lease)
+
+    def accepting(self):
+        with self.cond:
+            return not self.closed
+
+    def wait_finished(self, timeout):
+        with self.cond:
+            return self.cond.wait_for(lambda: self.closed, timeout)
+
+    def _renew_leases(self):
+        """
+        Heartbeat: renew the leases held, staged pages included, three times per lease period, until the crawl is
+        over and settle() was called.
+        """
+        interval = self.queue.lease_seconds / 3
+        while True:
+            with self.cond:
+                if self.cond.wait_for(lambda: self.closed and not self.staged, interval):
+                    return
+                leases = list(self.leases.values()) + list(self.staged.values())
+            if leases:
+                self.queue.renew(leases)
@@ -0,0 +1,188 @@
+import os
+import re
+import shutil
+import logging
+import argparse
+
+import pandas as pd
+
+from src.core.Speech.SpeechMetadataStore import SpeechMetadataStore
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S_%f'
+_FILE_PATTERN = re.compile(r'^(snapshot|changes)_(\d{8}_\d{6}_\d{6})\.parquet$')
+
+
+class MetadataBackup:
+    """
+    Incremental backups of the speech metadata store.
+    Each update that changes something writes a small changelog with the inserted and updated rows,
+    a full snapshot is taken every `snapshot_every` changelogs, and only the newest `keep_snapshots`
+    snapshots (plus the changelogs that follow them) are retained.
+    """
+
+    def __init__(self, backup_folder, snapshot_every=96, keep_snapshots=7):
+        """
+        :param backup_folder: Folder holding the `snapshots/` and `changelog/` sub-folders.
+        :param snapshot_every: Number of changelogs after which a new full snapshot is written.
+        :param keep_snapshots: Number of snapshots to keep. Older snapshots and changelogs are deleted.
+        """
+        if not isinstance(backup_folder, str) or not backup_folder:
+            logger.error("The backup_folder parameter must be a valid directory path.")
+            raise ValueError("The backup_folder parameter must be a valid directory path.")
+        if snapshot_every < 1 or keep_snapshots < 1:
+            raise ValueError("snapshot_every and keep_snapshots must be at least 1.")
+
+        self.backup_folder = backup_folder
+        self.snapshot_dir = os.path.join(backup_folder, 'snapshots')
+        self.changelog_dir = os.path.join(backup_folder, 'changelog')
+        self.snapshot_every = snapshot_every
+        self.keep_snapshots = keep_snapshots
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        os.makedirs(self.changelog_dir, exist_ok=True)
+
+    @staticmethod
+    def _list(directory, kind, until=None):
+        """
+        Return (timestamp, path) pairs of one kind of backup file, oldest first.
+        """
+        entries = []
+        for name in os.listdir(directory):
+            match = _FILE_PATTERN.match(name)
+            if match and match.group(1) == kind and (until is None or match.group(2) <= until):
+                entries.append((match.group(2), os.path.join(directory, name)))
+        return sorted(entries)
+
+    def snapshots(self, until=None):
+        return self._list(self.snapshot_dir, 'snapshot', until)
+
+    def changelogs(self, since=None, until=None):
+        return [(ts, path) for ts, path in self._list(self.changelog_dir, 'changes', until)
+                if since is None or ts > since]
+
+    @staticmethod
+    def _write(df, path):
+        tmp_path = f"{path}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def record(self, inserted_df, updated_df, store):
+        """
+        Record the changes of one update run.
+        Nothing is written when the run neither inserted nor updated rows.
+        :param inserted_df: Rows inserted by the run.
+        :param updated_df: Rows updated by the run (their new values).
+        :param store: The SpeechMetadataStore, used when a snapshot is due.
+        :return: Path of the changelog written, or None for a no-op run.
+        """
+        if inserted_df.empty and updated_df.empty:
+            logger.info("Metadata unchanged. Skipping backup.")
+            return None
+
+        timestamp = pd.Timestamp.now().strftime(TIMESTAMP_FORMAT)
+        changes = [df.assign(op=op) for df, op in ((inserted_df, 'insert'), (updated_df, 'update')) if not df.empty]
+        changes_df = pd.concat(changes, ignore_index=True)
+        changelog_path = os.path.join(self.changelog_dir, f"changes_{timestamp}.parquet")
+        self._write(changes_df, changelog_path)
+        logger.info(f"Wrote metadata changelog with {len(changes_df)} rows to {changelog_path}")
+
+        latest = self.snapshots()
+        pending = self.changelogs(since=latest[-1][0] if latest else None)
+        if not latest or len(pending) >= self.snapshot_every:
+            self.snapshot(store)
+        return changelog_path
+
+    def snapshot(self, store):
+        """
+        Write a full snapshot of the store and apply the retention policy.
+        """
+        timestamp = pd.Timestamp.now().strftime(TIMESTAMP_FORMAT)
+        snapshot_path = os.path.join(self.snapshot_dir, f"snapshot_{timestamp}.parquet")
+        self._write(store.read(), snapshot_path)
+        logger.info(f"Wrote metadata snapshot to {snapshot_path}")
+        self.prune()
+        return snapshot_path
+
+    def prune(self):
+        """
+        Keep the newest `keep_snapshots` snapshots and drop changelogs that predate the oldest one kept.
+        """
+        snapshots = self.snapshots()
+        if len(snapshots) <= self.keep_snapshots:
+            return
+        for _, path in snapshots[:-self.keep_snapshots]:
+            os.remove(path)
+        oldest_kept = snapshots[-self.keep_snapshots][0]
+        removed = 0
+        for ts, path in self.changelogs():
+            if ts <= oldest_kept:
+                os.remove(path)
+                removed += 1
+        logger.info(f"Pruned {len(snapshots) - self.keep_snapshots} snapshots and {removed} changelogs.")
+
+    def replay(self, until=None):
+        """
+        Rebuild the metadata as of `until` (a timestamp string, default: latest) from the newest
+        snapshot not after it plus the changelogs that follow.
+        :return: A normalized metadata DataFrame.
+        """
+        snapshots = self.snapshots(until=until)
+        if snapshots:
+            base_ts, base_path = snapshots[-1]
+            df = pd.read_parquet(base_path)
+        else:
+            base_ts = None
+            df = SpeechMetadataStore.empty_frame()
+
+        frames = [df]
+        for _, path in self.changelogs(since=base_ts, until=until):
+            frames.append(pd.read_parquet(path).drop(columns=['op']))
+
+        # Later rows win: changelog updates overwrite the snapshot values for the same URL
+        combined = SpeechMetadataStore.concat(frames).drop_duplicates(subset='url', keep='last')
+        return combined.reset_index(drop=True)
+
+    def restore(self, target_dir, until=None, force=False):
+        """
+        Restore the metadata store into `target_dir`.
+        :param target_dir: Directory of the store to (re)create.
+        :param until: Optional timestamp string ('YYYYmmdd_HHMMSS_ffffff' or a prefix of it).
+        :param force: Replace an existing non-empty store.
+        :return: Number of rows restored.
+        """
+        if until is not None:
+            # Complete a partial timestamp to the end of the period it names, e.g. '20241014' -> end of that day
+            latest_of_period = '99999999_999999_999999'
+            until = until + latest_of_period[len(until):]
+        df = self.replay(until=until)
+
+        if os.path.isdir(target_dir) and not SpeechMetadataStore(target_dir).is_empty():
+            if not force:
+                raise FileExistsError(f"Metadata store at {target_dir} is not empty. Use force to replace it.")
+            shutil.rmtree(target_dir)
+
+        written = SpeechMetadataStore(target_dir).append(df)
+        logger.info(f"Restored {written} metadata rows into {target_dir}")
+        return written
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    default_base = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'pdfs')
+
+    parser = argparse.ArgumentParser(description="Speech metadata backup tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    restore_parser = subparsers.add_parser('restore', help="Replay snapshot + changelog into a metadata store")
+    restore_parser.add_argument('--backup-folder', default=os.path.join(default_base, 'backup_metadata'))
+    restore_parser.add_argument('--target', default=os.path.join(default_base, 'speech_metadata'))
+    restore_parser.add_argument('--until', help="Restore the state as of this timestamp (YYYYmmdd[_HHMMSS])")
+    restore_parser.add_argument('--force', action='store_true', help="Replace a non-empty target store")
+    args = parser.parse_args()
+
+    if args.command == 'restore':
+        MetadataBackup(args.backup_folder).restore(args.target, until=args.until, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
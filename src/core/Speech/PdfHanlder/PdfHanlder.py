@@ -1,56 +1,111 @@
 # -*- coding: utf-8 -*-
 
 import os
-import fitz  # PyMuPDF
+import time
 import json
-import pandas as pd
 import aiofiles  # For async file operations
 import asyncio
 import logging
 from aiofiles import os as aio_os  # async os operations
 
+from src.config import config
+from src.core.Common import LogSetup, Metrics, Profiling, RunStamp
+
 # 配置日志
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+LogSetup.configure()
+PDFS_EXTRACTED = Metrics.counter('speech_pdfs_extracted_total', "Speech PDFs whose text was extracted")
+PAGE_EXTRACT_SECONDS = Metrics.histogram('pdf_page_extract_seconds', "Text extraction time per PDF page",
+                                         buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+def open_metadata_store(root, **kwargs):
+    """
+    Open the Parquet metadata store. Its module (pandas, pyarrow) is imported here on first use, so runs that
+    have nothing to do do not pay for it.
+    """
+    from src.core.Speech.SpeechMetadataStore import SpeechMetadataStore
+    return SpeechMetadataStore(root, **kwargs)
+
+
+@Profiling.span()
+def extract_pdf(path):
+    """
+    Read the document metadata and the text of every page of a PDF.
+    Raises FileNotFoundError for missing files and fitz errors for unreadable ones.
+    """
+    import fitz  # PyMuPDF, imported on first use like the metadata store
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    with fitz.open(path) as doc:
+        pages = []
+        for page in doc:
+            start = time.perf_counter()
+            pages.append(page.get_text("text"))
+            PAGE_EXTRACT_SECONDS.observe(time.perf_counter() - start)
+        PDFS_EXTRACTED.inc()
+        return {"metadata": doc.metadata, "pages": pages}
+
+
+def metadata_records(metadata_df):
+    """
+    Convert metadata store rows to plain dicts: dates as 'YYYY-MM-DD' strings and missing values as None,
+    the form kept in the JSON documents.
+    """
+    metadata_df = metadata_df.assign(date=metadata_df['date'].dt.strftime('%Y-%m-%d'))
+    return metadata_df.astype(object).where(metadata_df.notna(), None).to_dict('records')
+
+
+def build_document(record, pdf_data):
+    """Combine a metadata record and the extracted PDF into the document stored in MongoDB."""
+    csv_metadata = dict(record)
+    title = csv_metadata.pop('title')
+    return {
+        "title": title,
+        "pdf_metadata": pdf_data['metadata'],
+        "pages": pdf_data['pages'],
+        "csv_metadata": csv_metadata,
+        "type" : "speech"
+    }
+
 
 class PDFHandler:
-    def __init__(self, csv_relative_path):
+    def __init__(self, metadata_relative_path, years=None):
+        """
+        :param metadata_relative_path: Path of the Parquet metadata store, relative to this script or absolute.
+        :param years: Optional list of years to process. Only these partitions are loaded.
+        """
         script_dir = os.path.dirname(os.path.abspath(__file__))
-        self.csv_file = os.path.abspath(os.path.join(script_dir, csv_relative_path))
-        self.base_dir = os.path.dirname(self.csv_file)
+        self.metadata_dir = os.path.abspath(os.path.join(script_dir, metadata_relative_path))
+        self.base_dir = os.path.dirname(self.metadata_dir)
 
-        logging.info(f"CSV file path: {self.csv_file}")
+        logging.info(f"Metadata store path: {self.metadata_dir}")
         logging.info(f"Base directory: {self.base_dir}")
         logging.info(f"Current working directory: {os.getcwd()}")
 
-        if not os.path.exists(self.csv_file):
-            logging.error(f"File not found: {self.csv_file}")
-            raise FileNotFoundError(f"CSV file not found at {self.csv_file}")
+        if not os.path.isdir(self.metadata_dir):
+            logging.error(f"Metadata store not found: {self.metadata_dir}")
+            raise FileNotFoundError(f"Metadata store not found at {self.metadata_dir}")
 
         try:
-            self.csv_data = pd.read_csv(self.csv_file)
-            logging.info("CSV data loaded successfully")
+            self.store = open_metadata_store(self.metadata_dir)
+            self.metadata_df = self.store.read(years=years)
+            logging.info(f"Metadata loaded successfully ({len(self.metadata_df)} rows)")
         except Exception as e:
-            logging.error(f"Error reading CSV file: {e}")
+            logging.error(f"Error reading metadata store: {e}")
             raise
 
+    @Profiling.span()
     async def extract_pdf_metadata(self, file_path):
-        original_cwd = os.getcwd()
         try:
-            os.chdir(self.base_dir)
-            doc = fitz.open(file_path)
-            metadata = doc.metadata
-            pages = [doc.load_page(i).get_text("text") for i in range(doc.page_count)]
-
-            logging.info(f"PDF metadata and text extracted for {file_path}")
-            return {"metadata": metadata, "pages": pages}
+            pdf_data = extract_pdf(os.path.join(self.base_dir, file_path))
+            logging.info("PDF metadata and text extracted for %s", file_path, extra={'sample': 'pdf_extracted'})
+            return pdf_data
         except FileNotFoundError:
             logging.error(f"PDF file not found: {file_path}")
             return None
         except Exception as e:
             logging.error(f"Could not read PDF file {file_path}: {e}")
             return None
-        finally:
-            os.chdir(original_cwd)
 
     async def load_existing_metadata(self, output_file):
         if await aio_os.path.exists(output_file):
@@ -76,38 +131,32 @@ class PDFHandler:
             raise
 
     async def process_all_pdfs(self, output_file):
+        """
+        :return: The number of PDFs that could not be extracted.
+        """
         all_metadata = await self.load_existing_metadata(output_file)
         existing_pdf_paths = {entry.get('csv_metadata', {}).get('file_path', '') for entry in all_metadata}
 
-        for index, row in self.csv_data.iterrows():
-            relative_pdf_path = row['file_path']
+        pending_df = self.metadata_df[~self.metadata_df['file_path'].isin(existing_pdf_paths)]
+        logging.info(f"Skipping {len(self.metadata_df) - len(pending_df)} already processed PDFs")
 
-            if relative_pdf_path in existing_pdf_paths:
-                logging.info(f"Skipping already processed PDF: {relative_pdf_path}")
-                continue
+        failed = 0
+        for row in metadata_records(pending_df):
+            relative_pdf_path = row['file_path']
 
             pdf_data = await self.extract_pdf_metadata(relative_pdf_path)
 
             if pdf_data:
-                csv_metadata = row.to_dict()
-                title = csv_metadata.pop('title')
-
-                combined_metadata = {
-                    "title": title,
-                    "pdf_metadata": pdf_data['metadata'],
-                    "pages": pdf_data['pages'],
-                    "csv_metadata": csv_metadata,
-                    "type" : "speech"
-                }
-
-                all_metadata.append(combined_metadata)
+                all_metadata.append(build_document(row, pdf_data))
             else:
                 logging.error(f"Failed to extract data from PDF: {relative_pdf_path}")
+                failed += 1
 
         await self.save_all_metadata(all_metadata, output_file)
+        return failed
 
     async def validate_pdfs_in_json(self, json_file_path):
-        csv_pdf_paths = self.csv_data['file_path'].tolist()
+        csv_pdf_paths = self.metadata_df['file_path'].tolist()
 
         if not await aio_os.path.exists(json_file_path):
             logging.error(f"JSON file not found: {json_file_path}")
@@ -120,7 +169,7 @@ class PDFHandler:
             logging.error(f"Error reading JSON file: {e}")
             return
 
-        json_pdf_paths = [entry['csv_metadata']['file_path'] for entry in json_data]
+        json_pdf_paths = {entry['csv_metadata']['file_path'] for entry in json_data}
         missing_pdfs = [pdf for pdf in csv_pdf_paths if pdf not in json_pdf_paths]
 
         if not missing_pdfs:
@@ -128,22 +177,39 @@ class PDFHandler:
         else:
             logging.warning(f"Validation failed: The following PDFs are missing in the JSON:\n{missing_pdfs}")
 
-if __name__ == "__main__":
+def main(metadata_relative_path=config.METADATA_STORE_DIR, output_metadata_file=config.EXTRACTED_FILE):
+    """
+    Extract the text of the PDFs in the metadata store into one JSON file for MongoDbManger. Both paths default to
+    the configured data directories (PDF_DIR, EXTRACTED_FILE); relative paths are relative to this script.
+    """
     # 获取当前脚本文件的路径
     script_dir = os.path.dirname(os.path.abspath(__file__))
 
-    # 定义相对路径，并将其转换为绝对路径
-    csv_relative_path = "../../../data/pdfs/speech_metadata.csv"
-    output_metadata_file = "./UploadDb/all_metadata_and_text.json"
-
     # 将相对路径转换为基于脚本的绝对路径
-    csv_absolute_path = os.path.abspath(os.path.join(script_dir, csv_relative_path))
+    metadata_absolute_path = os.path.abspath(os.path.join(script_dir, metadata_relative_path))
     output_metadata_absolute_path = os.path.abspath(os.path.join(script_dir, output_metadata_file))
 
+    # 元数据存储自上次完整运行以来没有变化时直接退出，不加载 pandas / PyMuPDF
+    stamp_path = f"{output_metadata_absolute_path}.stamp"
+    inputs = RunStamp.fingerprint(metadata_absolute_path, '.parquet')
+    if os.path.exists(output_metadata_absolute_path) and RunStamp.is_current(stamp_path, inputs):
+        logging.info("Metadata store unchanged since the last complete run, nothing to extract")
+        return
+
+    with Profiling.profile_run('pdf_handler'):
+        # 创建 PDFHandler 实例
+        handler = PDFHandler(metadata_absolute_path)
 
-    # 创建 PDFHandler 实例
-    handler = PDFHandler(csv_absolute_path)
+        # 运行异步函数
+        failed = asyncio.run(handler.process_all_pdfs(output_metadata_absolute_path))
+        asyncio.run(handler.validate_pdfs_in_json(output_metadata_absolute_path))
+    # 有提取失败的 PDF 时下次运行重试
+    if failed:
+        RunStamp.clear(stamp_path)
+    else:
+        RunStamp.record(stamp_path, inputs)
+    Metrics.write_textfile(Metrics.textfile_path('pdf_handler'))
 
-    # 运行异步函数
-    asyncio.run(handler.process_all_pdfs(output_metadata_absolute_path))
-    asyncio.run(handler.validate_pdfs_in_json(output_metadata_absolute_path))
+
+if __name__ == "__main__":
+    main()
@@ -1,138 +1,199 @@
 import os
+import time
 import json
-import motor.motor_asyncio  # Use motor to replace pymongo for asynchronous operations
-import importlib.util
+import logging
 import asyncio
-from pymongo.errors import BulkWriteError  # 用于捕获批量写入错误
 
-def dynamic_import(module_name, module_path):
-    spec = importlib.util.spec_from_file_location(module_name, module_path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
+from src.config import config  # MongoDB connection settings
+from src.core.Common import LogSetup, Metrics, Profiling, RunStamp
 
-# Dynamically import config.py, used for MongoDB connection settings
-current_script_dir = os.path.dirname(os.path.abspath(__file__))
-config_module_path = os.path.abspath(
-    os.path.join(current_script_dir, '..', '..', '..', '..', 'config', 'config.py')
-)
-
-config = dynamic_import("config", config_module_path)
+LogSetup.configure()
+logger = logging.getLogger('MongoDbManger')
+INSERT_BATCH_SECONDS = Metrics.histogram('mongo_insert_batch_seconds', "Latency of MongoDB insert_many batches")
+DOCUMENTS_INSERTED = Metrics.counter('mongo_documents_inserted_total', "Documents inserted into MongoDB")
+INSERT_FAILURES = Metrics.counter('mongo_insert_failures_total', "MongoDB insert_many batches that failed")
 
 class AsyncMongoDBManager:
-    def __init__(self):
+    def __init__(self, client=None):
+        """
+        :param client: Optional ready AsyncIOMotorClient-compatible client (e.g. a mongomock client in benchmarks).
+        """
         try:
-            # Retrieve MongoDB URI, database name, and collection name from the dynamically imported config
+            # Retrieve MongoDB URI, database name, and collection name from config
             mongo_uri = getattr(config, "MONGO_URI")
             database_name = getattr(config, "DATABASE_NAME")
             collection_name = getattr(config, "COLLECTION_NAME")
 
-            # Print URI for debugging purposes
-            print(f"MongoDB URI: {mongo_uri}", database_name, collection_name)
-
-            # Initialize MongoDB client using motor's AsyncIOMotorClient
-            self.client = motor.motor_asyncio.AsyncIOMotorClient(mongo_uri)
+            # Initialize MongoDB client using motor's AsyncIOMotorClient (imported here: runs with nothing to
+            # upload exit before connecting and do not pay for importing motor / pymongo)
+            if client is None:
+                import motor.motor_asyncio  # Use motor to replace pymongo for asynchronous operations
+                client = motor.motor_asyncio.AsyncIOMotorClient(mongo_uri)
+            self.client = client
             self.db = self.client[database_name]  # Access the database
             self.collection = self.db[collection_name]  # Access the collection
-            print(f"Connected to MongoDB database: {database_name}, collection: {collection_name}")
+            logger.info(f"Connected to MongoDB database: {database_name}, collection: {collection_name}")
 
         except Exception as e:
-            print(f"Failed to connect to MongoDB: {str(e)}")
+            logger.error(f"Failed to connect to MongoDB: {e}")
             self.client = None
 
     async def create_unique_index(self):
         try:
             # 创建 title 字段的唯一索引
             await self.collection.create_index([("title", 1)], unique=True)
-            print("Created unique index on 'title' field.")
+            logger.info("Created unique index on 'title' field.")
         except Exception as e:
-            print(f"Failed to create unique index on 'title': {str(e)}")
+            logger.error(f"Failed to create unique index on 'title': {e}")
 
     async def insert_speech(self, speech_data):
         if not self.client:
-            print("MongoDB client not initialized, cannot insert data.")
+            logger.error("MongoDB client not initialized, cannot insert data.")
             return
         try:
             await self.collection.insert_one(speech_data)
-            print(f"Inserted speech into MongoDB: {speech_data.get('csv_metadata', {}).get('title', 'Unknown Title')}")
+            logger.info("Inserted speech into MongoDB: %s", speech_data.get('csv_metadata', {}).get('title', 'Unknown Title'),
+                        extra={'sample': 'mongo_inserted'})
         except Exception as e:
-            print(f"Error inserting speech: {str(e)}")
+            logger.error(f"Error inserting speech: {e}")
 
+    @Profiling.span()
     async def insert_many_speeches(self, speeches_data):
+        """
+        :return: The number of inserted documents (duplicates of existing titles are skipped),
+                 or None if the insert failed.
+        """
         if not self.client:
-            print("MongoDB client not initialized, cannot insert data.")
-            return
+            logger.error("MongoDB client not initialized, cannot insert data.")
+            return None
+        from pymongo.errors import BulkWriteError  # 用于捕获批量写入错误
+
+        start = time.perf_counter()
         try:
             if speeches_data:
                 # 使用 ordered=False 选项，以便即使某些文档失败，其他文档也会继续插入
                 result = await self.collection.insert_many(speeches_data, ordered=False)
-                print(f"Inserted {len(result.inserted_ids)} speeches into MongoDB.")
+                INSERT_BATCH_SECONDS.observe(time.perf_counter() - start)
+                DOCUMENTS_INSERTED.inc(len(result.inserted_ids))
+                logger.info(f"Inserted {len(result.inserted_ids)} speeches into MongoDB.")
+                return len(result.inserted_ids)
             else:
-                print("No speeches to insert.")
+                logger.info("No speeches to insert.")
+                return 0
         except BulkWriteError as bwe:
+            INSERT_BATCH_SECONDS.observe(time.perf_counter() - start)
             # 捕获批量写入错误，处理违反唯一约束的文档
             write_errors = bwe.details.get('writeErrors', [])
             # 获取成功插入的文档数量
             inserted_count = bwe.details.get('nInserted', 0)
-            print(f"Inserted {inserted_count} speeches before encountering an error.")
+            DOCUMENTS_INSERTED.inc(inserted_count)
+            logger.info(f"Inserted {inserted_count} speeches, {len(write_errors)} rejected.")
 
-            # 输出错误信息，或根据需要做进一步处理
+            # 输出错误信息，或根据需要做进一步处理；只记录标题，不记录整个文档（含全文）
+            failed = False
             for error in write_errors:
+                title = (error.get('op') or {}).get('title')
                 if error.get('code') == 11000:  # 11000 是唯一索引冲突的错误码
-                    print(f"Duplicate entry found for document: {error.get('op')}")
+                    logger.info("Duplicate entry found for document: %s", title, extra={'sample': 'mongo_duplicate'})
                 else:
-                    print(f"Error inserting document: {error}")
+                    logger.error("Error inserting document %s: %s", title, error.get('errmsg'),
+                                 extra={'code': error.get('code')})
+                    failed = True
+            if failed:
+                INSERT_FAILURES.inc()
+                return None
+            return inserted_count
+        except Exception as e:
+            INSERT_FAILURES.inc()
+            logger.error(f"Error inserting speeches: {e}")
+            return None
+
+    async def get_uploaded_file_paths(self):
+        """
+        :return: The set of csv_metadata.file_path values already in the collection, or None on failure.
+        """
+        if not self.client:
+            logger.error("MongoDB client not initialized, cannot retrieve data.")
+            return None
+        try:
+            return set(await self.collection.distinct('csv_metadata.file_path'))
         except Exception as e:
-            print(f"Error inserting speeches: {str(e)}")
+            logger.error(f"Error retrieving uploaded file paths: {e}")
+            return None
 
     async def get_speeches(self, query):
         if not self.client:
-            print("MongoDB client not initialized, cannot retrieve data.")
+            logger.error("MongoDB client not initialized, cannot retrieve data.")
             return []
         try:
             return await self.collection.find(query).to_list(length=100)
         except Exception as e:
-            print(f"Error retrieving speeches: {str(e)}")
+            logger.error(f"Error retrieving speeches: {e}")
             return []
 
     async def close_connection(self):
         # No longer necessary to manually close the connection, motor will handle it automatically
         if self.client:
-            print("MongoDB connection is managed, no need to close manually.")
+            logger.info("MongoDB connection is managed, no need to close manually.")
 
 # Upload JSON data to MongoDB
 async def upload_json_to_mongodb(json_file_path, db_manager):
+    """
+    :return: The number of inserted documents, or None if the file could not be read or the insert failed.
+    """
     try:
         # Load JSON data from the file using UTF-8 encoding
         if os.path.exists(json_file_path):
             with open(json_file_path, 'r', encoding='utf-8') as f:
                 speeches_data = json.load(f)
-                print(f"Loaded {len(speeches_data)} speeches from {json_file_path}")
+                logger.info(f"Loaded {len(speeches_data)} speeches from {json_file_path}")
 
                 # Insert all speeches into MongoDB
-                await db_manager.insert_many_speeches(speeches_data)
+                return await db_manager.insert_many_speeches(speeches_data)
         else:
-            print(f"JSON file not found: {json_file_path}")
+            logger.error(f"JSON file not found: {json_file_path}")
     except Exception as e:
-        print(f"Error uploading JSON data to MongoDB: {str(e)}")
+        logger.error(f"Error uploading JSON data to MongoDB: {e}")
+    return None
 
 
 # 将所有异步操作放在一个函数中，避免多次调用 asyncio.run()
-async def main():
+async def main(json_file_path=None, client=None):
+    """
+    :param json_file_path: The JSON file written by PdfHanlder, config.EXTRACTED_FILE by default.
+    :param client: Optional MongoDB client, see AsyncMongoDBManager.
+    """
     # Path to the JSON file containing speech metadata and text, use absolute path to ensure the file exists
-    json_file_path = os.path.join(current_script_dir, "all_metadata_and_text.json")
+    json_file_path = json_file_path or config.EXTRACTED_FILE
+
+    # Nothing to do if the file was fully uploaded and has not changed since; exit before connecting
+    stamp_path = f"{json_file_path}.uploaded"
+    inputs = RunStamp.fingerprint(json_file_path)
+    if RunStamp.is_current(stamp_path, inputs):
+        logger.info(f"{json_file_path} unchanged since the last upload, nothing to do")
+        return
 
     # Initialize MongoDBManager
-    db_manager = AsyncMongoDBManager()
+    db_manager = AsyncMongoDBManager(client=client)
 
     # Create unique index for 'title' field
     await db_manager.create_unique_index()
 
     # Upload JSON data to MongoDB
-    await upload_json_to_mongodb(json_file_path, db_manager)
+    if await upload_json_to_mongodb(json_file_path, db_manager) is None:
+        RunStamp.clear(stamp_path)
+    else:
+        RunStamp.record(stamp_path, inputs)
 
     # Close connection
     await db_manager.close_connection()
+    Metrics.write_textfile(Metrics.textfile_path('mongo_uploader'))
+
+def cli():
+    """Console entry point: upload the default JSON file once."""
+    with Profiling.profile_run('mongo_uploader'):
+        asyncio.run(main())
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    cli()
@@ -0,0 +1,177 @@
+"""
+Persistent retry queue and dead-letter queue for failed speech PDF downloads.
+
+A failed download is recorded once, with the metadata of its speech page, instead of being retried inline:
+permanent failures (404, 410 and other 4xx answers) go straight to the dead letters, transient ones (5xx, 408,
+429, timeouts, connection and SSL errors) are scheduled for another attempt with exponential backoff and move to
+the dead letters after max_attempts. SpeechDownloader's retry worker re-attempts the entries that are due, so
+download threads never sleep on a retry.
+
+    speech-retries list            # pending retries and dead letters
+    speech-retries requeue --all   # give dead letters another try (e.g. after a site outage)
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+PENDING = 'pending'
+DEAD = 'dead'
+
+# 4xx answers that are worth asking again
+TRANSIENT_STATUSES = {408, 425, 429}
+
+
+def classify(error):
+    """'permanent' or 'transient' for an exception raised while downloading."""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is not None:
+        return 'permanent' if 400 <= status < 500 and status not in TRANSIENT_STATUSES else 'transient'
+    if isinstance(error, (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema,
+                          requests.exceptions.InvalidSchema)):
+        return 'permanent'
+    # Timeouts, connection resets, SSL errors and anything unexpected
+    return 'transient'
+
+
+def describe(error):
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    return f"HTTP {status}" if status is not None else f"{type(error).__name__}: {error}"
+
+
+class RetryQueue:
+    """
+    SQLite table of failed downloads keyed by URL, with their metadata, attempts and next attempt time.
+    Safe to share between threads; WAL mode, so a second process (e.g. speech-retries) can read it meanwhile.
+    """
+
+    def __init__(self, path, base_delay=60, max_delay=6 * 3600, max_attempts=8):
+        self.path = path
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS retries ("
+                "url TEXT PRIMARY KEY, metadata TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL, "
+                "next_attempt REAL, last_error TEXT, first_failed TEXT NOT NULL, last_failed TEXT NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS retries_due ON retries (status, next_attempt)")
+
+    def backoff(self, attempts):
+        """Seconds until attempt attempts + 1: base_delay doubled per attempt, capped, with +-20% jitter."""
+        delay = min(self.max_delay, self.base_delay * 2 ** max(0, attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def record_failure(self, url, metadata, error):
+        """
+        Record a failed download of url with the metadata needed to try again (year, title, author, date).
+        :return: PENDING if another attempt is scheduled, DEAD if the URL went to the dead letters.
+        """
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT attempts, first_failed FROM retries WHERE url = ?", (url,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            if classify(error) == 'permanent' or attempts >= self.max_attempts:
+                status, next_attempt = DEAD, None
+            else:
+                status, next_attempt = PENDING, time.time() + self.backoff(attempts)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO retries (url, metadata, status, attempts, next_attempt, last_error, "
+                "first_failed, last_failed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, json.dumps(metadata), status, attempts, next_attempt, describe(error),
+                 row[1] if row else now, now),
+            )
+        return status
+
+    def due(self, limit=100, now=None):
+        """[(url, metadata)] of the pending entries whose next attempt time has come, oldest first."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, metadata FROM retries WHERE status = ? AND next_attempt <= ? "
+                "ORDER BY next_attempt LIMIT ?", (PENDING, now or time.time(), limit)
+            ).fetchall()
+        return [(url, json.loads(metadata)) for url, metadata in rows]
+
+    def resolve(self, url):
+        """Forget url after a successful download."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM retries WHERE url = ?", (url,))
+
+    def requeue(self, urls=None):
+        """Schedule dead letters (all, or the given URLs) for an attempt now, with a fresh attempt count."""
+        with self.lock, self.conn:
+            if urls is None:
+                cursor = self.conn.execute(
+                    "UPDATE retries SET status = ?, attempts = 0, next_attempt = ? WHERE status = ?",
+                    (PENDING, time.time(), DEAD))
+                return cursor.rowcount
+            return sum(self.conn.execute(
+                "UPDATE retries SET status = ?, attempts = 0, next_attempt = ? WHERE status = ? AND url = ?",
+                (PENDING, time.time(), DEAD, url)).rowcount for url in urls)
+
+    def counts(self):
+        """{PENDING: n, DEAD: n}"""
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM retries GROUP BY status").fetchall()
+        return {PENDING: 0, DEAD: 0, **dict(rows)}
+
+    def entries(self, status=None):
+        """All entries (of one status) as dicts, for inspection."""
+        query = "SELECT url, status, attempts, next_attempt, last_error, first_failed, last_failed FROM retries"
+        params = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY last_failed", params).fetchall()
+        keys = ('url', 'status', 'attempts', 'next_attempt', 'last_error', 'first_failed', 'last_failed')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    from src.config import config
+
+    parser = argparse.ArgumentParser(description="Inspect and requeue failed speech PDF downloads")
+    parser.add_argument('--queue', default=os.path.join(config.PDF_DIR, 'retry_queue.sqlite'))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    list_parser = subparsers.add_parser('list', help="Show pending retries and dead letters")
+    list_parser.add_argument('--status', choices=(PENDING, DEAD))
+    requeue_parser = subparsers.add_parser('requeue', help="Give dead letters another attempt")
+    requeue_parser.add_argument('urls', nargs='*')
+    requeue_parser.add_argument('--all', action='store_true', help="Requeue every dead letter")
+    args = parser.parse_args()
+
+    queue = RetryQueue(args.queue)
+    if args.command == 'list':
+        for entry in queue.entries(args.status):
+            when = (datetime.fromtimestamp(entry['next_attempt']).strftime('%Y-%m-%d %H:%M:%S')
+                    if entry['next_attempt'] else '-')
+            print(f"{entry['status']:<8} {entry['attempts']:>3} next {when}  {entry['last_error']}  {entry['url']}")
+        print(queue.counts())
+    elif args.all or args.urls:
+        print(f"Requeued {queue.requeue(None if args.all else args.urls)} dead letters")
+    else:
+        parser.error("requeue needs URLs or --all")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,36 @@
-import importlib
 import os
 import re
 import logging
-import sys
-import time
 import json
+import time
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
-from logging.handlers import RotatingFileHandler
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from threading import Lock
 
 import requests
-from tqdm import tqdm
-
-from SpeechUpdater import SpeechUpdater  # Import the updater module
-import SpeechParser  # Import the parser module
-
-
-def dynamic_import(module_name, module_path):
-    spec = importlib.util.spec_from_file_location(module_name, module_path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
-
 
-# Assuming the relative path to config.py from the current script
-config_module_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "config", "config.py")
-config = dynamic_import("config", config_module_path)
-
-# Configure logging to file and console
-log_filename = os.path.join(os.path.dirname(__file__), config.LOG_FILE)  # Use relative path for log file
-handler = RotatingFileHandler(log_filename, maxBytes=config.LOG_MAX_BYTES,
-                              backupCount=config.LOG_BACKUP_COUNT)  # Max file size 5MB, keep 3 backups
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-
-# Set handler and formatter
-handler.setFormatter(formatter)
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(formatter)
-
-# Create a global logger
+# SpeechUpdater and SpeechMetadataStore (pandas, pyarrow) and tqdm are imported where they are used, so a run
+# that finds no new speeches does not load them
+from src.config import config
+from src.core.Common import ErrorLog, LeaseQueue, LogSetup, Metrics, Profiling, SeenUrls
+from src.core.Speech import CrawlFrontier, RetryQueue, SpeechParser
+
+PDFS_DOWNLOADED = Metrics.counter('speech_pdfs_downloaded_total', "Speech PDFs downloaded and saved")
+PDF_DOWNLOAD_FAILURES = Metrics.counter('speech_pdf_download_failures_total', "Speech PDFs that failed to download")
+RETRIES = Metrics.counter('speech_pdf_retries_total', "Retried speech PDF downloads by result", ('result',))
+RETRY_QUEUE_ENTRIES = Metrics.gauge('speech_retry_queue_entries', "Entries of the download retry queue by status",
+                                    ('status',))
+FRESH_POLLS = Metrics.counter('speech_fresh_polls_total', "Fast-lane polls of the current year's index by result",
+                              ('result',))
+
+# Point the parser at the configured site root (a local mirror in benchmarks)
+SpeechParser.BASE_URL = config.FED_BASE_URL
+
+# Log to the console and the rotating speech log file, written from the LogSetup listener thread
+LogSetup.configure(config.LOG_FILE, max_bytes=config.LOG_MAX_BYTES, backup_count=config.LOG_BACKUP_COUNT)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
-# Check if logger already has handlers to avoid duplicate logs
-if not logger.hasHandlers():
-    logger.addHandler(handler)
-    logger.addHandler(console_handler)
+RETRY_POLL_SECONDS = 5  # How often the retry thread of a running crawl looks for due retries
 
 def log_error2(error_type, message, url=None, error_file=None):
     error_data = {
@@ -60,67 +44,7 @@ def log_error2(error_type, message, url=None, error_file=None):
     if error_file is None:
         error_file = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'pdfs', 'error2.json')
 
-    # 如果文件存在，则加载现有错误，否则创建新的
-    if os.path.exists(error_file):
-        try:
-            with open(error_file, 'r') as f:
-                errors = json.load(f)
-        except json.JSONDecodeError:
-            errors = []
-    else:
-        errors = []
-
-    errors.append(error_data)
-
-    # 写入错误日志文件
-    with open(error_file, 'w') as f:
-        json.dump(errors, f, indent=4)
-
-
-def retry_download_speech(url, downloader, retries=3, delay=10):
-    """
-    Re-downloads the specified URL using a safer strategy.
-    :param url: The URL to be downloaded
-    :param downloader: SpeechDownloader instance used to save successfully downloaded metadata
-    :param retries: Maximum number of retry attempts
-    :param delay: Delay in seconds between each retry
-    """
-    for attempt in range(retries):
-        try:
-            # Safer strategy: add delay, reduce concurrent requests, etc.
-            logger.info(f"Retrying download (Attempt {attempt + 1}) for URL: {url}")
-            time.sleep(delay)  # Add delay
-            response = SpeechParser.fetch_with_retries(url)  # Use the previous download method
-            if response is None:
-                raise requests.exceptions.RequestException(f"Failed to download: {url}")
-
-            # Assume we can extract the necessary metadata from the original error information
-            title = "Title extracted from error or page"  # Extract title from the error record or re-parse it
-            author = "Author extracted from error or page"  # Extract author from the error record or re-parse it
-            date = "Date extracted from error or page"  # Extract date from the error record or re-parse it
-
-            # Use the downloader's metadata saving logic
-            year = datetime.now().year  # Assume current year
-            year_folder = os.path.join(downloader.base_folder, str(year))
-
-            # Create year folder
-            create_directory_if_not_exists(year_folder)
-
-            # Download and save metadata
-            downloader._download_speech_pdf(url, year, year_folder, title, author, date)
-
-            logger.info(f"Successfully re-downloaded URL: {url}")
-
-            # Exit loop after successful download
-            return
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error re-downloading PDF: {e}")
-            if attempt < retries - 1:
-                logger.info(f"Retrying in {delay} seconds...")
-                delay *= 2  # Increase delay
-            else:
-                logger.error(f"Failed to download URL after {retries} attempts: {url}")
+    ErrorLog.append(error_file, error_data)
 
 
 class SpeechDownloader:
@@ -129,36 +53,85 @@ class SpeechDownloader:
     It will attempt to download speeches from the specified start year to the present, retrying failed downloads.
     """
 
-    STATE_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'pdfs', 'download_state.json')
-
-    def __init__(self, base_folder=os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'pdfs'),
-                 start_year=config.START_YEAR):
+    def __init__(self, base_folder=config.PDF_DIR, start_year=config.START_YEAR, work_queue=None):
+        """
+        :param work_queue: LeaseQueue shared with the downloaders of other processes or hosts, which then split
+            the crawl between them (see CrawlFrontier.SharedFrontier). Default: from config.WORK_QUEUE, where
+            'local' (no sharing) gives None.
+        """
+        self.work_queue = work_queue if work_queue is not None else open_work_queue()
         self.base_folder = os.path.abspath(base_folder)
+        self.state_file = os.path.join(self.base_folder, 'download_state.json')
+        self.error_file = os.path.join(self.base_folder, 'errors.json')
         self.start_year = start_year
         self.speech_metadata = []
         self.downloaded_files = set()
         self.lock = Lock()
+        self.parse_executor = None  # Optional process pool for HTML parsing, see config.PARSE_PROCESSES
+        # Optional callback(metadata, seen_at), called from the download threads per saved PDF; seen_at is the Unix
+        # time its speech page was first listed on an index page, None for retried downloads
+        self.on_pdf_saved = None
+        self.frontier = None  # (Shared)CrawlFrontier of the running download_speeches_parallel, for poll_fresh
+        self.unsettled_frontier = None  # Frontier of the last crawl, whose pages save_metadata settles
+        self.failed_pages = 0  # Index and speech pages that failed in the running (or last) crawl
+        self.crawled_year = None  # Year the last crawl got up to, saved as last_year by save_metadata
 
         # Ensure the base folder exists
         create_directory_if_not_exists(self.base_folder)
 
-        # Initialize downloaded_files with existing files
+        # Initialize downloaded_files with existing files (paths relative to base_folder, as checked on download)
         for root, dirs, files in os.walk(self.base_folder):
             for file in files:
                 if file.endswith('.pdf'):
-                    self.downloaded_files.add(os.path.join(root, file))
+                    self.downloaded_files.add(os.path.relpath(os.path.join(root, file), self.base_folder))
+
+        # Persistent seen-sets keyed by normalized URL: PDFs already saved and speech pages fully processed
+        seen_folder = os.path.join(self.base_folder, 'seen')
+        self.seen_pdfs = SeenUrls.open_seen_set(os.path.join(seen_folder, 'speech_pdfs'))
+        self.seen_pages = SeenUrls.open_seen_set(os.path.join(seen_folder, 'speech_pages'))
+        # URLs done in this run that only join the seen-sets once save_metadata stored their metadata
+        self.pending_pdfs = set()
+        self.pending_pages = set()
+        # Speech pages that listed no PDF yet: the next crawl looks at them again, the fast-lane poll does not
+        self.no_pdf_pages = set()
+        # Unix time the fast-lane poll first listed each speech page that was still new at its last poll
+        self.first_seen = {}
+        if len(self.seen_pdfs) == 0:
+            self.seed_seen_pdfs()
+
+        # Failed PDF downloads, retried by the retry thread of the next runs (see RetryQueue)
+        self.retry_queue = RetryQueue.RetryQueue(os.path.join(self.base_folder, 'retry_queue.sqlite'),
+                                                 base_delay=config.RETRY_BASE_DELAY, max_delay=config.RETRY_MAX_DELAY,
+                                                 max_attempts=config.RETRY_MAX_ATTEMPTS)
 
         # Load the last download state
         self.last_year = self.load_last_year()
 
+    def seed_seen_pdfs(self):
+        """
+        Fill an empty PDF seen-set from the URLs in the metadata store, so the first run with the
+        seen-set does not download every PDF again.
+        """
+        from src.core.Speech.SpeechMetadataStore import SpeechMetadataStore
+
+        store = SpeechMetadataStore(os.path.join(self.base_folder, 'speech_metadata'),
+                                    legacy_csv=os.path.join(self.base_folder, 'speech_metadata.csv'))
+        if store.is_empty():
+            return
+        urls = store.read(columns=['url'])['url'].dropna()
+        added = self.seen_pdfs.add_many(urls)
+        logger.info(f"Seeded the PDF seen-set with {len(added)} URLs from the metadata store")
+
     def load_last_year(self):
         """
-        Load the last downloaded year from the state file.
+        Load the last downloaded year from the state file (from the work queue when it is shared).
         If the file does not exist, return the start_year from the config.
         """
-        if os.path.exists(self.STATE_FILE):
+        if self.work_queue is not None:
+            return self.work_queue.get_state('last_year', self.start_year)
+        if os.path.exists(self.state_file):
             try:
-                with open(self.STATE_FILE, 'r') as f:
+                with open(self.state_file, 'r') as f:
                     state = json.load(f)
                     return state.get('last_year', self.start_year)
             except json.JSONDecodeError:
@@ -168,169 +141,359 @@ class SpeechDownloader:
 
     def save_last_year(self, year):
         """
-        Save the last successfully downloaded year to the state file.
+        Save the last successfully downloaded year to the state file (to the work queue when it is shared).
         """
-        with open(self.STATE_FILE, 'w') as f:
+        if self.work_queue is not None:
+            self.work_queue.set_state('last_year', year)
+            return
+        with open(self.state_file, 'w') as f:
             json.dump({'last_year': year}, f)
 
     def download_speeches_parallel(self):
+        """
+        Crawl the years from last_year to the current one through a CrawlFrontier: the current year's index and
+        speech pages first, older years (backfill) with the capacity left, see CrawlFrontier. With a shared work
+        queue, the downloaders running at the same time split the pages between them.
+        """
+        from tqdm import tqdm
+
+        current_year = datetime.now().year
+        backfill_slots = config.MAX_WORKERS - config.FRESH_RESERVED_WORKERS
+        if self.work_queue is not None:
+            frontier = CrawlFrontier.SharedFrontier(self.work_queue, backfill_slots)
+        else:
+            frontier = CrawlFrontier.CrawlFrontier(backfill_slots)
+        for year in range(self.last_year, current_year + 1):
+            lane = CrawlFrontier.FRESH if year >= current_year else CrawlFrontier.BACKFILL
+            # Index pages are fetched by every crawl; speech pages only once (unless seen-set entries are removed)
+            frontier.push(lane, CrawlFrontier.INDEX, year, SpeechParser.year_index_url(year), refresh=True)
+        self.failed_pages = 0
+        self.crawled_year = None
         try:
             logger.info("Starting download_speeches_parallel")
-            with ThreadPoolExecutor(max_workers=config.MAX_WORKERS) as executor:
-                current_year = datetime.now().year
-                years = range(self.last_year, current_year + 1)  # Start from the last downloaded year
-                with tqdm(total=len(years)) as pbar:
-                    for year in years:
-                        year_folder = os.path.join(self.base_folder, str(year))
-                        create_directory_if_not_exists(year_folder)
-                        executor.submit(self._process_year, year, year_folder)
-                        pbar.update(1)
-                        self.save_last_year(year)  # Save the progress after processing each year
+            if config.PARSE_PROCESSES > 0:
+                # Parse pages in separate processes so parsing does not hold the GIL against the download threads
+                self.parse_executor = ProcessPoolExecutor(max_workers=config.PARSE_PROCESSES)
+            self.frontier = frontier
+            self.unsettled_frontier = frontier
+            # The bar counts index and speech pages; its total grows as the index pages list more
+            with tqdm(total=frontier.pushed, unit='page') as pbar, \
+                    ThreadPoolExecutor(max_workers=config.MAX_WORKERS + 1) as executor:
+                workers = [executor.submit(self._crawl_worker, frontier, pbar) for _ in range(config.MAX_WORKERS)]
+                # One more thread re-attempts failed downloads, so the crawl threads never wait for a retry
+                workers.append(executor.submit(self._retry_worker, frontier))
+                for worker in as_completed(workers):
+                    worker.result()
+            # Every year up to now was crawled; an interrupted run, one with failed pages or one whose metadata is
+            # not stored starts over from the old last_year, and the seen-sets make its finished pages cheap to skip
+            failed = self.failed_pages if self.work_queue is None else self.work_queue.failed()
+            if failed:
+                logger.warning(f"{failed} pages failed, last_year stays {self.last_year} to crawl them again")
+            else:
+                self.crawled_year = current_year
         except Exception as e:
             logger.error(f"Unexpected error during parallel speech download: {e}", exc_info=True)
-
-    def _process_year(self, year, year_folder):
+        finally:
+            frontier.close()
+            self.frontier = None
+            if self.parse_executor is not None:
+                self.parse_executor.shutdown()
+                self.parse_executor = None
+
+    def _crawl_worker(self, frontier, pbar):
+        """Download thread: work on frontier items by priority until the crawl is finished."""
+        while True:
+            item = frontier.get()
+            if item is None:
+                return
+            processed = False
+            try:
+                year_folder = os.path.join(self.base_folder, str(item.year))
+                if item.kind == CrawlFrontier.INDEX:
+                    processed = self._process_year(item, year_folder, frontier)
+                else:
+                    processed = self._process_speech_page(item.url, item.year, year_folder, item.seen_at)
+            except Exception:
+                frontier.close()
+                raise
+            finally:
+                if processed is False:
+                    with self.lock:
+                        self.failed_pages += 1
+                frontier.task_done(item, processed)
+                pbar.total = frontier.pushed
+                pbar.update(1)
+
+    @Profiling.span()
+    def _process_year(self, item, year_folder, frontier):
+        """Fetch the index page of item.year and queue its speech pages in the same lane. False if it failed."""
+        year = item.year
         try:
-            speech_page_links = SpeechParser.fetch_speech_links_for_year(year)
+            create_directory_if_not_exists(year_folder)
+            speech_page_links = SpeechParser.fetch_speech_links_for_year(year, executor=self.parse_executor)
+            listed_at = time.time()
             total_links = len(speech_page_links)  # 获取该年份下的URL数量
             logger.info(f"Year {year} has {total_links} speech page links.")
             if total_links == 0:
                 logger.info(f"No speech page links found for year {year}.")
-                return
+                return True
 
+            first_seen = self.first_seen
             for speech_page_url in speech_page_links:
-                full_page_url = f"https://www.federalreserve.gov{speech_page_url}"
-                self._process_speech_page(full_page_url, year, year_folder)
+                full_page_url = f"{SpeechParser.BASE_URL}{speech_page_url}"
+                frontier.push(item.lane, CrawlFrontier.PAGE, year, full_page_url,
+                              seen_at=first_seen.get(full_page_url, listed_at))
+            return True
         except Exception as e:
             error_message = f"Failed to fetch speech links for year {year}: {e}"
             logger.error(error_message, exc_info=True)
-            log_error("Fetch speech links error", error_message,
-                      url=f"https://www.federalreserve.gov/speeches-{year}.htm")
+            log_error("Fetch speech links error", error_message, url=item.url, error_file=self.error_file)
+            return False
 
-    def _process_speech_page(self, page_url, year, year_folder):
+    def poll_fresh(self):
+        """
+        Fast lane: fetch the current year's index page (a conditional request, so an unchanged page costs a 304)
+        and look for speech pages that were not processed yet, leaving out those that listed no PDF when they were
+        fetched. While a crawl runs they join its frontier ahead of any backfill.
+        :return: Number of new speech pages that need a crawl, i.e. that were found while none was running.
+        """
+        year = datetime.now().year
+        html = SpeechParser.fetch_html_if_modified(SpeechParser.year_index_url(year))
+        if not html:  # Unchanged since the last poll, or the request failed
+            FRESH_POLLS.inc(result='unchanged' if html == b'' else 'error')
+            return 0
+        listed_at = time.time()
+        page_urls = [f"{SpeechParser.BASE_URL}{link}" for link in SpeechParser.parse_speech_links(html)]
+        new_pages = [url for url in page_urls if not self._page_seen(url) and url not in self.no_pdf_pages]
+        FRESH_POLLS.inc(result='new' if new_pages else 'nothing_new')
+        # Keep the time of the first poll that listed a page until a poll finds it processed, for the crawl to use
+        first_seen = {url: self.first_seen.get(url, listed_at) for url in new_pages}
+        self.first_seen = first_seen
+        frontier = self.frontier
+        if new_pages and frontier is not None and frontier.accepting():
+            queued = sum(frontier.push(CrawlFrontier.FRESH, CrawlFrontier.PAGE, year, url, seen_at=first_seen[url])
+                         for url in new_pages)
+            logger.info(f"Fast lane: {len(new_pages)} new speech pages for {year}, {queued} added to the running crawl")
+            return 0
+        if new_pages and self.work_queue is not None:
+            # Pages another downloader queued (or processed) already are its work, not a reason for a crawl here
+            return sum(CrawlFrontier.queue_item(self.work_queue, CrawlFrontier.FRESH, CrawlFrontier.PAGE, year, url,
+                                                seen_at=first_seen[url])
+                       for url in new_pages)
+        return len(new_pages)
+
+    def _process_speech_page(self, page_url, year, year_folder, seen_at=None):
+        """
+        Download the PDFs of a speech page. Returns True once the page is processed (now or before), None if it
+        lists no PDF (yet) and False if it failed.
+        :param seen_at: Unix time the page was first listed on an index page, passed on to on_pdf_saved.
+        """
+        seen = self._page_seen(page_url)
+        Metrics.observe_cache('seen_pages', seen)
+        if seen:
+            logger.info("Speech page already processed, skipping: %s", page_url, extra={'sample': 'page_seen'})
+            return True
         try:
-            pdf_links, title, author, date = SpeechParser.fetch_pdf_links_from_speech_page(page_url)
+            pdf_links, title, author, date = SpeechParser.fetch_pdf_links_from_speech_page(page_url,
+                                                                                           executor=self.parse_executor)
             if not pdf_links:
                 error_message = f"No PDF links found for page: {page_url}"
                 logger.info(error_message)
-                log_error("No PDF links", error_message, url=page_url)
-                return
+                log_error("No PDF links", error_message, url=page_url, error_file=self.error_file)
+                with self.lock:
+                    self.no_pdf_pages.add(page_url)
+                return None
 
             # Format the date to 'YYYY-MM-DD' from 'December 05, 2023'
             date = self.format_date(date)
 
-            # Download matching PDF files
+            # Download matching PDF files; the ones that fail are owned by the retry queue from now on
             for pdf_url in pdf_links:
                 if pdf_url.startswith("/"):
-                    pdf_url = f"https://www.federalreserve.gov{pdf_url}"
-                self._download_speech_pdf(pdf_url, year, year_folder, title, author, date)
+                    pdf_url = f"{SpeechParser.BASE_URL}{pdf_url}"
+                self._download_speech_pdf(pdf_url, year, year_folder, title, author, date, seen_at)
+
+            # Skipped on later runs: its failed PDFs are retried on the retry queue's schedule, not with the page
+            with self.lock:
+                self.pending_pages.add(page_url)
+                self.no_pdf_pages.discard(page_url)
+            return True
         except Exception as e:
             error_message = f"Error processing speech page {page_url}: {e}"
             logger.error(error_message, exc_info=True)
-            log_error("Process speech page error", error_message, url=page_url)
+            log_error("Process speech page error", error_message, url=page_url, error_file=self.error_file)
+            return False
 
-    def _download_speech_pdf(self, url, year, year_folder, title, author, date, retries=5, delay=5, backoff_factor=2):
+    @Profiling.span()
+    def _download_speech_pdf(self, url, year, year_folder, title, author, date, seen_at=None):
         """
-        Download a PDF file with a retry mechanism and improved SSL error handling.
+        Download a PDF file once. A failed download is handed to the retry queue with the speech metadata
+        (transient errors get another attempt later, permanent ones become dead letters) instead of being
+        retried here, so the download thread moves on right away.
         :param url: PDF file URL.
         :param year: Year of the speech.
         :param year_folder: Folder to save the PDF.
         :param title: Title of the speech.
         :param author: Author of the speech.
         :param date: Date of the speech.
-        :param retries: Number of retry attempts.
-        :param delay: Initial delay in seconds between retries.
-        :param backoff_factor: Factor by which delay increases after each retry.
+        :param seen_at: Unix time the speech page was first listed, for on_pdf_saved.
+        :return: True if the PDF is saved (now or on an earlier run), False if the download failed.
         """
-        for attempt in range(retries):
-            try:
-                logger.info(f"Attempting to download PDF (Attempt {attempt + 1}): {url}")
-                response = SpeechParser.fetch_with_retries(url)  # Use your fetch method here
-                if response is None:
-                    raise requests.exceptions.RequestException(f"Failed to download PDF: {url}")
-
-                clean_title = re.sub(r'[\\/*?:"<>|]', "", title)[:50]
-                if not clean_title:
-                    clean_title = os.path.basename(url).split(".pdf")[0]
-
-                filename = f"{clean_title}_{date}.pdf"
-
-                # Concatenate absolute path
-                absolute_save_path = os.path.join(year_folder, filename)
-
-                # Keep the relative path relative to base_folder
-                save_path = os.path.relpath(absolute_save_path, self.base_folder)
+        seen = self._pdf_seen(url)
+        Metrics.observe_cache('seen_pdfs', seen)
+        if seen:
+            logger.info("PDF already downloaded, skipping: %s", url, extra={'sample': 'pdf_seen'})
+            return True
 
-                with self.lock:
-                    if save_path in self.downloaded_files:
-                        logger.info(f"Speech {filename} already exists. Skipping download.")
-                        return
-                    self.downloaded_files.add(save_path)
-
-                if not os.path.exists(absolute_save_path):
-                    with open(absolute_save_path, 'wb') as f:
-                        f.write(response.content)
-                    logger.info(f"Downloaded and saved speech to {save_path}")
-
-                metadata = {
-                    'url': url,
-                    'year': year,
-                    'title': title,
-                    'author': author,
-                    'date': date,
-                    'file_path': save_path,
-                }
-
-                with self.lock:
-                    self.speech_metadata.append(metadata)
-
-                # If download is successful, break out of the retry loop
-                return
-
-            except requests.exceptions.SSLError as ssl_err:
-                error_message = f"SSL error occurred on attempt {attempt + 1} for URL '{url}': {ssl_err}"
-                logger.warning(error_message)
-                if attempt < retries - 1:
-                    logger.info(f"Retrying in {delay} seconds...")
-                    time.sleep(delay)
-                    delay *= backoff_factor  # Exponentially increase delay on each retry
-                else:
-                    logger.error(f"Failed to download PDF after {retries} attempts due to SSL error: {url}")
-                    log_error("PDF download failed due to SSL error", error_message, url=url)
-
-            except requests.exceptions.RequestException as e:
-                error_message = f"Error downloading PDF: {e}"
-                logger.error(error_message)
-                if attempt < retries - 1:
-                    logger.info(f"Retrying in {delay} seconds...")
-                    time.sleep(delay)
-                    delay *= backoff_factor  # Exponentially increase delay on each retry
-                else:
-                    logger.error(f"Failed to download PDF after {retries} attempts: {url}")
-                    log_error("PDF download failed", error_message, url=url)
+        try:
+            logger.debug("Attempting to download PDF: %s", url)
+            response = SpeechParser.fetch_once(url)
+        except requests.exceptions.RequestException as e:
+            PDF_DOWNLOAD_FAILURES.inc()
+            status = self.retry_queue.record_failure(url, {'year': year, 'title': title, 'author': author,
+                                                           'date': date}, e)
+            if status == RetryQueue.DEAD:
+                error_message = f"Error downloading PDF, moved to the dead letters: {RetryQueue.describe(e)}"
+                logger.error(f"{error_message}: {url}")
+                log_error("PDF download failed", error_message, url=url, error_file=self.error_file)
+            else:
+                logger.warning(f"Error downloading PDF, scheduled for a retry: {RetryQueue.describe(e)}: {url}")
+            return False
+
+        clean_title = re.sub(r'[\\/*?:"<>|]', "", title)[:50]
+        if not clean_title:
+            clean_title = os.path.basename(url).split(".pdf")[0]
+
+        filename = f"{clean_title}_{date}.pdf"
+
+        # Concatenate absolute path
+        absolute_save_path = os.path.join(year_folder, filename)
+
+        # Keep the relative path relative to base_folder
+        save_path = os.path.relpath(absolute_save_path, self.base_folder)
+
+        with self.lock:
+            exists = save_path in self.downloaded_files
+            self.downloaded_files.add(save_path)
+
+        if exists:
+            # Saved before under another URL, or by a run whose metadata never reached the store: record it only
+            logger.info("Speech %s already exists, skipping download", filename, extra={'sample': 'pdf_exists'})
+        elif not os.path.exists(absolute_save_path):
+            # The index page of the year may have been fetched by another downloader (SharedFrontier)
+            os.makedirs(year_folder, exist_ok=True)
+            with open(absolute_save_path, 'wb') as f:
+                f.write(response.content)
+            logger.info("Downloaded and saved speech to %s", save_path, extra={'sample': 'pdf_saved'})
+
+        metadata = {
+            'url': url,
+            'year': year,
+            'title': title,
+            'author': author,
+            'date': date,
+            'file_path': save_path,
+        }
+
+        with self.lock:
+            self.speech_metadata.append(metadata)
+            self.pending_pdfs.add(url)
+        if exists:
+            return True
+        PDFS_DOWNLOADED.inc()
+        if self.on_pdf_saved is not None:
+            self.on_pdf_saved(metadata, seen_at)
+        return True
+
+    def retry_due(self, limit=100):
+        """
+        Re-attempt the downloads of the retry queue whose next attempt time has come, with the metadata recorded
+        when they failed. Returns the number of PDFs saved.
+        """
+        saved = 0
+        for url, metadata in self.retry_queue.due(limit):
+            if not self._pdf_seen(url):
+                year = metadata['year']
+                year_folder = os.path.join(self.base_folder, str(year))
+                if not self._download_speech_pdf(url, year, year_folder, metadata['title'], metadata['author'],
+                                                 metadata['date']):
+                    RETRIES.inc(result='failed')
+                    continue
+                saved += 1
+                RETRIES.inc(result='saved')
+                logger.info(f"Retried download succeeded: {url}")
+            self.retry_queue.resolve(url)
+        return saved
+
+    def retries_due(self):
+        """True if a failed download is due for another attempt and no crawl (whose retry thread takes it) runs."""
+        return self.frontier is None and bool(self.retry_queue.due(limit=1))
+
+    def _retry_worker(self, frontier):
+        """Retry thread of a download run: works off the due retries while the crawl runs."""
+        while True:
+            self.retry_due()
+            if frontier.wait_finished(RETRY_POLL_SECONDS):
+                break
+        counts = self.retry_queue.counts()
+        for status, count in counts.items():
+            RETRY_QUEUE_ENTRIES.set(count, status=status)
+        if any(counts.values()):
+            logger.info(f"Retry queue: {counts[RetryQueue.PENDING]} pending, {counts[RetryQueue.DEAD]} dead letters")
+
+    def _pdf_seen(self, url):
+        return url in self.seen_pdfs or url in self.pending_pdfs
+
+    def _page_seen(self, url):
+        return url in self.seen_pages or url in self.pending_pages
 
     def save_metadata(self):
+        """
+        Merge the metadata of the saved PDFs into the metadata store. Only once it is stored do their URLs, and
+        those of the pages processed since the last save, join the seen-sets and does last_year move to the
+        crawled year: after a failed write the next run fetches them again. Returns the merge counts, or None if
+        the write failed.
+        """
+        with self.lock:
+            pdf_urls, page_urls = self.pending_pdfs, self.pending_pages
+            self.pending_pdfs, self.pending_pages = set(), set()
+            frontier, self.unsettled_frontier = self.unsettled_frontier, None
+        if not self.speech_metadata:
+            # Nothing new: the metadata store stays as it is and pandas is never imported
+            logger.info("No new speeches, metadata store unchanged")
+            self._mark_stored(set(), page_urls, frontier)
+            return {'inserted': 0, 'updated': 0, 'unchanged': 0}
         try:
             logger.info("Saving metadata using updater...")
+            from src.core.Speech.SpeechUpdater import SpeechUpdater
 
-            # Sort metadata by 'date', treating None as an empty string (earliest date)
-            self.speech_metadata.sort(key=lambda x: x['date'] if x['date'] is not None else '')
-
-            # Deduplicate metadata by 'title'
-            seen_titles = set()
-            unique_metadata = []
-            for item in self.speech_metadata:
-                if item['title'] not in seen_titles:
-                    unique_metadata.append(item)
-                    seen_titles.add(item['title'])
-
-            # Use SpeechUpdater to update and save metadata after sorting and deduplication
-            metadata_file = os.path.join(self.base_folder, 'speech_metadata.csv')
+            # SpeechUpdater sorts by date, deduplicates by title and URL and merges in one vectorized pass
+            metadata_file = os.path.join(self.base_folder, 'speech_metadata')
+            legacy_csv = os.path.join(self.base_folder, 'speech_metadata.csv')
             backup_folder = os.path.join(self.base_folder, 'backup_metadata')
-            updater = SpeechUpdater(metadata_file=metadata_file, backup_folder=backup_folder)
-            updater.update(unique_metadata)
+            updater = SpeechUpdater(metadata_file=metadata_file, backup_folder=backup_folder, legacy_csv=legacy_csv,
+                                    snapshot_every=config.BACKUP_SNAPSHOT_EVERY,
+                                    keep_snapshots=config.BACKUP_KEEP_SNAPSHOTS)
+            counts = updater.update(self.speech_metadata)
+            logger.info(f"Metadata merged: {counts}")
         except Exception as e:
-            logger.error(f"Unexpected error while saving metadata: {e}", exc_info=True)
+            logger.error(f"Unexpected error while saving metadata, {len(pdf_urls)} PDFs and {len(page_urls)} "
+                         f"pages stay unseen: {e}", exc_info=True)
+            if frontier is not None:
+                frontier.settle(stored=False)
+            return None
+        self._mark_stored(pdf_urls, page_urls, frontier)
+        return counts
+
+    def _mark_stored(self, pdf_urls, page_urls, frontier):
+        self.seen_pdfs.add_many(pdf_urls)
+        self.seen_pages.add_many(page_urls)
+        if frontier is not None:
+            # With a shared frontier the pages are only done for the other downloaders from now on
+            frontier.settle(stored=True)
+        if self.crawled_year is not None:
+            self.save_last_year(self.crawled_year)
+            self.crawled_year = None
 
     @staticmethod
     def format_date(date_str):
@@ -348,6 +511,17 @@ class SpeechDownloader:
 
 
 # Helper Functions
+def open_work_queue():
+    """The crawl queue shared between downloaders for config.WORK_QUEUE = 'mongo', None for 'local'."""
+    if config.WORK_QUEUE != 'mongo':
+        return None
+    from pymongo import MongoClient
+
+    collection = MongoClient(config.MONGO_URI)[config.DATABASE_NAME][config.WORK_QUEUE_COLLECTION]
+    return LeaseQueue.MongoLeaseQueue(collection, 'speech_crawl', lease_seconds=config.WORK_LEASE_SECONDS,
+                                      owner=config.NODE_ID or None, done_ttl=config.WORK_DONE_TTL)
+
+
 def create_directory_if_not_exists(directory):
     if not os.path.exists(directory):
         try:
@@ -356,8 +530,9 @@ def create_directory_if_not_exists(directory):
             logger.error(f"Failed to create directory {directory}: {e}", exc_info=True)
 
 
-def log_error(error_type, message, url=None):
-    error_file = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'pdfs', 'errors.json')
+def log_error(error_type, message, url=None, error_file=None):
+    if error_file is None:
+        error_file = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'pdfs', 'errors.json')
 
     error_data = {
         'error_type': error_type,
@@ -366,39 +541,24 @@ def log_error(error_type, message, url=None):
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     }
 
-    # If the file exists, load the existing errors, otherwise create a new list
-    if os.path.exists(error_file):
-        try:
-            with open(error_file, 'r') as f:
-                errors = json.load(f)
-        except json.JSONDecodeError:
-            errors = []
-    else:
-        errors = []
-
-    # Duplicate check: check if the same URL is already present
-    for error in errors:
-        if error.get('url') == url:
-            logger.info(f"Duplicate error found for URL: {url}. Skipping log.")
-            return  # Skip logging if a duplicate URL is found
-
-    # If no duplicate is found, append the new error data
-    errors.append(error_data)
-
-    # Write the updated errors back to the file
-    with open(error_file, 'w') as f:
-        json.dump(errors, f, indent=4)
+    # Duplicate check: only the first error of a URL is kept
+    if not ErrorLog.append(error_file, error_data, unique_key='url'):
+        logger.info(f"Duplicate error found for URL: {url}. Skipping log.")
 
 
-
-if __name__ == "__main__":
+def main(base_folder=config.PDF_DIR, start_year=config.START_YEAR):
     try:
         # logger.info("Starting SpeechDownloader script")
-        downloader = SpeechDownloader(base_folder=os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'pdfs'),
-                                       start_year=config.START_YEAR)
-        downloader.download_speeches_parallel()
-        downloader.save_metadata()
+        with Profiling.profile_run('speech_downloader'):
+            downloader = SpeechDownloader(base_folder=base_folder, start_year=start_year)
+            downloader.download_speeches_parallel()
+            downloader.save_metadata()
+        Metrics.write_textfile(Metrics.textfile_path('speech_downloader'))
 
         logger.info("SpeechDownloader script finished")
     except Exception as e:
         logger.error(f"Unexpected error in main execution: {e}", exc_info=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import os
+import uuid
+import logging
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+
+class SpeechMetadataStore:
+    """
+    Columnar, year-partitioned storage for speech metadata.
+    Rows are kept as Parquet files under `<root>/year=<YYYY>/part-*.parquet` with typed columns,
+    new rows are appended as new part files and readers only load the columns and years they ask for.
+    """
+
+    COLUMNS = ['url', 'year', 'title', 'author', 'date', 'file_path']
+
+    # 'year' is not stored inside the files, it comes from the hive partition directory
+    FILE_SCHEMA = pa.schema([
+        ('url', pa.string()),
+        ('title', pa.string()),
+        ('author', pa.string()),
+        ('date', pa.date32()),
+        ('file_path', pa.string()),
+    ])
+    PARTITION_SCHEMA = pa.schema([('year', pa.int16())])
+
+    def __init__(self, root, legacy_csv=None):
+        """
+        Initialize the store rooted at the given directory.
+        :param root: Directory holding the year partitions.
+        :param legacy_csv: Optional path to an old speech_metadata.csv, imported once if the store is empty.
+        """
+        if not isinstance(root, str) or not root:
+            logger.error("The root parameter must be a valid directory path.")
+            raise ValueError("The root parameter must be a valid directory path.")
+
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+        if legacy_csv and self.is_empty() and os.path.exists(legacy_csv):
+            self.migrate_from_csv(legacy_csv)
+
+    def _partition_dir(self, year):
+        return os.path.join(self.root, f"year={int(year)}")
+
+    def years(self):
+        """
+        Return the sorted list of years that have at least one part file.
+        """
+        years = []
+        for name in os.listdir(self.root):
+            if name.startswith('year=') and self._part_files(name[len('year='):]):
+                years.append(int(name[len('year='):]))
+        return sorted(years)
+
+    def _part_files(self, year):
+        partition_dir = self._partition_dir(year)
+        if not os.path.isdir(partition_dir):
+            return []
+        return sorted(
+            os.path.join(partition_dir, name) for name in os.listdir(partition_dir)
+            if name.endswith('.parquet') and not name.startswith(('.', '_'))
+        )
+
+    def is_empty(self):
+        return not self.years()
+
+    def _dataset(self):
+        return ds.dataset(
+            self.root,
+            format='parquet',
+            schema=self.FILE_SCHEMA.append(self.PARTITION_SCHEMA.field('year')),
+            partitioning=ds.partitioning(self.PARTITION_SCHEMA, flavor='hive'),
+        )
+
+    def read(self, columns=None, years=None, urls=None):
+        """
+        Load metadata rows from the store.
+        :param columns: Optional list of columns to load. Defaults to all columns.
+        :param years: Optional iterable of years (partitions) to load. Defaults to all years.
+        :param urls: Optional iterable of URLs: only their rows are loaded, matched inside the Parquet scan.
+        :return: A DataFrame with typed columns (year as int16, date as datetime64).
+        """
+        columns = list(columns) if columns else list(self.COLUMNS)
+        unknown = [c for c in columns if c not in self.COLUMNS]
+        if unknown:
+            raise KeyError(f"Unknown metadata columns requested: {unknown}")
+
+        if self.is_empty():
+            return self.empty_frame(columns)
+
+        row_filter = None
+        if years is not None:
+            row_filter = ds.field('year').isin([int(y) for y in years])
+        if urls is not None:
+            url_filter = ds.field('url').isin(pa.array(list(urls), type=pa.string()))
+            row_filter = url_filter if row_filter is None else row_filter & url_filter
+
+        table = self._dataset().to_table(columns=columns, filter=row_filter)
+        return table.to_pandas(date_as_object=False)
+
+    @classmethod
+    def empty_frame(cls, columns=None):
+        columns = list(columns) if columns else list(cls.COLUMNS)
+        return cls.normalize(pd.DataFrame(columns=cls.COLUMNS))[columns]
+
+    @classmethod
+    def normalize(cls, df):
+        """
+        Coerce a metadata DataFrame to the store's column order and dtypes.
+        Rows without a usable year are dropped, unparsable dates become NaT.
+        """
+        df = df.reindex(columns=cls.COLUMNS).copy()
+        df['year'] = pd.to_numeric(df['year'], errors='coerce')
+        missing_year = df['year'].isna()
+        if missing_year.any():
+            logger.warning(f"Dropping {int(missing_year.sum())} metadata rows without a valid year.")
+            df = df[~missing_year]
+        df['year'] = df['year'].astype('int16')
+        # Parquet dates come back as datetime64[ms], parsed ones as [ns]: one unit keeps concatenated parts alike
+        df['date'] = pd.to_datetime(df['date'], errors='coerce').astype('datetime64[ns]')
+        for column in ('url', 'title', 'author', 'file_path'):
+            df[column] = df[column].astype('string')
+        return df.reset_index(drop=True)
+
+    @classmethod
+    def concat(cls, frames):
+        """
+        Concatenate metadata DataFrames into one normalized frame.
+        Empty frames are left out and the others normalized first, so every part has the store's dtypes.
+        """
+        frames = [cls.normalize(df) for df in frames if not df.empty]
+        if not frames:
+            return cls.empty_frame()
+        return pd.concat(frames, ignore_index=True)
+
+    def _write_part(self, year, df):
+        partition_dir = self._partition_dir(year)
+        os.makedirs(partition_dir, exist_ok=True)
+        name = f"part-{pd.Timestamp.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        table = pa.Table.from_pandas(df.drop(columns=['year']), schema=self.FILE_SCHEMA, preserve_index=False)
+
+        # Write to a hidden temp file first so readers never see a partially written part
+        tmp_path = os.path.join(partition_dir, f".{name}.tmp")
+        pq.write_table(table, tmp_path)
+        final_path = os.path.join(partition_dir, name)
+        os.replace(tmp_path, final_path)
+        return final_path
+
+    def append(self, df):
+        """
+        Append new rows to the store, writing one new part file per year touched.
+        Existing part files are never rewritten.
+        :param df: DataFrame with the metadata columns.
+        :return: Number of rows written.
+        """
+        if df is None or df.empty:
+            return 0
+        df = self.normalize(df)
+        for year, year_df in df.groupby('year', sort=True):
+            path = self._write_part(year, year_df)
+            logger.info(f"Appended {len(year_df)} metadata rows to {path}")
+        return len(df)
+
+    def rewrite_partition(self, year, df):
+        """
+        Replace all part files of one year with a single file containing `df`.
+        """
+        old_parts = self._part_files(year)
+        df = self.normalize(df)
+        if not df.empty:
+            self._write_part(year, df)
+        for path in old_parts:
+            os.remove(path)
+        logger.info(f"Rewrote partition year={year} with {len(df)} rows ({len(old_parts)} old part files removed)")
+
+    def compact(self, years=None):
+        """
+        Merge the small part files produced by appends into one file per year.
+        """
+        for year in (years if years is not None else self.years()):
+            if len(self._part_files(year)) > 1:
+                self.rewrite_partition(year, self.read(years=[year]))
+
+    def migrate_from_csv(self, csv_path):
+        """
+        Import a legacy speech_metadata.csv into the store.
+        """
+        logger.info(f"Migrating legacy metadata from {csv_path} into {self.root}")
+        try:
+            legacy_df = pd.read_csv(csv_path)
+        except pd.errors.EmptyDataError:
+            logger.warning(f"The legacy metadata file {csv_path} is empty. Nothing to migrate.")
+            return 0
+        written = self.append(legacy_df)
+        logger.info(f"Migrated {written} metadata rows from {csv_path}")
+        return written
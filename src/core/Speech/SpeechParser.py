@@ -1,21 +1,71 @@
 import os
 import requests
-from bs4 import BeautifulSoup
 import logging
 import re
 import time
+from urllib.parse import urlsplit
 from requests.exceptions import HTTPError, ConnectionError, Timeout
 
+from src.core.Common import LogSetup, Metrics, Profiling
+
+try:
+    import lxml.html
+    HAS_LXML = True
+except ImportError:  # lxml is optional, BeautifulSoup's html.parser is used as a fallback
+    HAS_LXML = False
+
+# bs4 is imported by the functions that use it, so a start with lxml available does not load it
+
+
+# Queue-based JSON logging shared by all speech modules (see Common/LogSetup.py)
+LogSetup.configure()
 logger = logging.getLogger(__name__)
 
-# Set up logging format for better readability
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Site root for all speech pages; overridden (e.g. by SpeechDownloader from config.FED_BASE_URL) to use a local mirror
+BASE_URL = "https://www.federalreserve.gov"
+
+# XPath equivalents of soup.find('h3', class_='title') etc. (class attribute contains the given token)
+_TITLE_XPATH = "(//h3[contains(concat(' ', normalize-space(@class), ' '), ' title ')])[1]"
+_SPEAKER_XPATH = "(//p[contains(concat(' ', normalize-space(@class), ' '), ' speaker ')])[1]"
+_TIME_XPATH = "(//p[contains(concat(' ', normalize-space(@class), ' '), ' article__time ')])[1]"
+
+# One session for all requests, so connections to the site are kept alive between pages (and between the
+# cycles of the resident pipeline). Sized for the download thread pool.
+SESSION = requests.Session()
+SESSION.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+SESSION.mount('http://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# ETag / Last-Modified of the pages fetched with fetch_html_if_modified, by URL
+_validators = {}
+
+def http_get(url, headers=None):
+    """SESSION.get that records the request in the HTTP metrics (host, status, latency, bytes)."""
+    host = urlsplit(url).hostname or ''
+    start = time.perf_counter()
+    try:
+        response = SESSION.get(url, timeout=10, headers=headers)
+    except Exception:
+        Metrics.observe_http(host, 'error', time.perf_counter() - start)
+        raise
+    Metrics.observe_http(host, response.status_code, time.perf_counter() - start, len(response.content))
+    return response
 
 def get_soup_from_url(url):
+    content = fetch_html(url)
+    if content is None:
+        return None
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(content, 'html.parser')
+
+@Profiling.span()
+def fetch_html(url):
+    """
+    Fetch a page and return its raw bytes, or None if the request failed.
+    """
     try:
-        response = requests.get(url, timeout=10)
+        response = http_get(url)
         response.raise_for_status()
-        return BeautifulSoup(response.content, 'html.parser')
+        return response.content
     except HTTPError as http_err:
         logger.error(f"HTTP error occurred while fetching URL '{url}': {http_err}")
     except ConnectionError as conn_err:
@@ -26,90 +76,177 @@ def get_soup_from_url(url):
         logger.error(f"An unexpected error occurred while fetching URL '{url}': {err}")
     return None
 
-def fetch_with_retries(url, retries=3, delay=5, backoff_factor=2):
-    for i in range(retries):
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response
-        except HTTPError as http_err:
-            logger.warning(f"HTTP error occurred on attempt {i + 1} for URL '{url}': {http_err}. Retrying in {delay} seconds...")
-        except ConnectionError as conn_err:
-            logger.warning(f"Connection error occurred on attempt {i + 1} for URL '{url}': {conn_err}. Retrying in {delay} seconds...")
-        except Timeout as timeout_err:
-            logger.warning(f"Timeout occurred on attempt {i + 1} for URL '{url}': {timeout_err}. Retrying in {delay} seconds...")
-        except Exception as err:
-            logger.warning(f"An unexpected error occurred on attempt {i + 1} for URL '{url}': {err}. Retrying in {delay} seconds...")
-        time.sleep(delay)
-        delay *= backoff_factor  # Increase the delay for each retry
-
-    logger.error(f"Failed to fetch URL '{url}' after {retries} attempts.")
-    return None
-
-def fetch_speech_links_for_year(year):
-    base_url = f"https://www.federalreserve.gov/newsevents/speech/{year}-speeches.htm"
-    soup = get_soup_from_url(base_url)
-    if not soup:
-        logger.error(f"Unable to fetch or parse the base URL for year {year}. Returning empty list.")
-        return []
+def fetch_html_if_modified(url):
+    """
+    Conditional GET for pages polled often: the page's bytes, b'' if the server reports it unchanged (304) since
+    the last call for url, or None if the request failed.
+    """
+    etag, last_modified = _validators.get(url, (None, None))
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    try:
+        response = http_get(url, headers=headers)
+        if response.status_code == 304:
+            return b''
+        response.raise_for_status()
+    except Exception as err:
+        logger.warning(f"Conditional fetch of '{url}' failed: {err}")
+        return None
+    _validators[url] = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return response.content
+
+@Profiling.span()
+def fetch_once(url):
+    """
+    GET url once and return the response, raising requests.exceptions.RequestException (HTTPError for 4xx/5xx) on
+    failure. Retries are scheduled by the caller (see RetryQueue) rather than slept on here.
+    """
+    response = http_get(url)
+    response.raise_for_status()
+    return response
+
+def _stripped_text(element):
+    # Same result as BeautifulSoup's get_text(strip=True): every text node stripped, joined without separator
+    return ''.join(text.strip() for text in element.itertext())
+
+@Profiling.span()
+def parse_speech_links(html):
+    """
+    Return the hrefs of speech detail pages listed on a year index page.
+    """
+    if not HAS_LXML:
+        return _parse_speech_links_bs4(html)
+    tree = lxml.html.fromstring(html)
+    return [
+        href for href in tree.xpath("//a[not(@class)]/@href")
+        if href.startswith("/newsevents/speech") and href.endswith(".htm")
+    ]
 
-    # Get all links pointing to speech detail pages
-    speech_page_links = [
+def _parse_speech_links_bs4(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    return [
         link['href'] for link in soup.find_all('a', href=True)
         if link['href'].startswith("/newsevents/speech") and link['href'].endswith(".htm") and not link.has_attr('class')
     ]
 
-    if not speech_page_links:
-        logger.warning(f"No speech links found for the year {year}.")
+def _main_filename(page_url):
+    # Extract the main part of the filename (without the trailing letter)
+    page_filename = os.path.basename(page_url).split(".htm")[0]  # e.g., powell20190228b
+    # Remove the last character if it's a letter (to handle cases like powell20190228b -> powell20190228)
+    return re.sub(r'[a-zA-Z]$', '', page_filename)  # e.g., powell20190228b -> powell20190228
 
-    return speech_page_links
+@Profiling.span()
+def parse_speech_page(html, page_url):
+    """
+    Extract the PDF links, title, author and date from a speech detail page.
+    This is a pure function so it can run in a process pool.
+    :return: (pdf_links, title, author, date) with the same defaults as fetch_pdf_links_from_speech_page.
+    """
+    if not HAS_LXML:
+        return _parse_speech_page_bs4(html, page_url)
 
-def fetch_pdf_links_from_speech_page(page_url):
-    if not page_url.startswith("https://www.federalreserve.gov"):
-        page_url = f"https://www.federalreserve.gov{page_url}"
+    tree = lxml.html.fromstring(html)
+    main_filename = _main_filename(page_url)
 
-    soup = get_soup_from_url(page_url)
-    if not soup:
-        logger.error(f"Unable to fetch or parse the speech page URL: {page_url}. Returning default values.")
-        return [], "No Title", "Unknown Author", "Unknown Date"
+    title_tags = tree.xpath(_TITLE_XPATH + "//em")
+    title = _stripped_text(title_tags[0]) if title_tags else "No Title"
 
-    # Extract the main part of the filename (without the trailing letter)
-    page_filename = os.path.basename(page_url).split(".htm")[0]  # e.g., powell20190228b
-    # Remove the last character if it's a letter (to handle cases like powell20190228b -> powell20190228)
-    main_filename = re.sub(r'[a-zA-Z]$', '', page_filename)  # e.g., powell20190228b -> powell20190228
+    author_tags = tree.xpath(_SPEAKER_XPATH)
+    author = _stripped_text(author_tags[0]) if author_tags else "Unknown Author"
+
+    date_tags = tree.xpath(_TIME_XPATH)
+    date = _stripped_text(date_tags[0]) if date_tags else "Unknown Date"
+
+    # Only anchors whose href is a PDF belonging to the current speech page
+    pdf_links = [
+        href for href in tree.xpath("//a/@href")
+        if href.endswith(".pdf") and main_filename in href
+    ]
+    return pdf_links, title, author, date
+
+def _parse_speech_page_bs4(html, page_url):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    main_filename = _main_filename(page_url)
 
     title_tag = soup.find('h3', class_='title')
     if title_tag:
         title = title_tag.find('em').get_text(strip=True) if title_tag.find('em') else "No Title"
     else:
-        logger.warning(f"Title not found for page: {page_url}")
         title = "No Title"
 
     author_tag = soup.find('p', class_='speaker')
     author = author_tag.get_text(strip=True) if author_tag else "Unknown Author"
-    if author == "Unknown Author":
-        logger.warning(f"Author not found for page: {page_url}")
 
     date_tag = soup.find('p', class_='article__time')
     date = date_tag.get_text(strip=True) if date_tag else "Unknown Date"
-    if date == "Unknown Date":
-        logger.warning(f"Date not found for page: {page_url}")
 
     # Search for .pdf links related to the current speech page
     pdf_links = [
         link['href'] for link in soup.find_all('a', href=True)
         if link['href'].endswith(".pdf") and main_filename in link['href']  # Use main_filename for matching
     ]
+    return pdf_links, title, author, date
+
+def year_index_url(year):
+    return f"{BASE_URL}/newsevents/speech/{year}-speeches.htm"
+
+@Profiling.span()
+def fetch_speech_links_for_year(year, executor=None):
+    base_url = year_index_url(year)
+    html = fetch_html(base_url)
+    if html is None:
+        logger.error(f"Unable to fetch or parse the base URL for year {year}. Returning empty list.")
+        return []
+
+    # Get all links pointing to speech detail pages
+    if executor is not None:
+        speech_page_links = executor.submit(parse_speech_links, html).result()
+    else:
+        speech_page_links = parse_speech_links(html)
+
+    if not speech_page_links:
+        logger.warning(f"No speech links found for the year {year}.")
+
+    return speech_page_links
+
+@Profiling.span()
+def fetch_pdf_links_from_speech_page(page_url, executor=None):
+    """
+    Fetch a speech detail page and extract its PDF links and metadata.
+    :param page_url: Speech page URL (absolute or site-relative).
+    :param executor: Optional process pool used to parse the page off the calling thread.
+    """
+    if not page_url.startswith(("http://", "https://")):
+        page_url = f"{BASE_URL}{page_url}"
+
+    html = fetch_html(page_url)
+    if html is None:
+        logger.error(f"Unable to fetch or parse the speech page URL: {page_url}. Returning default values.")
+        return [], "No Title", "Unknown Author", "Unknown Date"
+
+    if executor is not None:
+        pdf_links, title, author, date = executor.submit(parse_speech_page, html, page_url).result()
+    else:
+        pdf_links, title, author, date = parse_speech_page(html, page_url)
 
+    if title == "No Title":
+        logger.warning(f"Title not found for page: {page_url}")
+    if author == "Unknown Author":
+        logger.warning(f"Author not found for page: {page_url}")
+    if date == "Unknown Date":
+        logger.warning(f"Date not found for page: {page_url}")
     if not pdf_links:
         logger.warning(f"No PDF links found for speech page: {page_url}")
 
     # Make sure the PDF links are complete URLs
     pdf_links = [
-        link if link.startswith("https://") else f"https://www.federalreserve.gov{link}"
+        link if link.startswith(("http://", "https://")) else f"{BASE_URL}{link}"
         for link in pdf_links
     ]
 
     return pdf_links, title, author, date
-
-
@@ -2,26 +2,78 @@ import os
 import pandas as pd
 import logging
 
+from src.core.Common import LogSetup, Profiling
+from src.core.Speech.MetadataBackup import MetadataBackup
+from src.core.Speech.SpeechMetadataStore import SpeechMetadataStore
+
 # Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+LogSetup.configure()
 logger = logging.getLogger(__name__)
 
+def prepare_new_metadata(new_metadata_df):
+    """
+    Normalize a batch of new metadata and collapse duplicates inside the batch.
+    Rows are sorted by date (missing dates first), the first row per title is kept,
+    and if a URL still appears more than once the last occurrence wins.
+    :param new_metadata_df: DataFrame built from the downloader's metadata dictionaries.
+    :return: A normalized DataFrame with one row per URL.
+    """
+    df = SpeechMetadataStore.normalize(new_metadata_df)
+    df = df.sort_values('date', na_position='first', kind='stable')
+    df = df.drop_duplicates(subset='title', keep='first')
+    df = df.drop_duplicates(subset='url', keep='last')
+    return df.reset_index(drop=True)
+
+
+def diff_metadata(existing_df, new_df, key='url'):
+    """
+    Compare a batch of new rows with existing rows using an indexed join on `key`.
+    :param existing_df: Existing rows (normalized), at least all rows whose key appears in `new_df`.
+    :param new_df: New rows (normalized, unique on `key`).
+    :return: (inserted_df, updated_df, counts) where counts has 'inserted', 'updated' and 'unchanged'.
+    """
+    incoming = new_df.set_index(key)
+    # Only existing rows sharing a key with the batch matter; deduplicating the rest would be wasted work
+    existing_df = existing_df[existing_df[key].isin(incoming.index)]
+    existing = existing_df.drop_duplicates(subset=key, keep='last').set_index(key)
+
+    known_mask = incoming.index.isin(existing.index)
+    inserted = incoming[~known_mask]
+    candidates = incoming[known_mask]
+
+    # Align the matching existing rows to the candidates and compare column-wise, treating NA == NA
+    previous = existing.reindex(index=candidates.index, columns=candidates.columns)
+    same = (candidates == previous).fillna(False) | (candidates.isna() & previous.isna())
+    changed_mask = ~same.all(axis=1).to_numpy()
+    updated = candidates[changed_mask]
+
+    counts = {
+        'inserted': len(inserted),
+        'updated': len(updated),
+        'unchanged': len(candidates) - len(updated),
+    }
+    return inserted.reset_index(), updated.reset_index(), counts
+
+
 class SpeechUpdater:
     """
     This class is responsible for updating and saving the metadata of downloaded speeches.
-    It loads existing metadata, merges with the new data, and updates the relevant files.
+    It looks up the incoming speech URLs in the columnar metadata store, merges the new data and appends only new rows.
     """
 
-    def __init__(self, metadata_file, backup_folder=None):
+    def __init__(self, metadata_file, backup_folder=None, legacy_csv=None, snapshot_every=96, keep_snapshots=7):
         """
-        Initialize the SpeechUpdater with the path to the metadata file and optional backup folder.
-        :param metadata_file: The path to the CSV file containing metadata.
-        :param backup_folder: An optional folder to store backups of the metadata file.
+        Initialize the SpeechUpdater with the path to the metadata store and optional backup folder.
+        :param metadata_file: The directory of the Parquet metadata store.
+        :param backup_folder: An optional folder to store incremental backups of the metadata.
+        :param legacy_csv: An optional speech_metadata.csv that is imported once when the store is empty.
+        :param snapshot_every: Number of changelogs between two full snapshots in the backup folder.
+        :param keep_snapshots: Number of full snapshots to retain in the backup folder.
         """
         # Check if metadata_file is a valid string
-        if not isinstance(metadata_file, str) or not metadata_file.endswith('.csv'):
-            logger.error("The metadata_file parameter must be a valid CSV file path.")
-            raise ValueError("The metadata_file parameter must be a valid CSV file path.")
+        if not isinstance(metadata_file, str) or not metadata_file or metadata_file.endswith('.csv'):
+            logger.error("The metadata_file parameter must be a valid metadata store directory path.")
+            raise ValueError("The metadata_file parameter must be a valid metadata store directory path.")
 
         self.metadata_file = metadata_file
         self.backup_folder = backup_folder
@@ -38,42 +90,41 @@ class SpeechUpdater:
                 except OSError as e:
                     logger.error(f"Failed to create backup folder at {backup_folder}: {e}")
                     raise
-
-        # Load existing metadata if available
-        if os.path.exists(self.metadata_file):
-            try:
-                logger.info(f"Loading existing metadata from {self.metadata_file}")
-                self.metadata_df = pd.read_csv(self.metadata_file)
-            except pd.errors.EmptyDataError:
-                logger.warning(f"The metadata file {self.metadata_file} is empty. Starting with an empty DataFrame.")
-                self.metadata_df = pd.DataFrame()
-            except Exception as e:
-                logger.error(f"Failed to load metadata from {self.metadata_file}: {e}")
-                raise
+            self.backup = MetadataBackup(backup_folder, snapshot_every=snapshot_every, keep_snapshots=keep_snapshots)
         else:
-            logger.info(f"No existing metadata found. Starting fresh.")
-            self.metadata_df = pd.DataFrame()
+            self.backup = None
+
+        try:
+            self.store = SpeechMetadataStore(self.metadata_file, legacy_csv=legacy_csv)
+        except Exception as e:
+            logger.error(f"Failed to load metadata from {self.metadata_file}: {e}")
+            raise
+
+        self.inserted_df = SpeechMetadataStore.empty_frame()
+        self.updated_df = SpeechMetadataStore.empty_frame()
 
     def backup_metadata(self):
         """
-        Create a backup of the existing metadata file.
+        Write a full snapshot of the metadata store to the backup folder.
         """
-        if not self.backup_folder:
+        if not self.backup:
             logger.warning("Backup folder is not specified. Skipping backup.")
             return
         try:
-            backup_file = os.path.join(self.backup_folder, f"metadata_backup_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv")
-            self.metadata_df.to_csv(backup_file, index=False)
-            logger.info(f"Backup of metadata created at {backup_file}")
+            self.backup.snapshot(self.store)
         except Exception as e:
             logger.error(f"Failed to create a backup of the metadata: {e}")
             raise
 
+    @Profiling.span()
     def merge_metadata(self, new_metadata):
         """
         Merge new metadata with the existing metadata.
         :param new_metadata: A list of dictionaries containing new metadata entries.
+        :return: A dict with the number of 'inserted', 'updated' and 'unchanged' rows.
         """
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
         if not isinstance(new_metadata, list):
             logger.error("New metadata must be provided as a list of dictionaries.")
             raise ValueError("New metadata must be provided as a list of dictionaries.")
@@ -82,7 +133,7 @@ class SpeechUpdater:
 
         if not new_metadata:
             logger.info("No new metadata to merge. Skipping merge process.")
-            return
+            return counts
 
         try:
             new_metadata_df = pd.DataFrame(new_metadata)
@@ -92,7 +143,7 @@ class SpeechUpdater:
 
         if new_metadata_df.empty:
             logger.info("New metadata DataFrame is empty. No data to merge.")
-            return
+            return counts
 
         if 'url' not in new_metadata_df.columns:
             logger.error("The 'url' column is missing from the new metadata DataFrame.")
@@ -101,30 +152,50 @@ class SpeechUpdater:
 
         # Proceed with merging
         try:
-            if not self.metadata_df.empty:
-                existing_urls = set(self.metadata_df['url'])
-                new_urls = set(new_metadata_df['url'])
-                unique_new_urls = new_urls - existing_urls
-                unique_new_metadata_df = new_metadata_df[new_metadata_df['url'].isin(unique_new_urls)]
-                self.metadata_df = pd.concat([self.metadata_df, unique_new_metadata_df], ignore_index=True)
-            else:
-                self.metadata_df = new_metadata_df
+            new_df = prepare_new_metadata(new_metadata_df)
+
+            # Only the stored rows of the incoming URLs are loaded, never the whole url column
+            existing_df = self.store.read(urls=new_df['url'])
+            inserted_df, updated_df, counts = diff_metadata(existing_df, new_df)
+
+            self.inserted_df = SpeechMetadataStore.concat([self.inserted_df, inserted_df])
+            self.updated_df = SpeechMetadataStore.concat([self.updated_df, updated_df])
         except Exception as e:
             logger.error(f"Failed during metadata merge: {e}")
             raise
 
+        logger.info(f"Merge result: {counts['inserted']} inserted, {counts['updated']} updated, "
+                    f"{counts['unchanged']} unchanged.")
+        return counts
+
     def save_metadata(self):
         """
-        Save the merged metadata back to the CSV file.
+        Write the merged changes to the metadata store.
+        New rows are appended; only the partitions touched by updated rows are rewritten.
         """
         try:
             logger.info(f"Saving metadata to {self.metadata_file}")
-            self.metadata_df.to_csv(self.metadata_file, index=False)
-            logger.info(f"Metadata saved successfully.")
+            if not self.updated_df.empty:
+                self._apply_updates(self.updated_df)
+            written = self.store.append(self.inserted_df)
+            logger.info(f"Metadata saved successfully. {written} rows appended, {len(self.updated_df)} rows updated.")
+            self.inserted_df = SpeechMetadataStore.empty_frame()
+            self.updated_df = SpeechMetadataStore.empty_frame()
         except Exception as e:
             logger.error(f"Failed to save metadata to {self.metadata_file}: {e}")
             raise
 
+    def _apply_updates(self, updated_df):
+        # An updated row may have moved to another year, so both old and new partitions are rewritten
+        updated_urls = set(updated_df['url'])
+        old_years = set(self.store.read(columns=['year'], urls=updated_urls)['year'])
+        years = sorted(old_years | set(updated_df['year']))
+        existing_df = self.store.read(years=years)
+        for year in years:
+            partition_df = existing_df[(existing_df['year'] == year) & ~existing_df['url'].isin(updated_urls)]
+            partition_df = SpeechMetadataStore.concat([partition_df, updated_df[updated_df['year'] == year]])
+            self.store.rewrite_partition(year, partition_df)
+
     def update(self, new_metadata):
         """
         Update the metadata with new entries, including creating backups and saving.
@@ -136,10 +207,18 @@ class SpeechUpdater:
 
         if not new_metadata:
             logger.info("No new metadata provided. Skipping update.")
-            return
+            return {'inserted': 0, 'updated': 0, 'unchanged': 0}
 
-        if self.backup_folder:
-            self.backup_metadata()
-        self.merge_metadata(new_metadata)
+        counts = self.merge_metadata(new_metadata)
+        inserted_df, updated_df = self.inserted_df, self.updated_df
         self.save_metadata()
-        logger.info("Metadata update completed.")
\ No newline at end of file
+
+        # Only the rows this run changed go into the changelog; a no-op merge writes nothing
+        if self.backup:
+            try:
+                self.backup.record(inserted_df, updated_df, self.store)
+            except Exception as e:
+                logger.error(f"Failed to back up the metadata changes: {e}")
+                raise
+        logger.info("Metadata update completed.")
+        return counts
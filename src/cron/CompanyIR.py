@@ -1,64 +1,36 @@
-import os
-import json
-import subprocess
+import argparse
 import sys
-sys.path.append(r'C:\Users\admin\Documents\GitHub\task\src')
 
-# 定义文件路径
-company_page_path = r'C:\Users\admin\Documents\GitHub\task\src\core\Company\CompanyList\CompanyPage.json'
+from src.config import CompanyConfig
+from src.core.Common import Metrics, Profiling
+from src.core.Company import CrawlerRegistry
 
-# 读取 JSON 文件
-def load_company_page():
-    if not os.path.exists(company_page_path):
-        print(f"Error: {company_page_path} does not exist.")
-        return None
 
-    with open(company_page_path, 'r') as f:
-        company_page = json.load(f)
-    return company_page
-
-# 根据公司名称查找对应的爬虫脚本路径
-def get_crawler_script(company_name):
-    # 构建对应公司爬虫的路径
-    crawler_path = os.path.join(r'C:\Users\admin\Documents\GitHub\task\src\core\Company\CompanyList', company_name, f'{company_name}Crawler.py')
-
-    if os.path.exists(crawler_path):
-        return crawler_path
-    else:
-        return None
-
-# 运行指定的爬虫脚本
-def run_crawler_script(crawler_script):
-    try:
-        result = subprocess.run(['python', crawler_script], check=True)
-        if result.returncode == 0:
-            print(f"Successfully ran the crawler for {crawler_script}")
-        else:
-            print(f"Error running the crawler for {crawler_script}")
-    except subprocess.CalledProcessError as e:
-        print(f"Error running the crawler script: {e}")
-
-# 主程序
+# 主程序：在一个进程中并发运行 CompanyPage.json 中所有公司的爬虫
 def main():
-    # 加载公司页面
-    company_page = load_company_page()
-    if not company_page:
-        return
-
-    print("CompanyPage:", company_page)  # 打印公司页面内容进行调试
-
-    # 遍历 company_page 中的公司名称并查找爬虫脚本路径
-    for company_name in company_page:
-        print(f"Processing company: {company_name}")
+    parser = argparse.ArgumentParser(description="Run the company crawlers listed in CompanyPage.json")
+    parser.add_argument('--companies', nargs='+', help="Only run these companies")
+    parser.add_argument('--workers', type=int, default=CompanyConfig.COMPANY_CRAWLER_WORKERS,
+                        help="Companies crawled at once in this process")
+    parser.add_argument('--processes', type=int, default=0,
+                        help="Run each company in a process pool of this size instead, for isolation")
+    parser.add_argument('--depth', type=int, default=0,
+                        help="Follow links this many levels deep (0: homepage only)")
+    parser.add_argument('--offline', action='store_true',
+                        help="Serve saved Firecrawl results instead of calling the API")
+    args = parser.parse_args()
+
+    company_pages = CrawlerRegistry.load_company_pages()
+    print("CompanyPage:", company_pages)
+
+    with Profiling.profile_run('company_crawlers'):
+        results = CrawlerRegistry.run_all(company_pages, companies=args.companies, max_workers=args.workers,
+                                          processes=args.processes, depth=args.depth, offline=args.offline)
+    # 进程池模式下子进程的指标不会汇总到这里
+    Metrics.write_textfile(Metrics.textfile_path('company_crawlers'))
+    if any(result['error'] for result in results):
+        sys.exit(1)
 
-        # 查找爬虫脚本路径
-        crawler_script = get_crawler_script(company_name)
-        if crawler_script:
-            print(f"Found crawler script for {company_name}: {crawler_script}")
-            # 运行爬虫脚本
-            run_crawler_script(crawler_script)
-        else:
-            print(f"No crawler found for {company_name}")
 
 # 入口点
 if __name__ == "__main__":
@@ -0,0 +1,380 @@
+"""
+Resident speech pipeline: SpeechDownloader -> SpeechUpdater -> PDF extraction -> MongoDB upload in one process.
+
+Replaces the script.sh loop that started the three stage scripts every 15 minutes. Modules, the HTTP session,
+the URL seen-sets and the MongoDB connection stay loaded between cycles, and the stages hand records to each
+other through bounded in-memory queues instead of the speech_metadata / all_metadata_and_text.json files, so a
+cycle only extracts and uploads the PDFs it downloaded.
+
+In streaming mode (PIPELINE_STREAMING, the default) every PDF goes to extraction and upload as soon as it is
+saved, while the download continues; a full queue makes the download threads wait. Each cycle reports the
+time-to-availability of its new speeches: from when their speech page was first listed on an index page (by the
+fast-lane poll or the crawl) until the insert into MongoDB (which the API reads) is acknowledged.
+
+    speech-pipeline              # a cycle now, then every PIPELINE_INTERVAL seconds
+    speech-pipeline --once       # a single cycle (or: python -m src.cron.SpeechPipeline --once)
+    kill -USR1 <pid>  or  touch src/data/pipeline.trigger   # start a cycle now
+
+Every cycle crawls the current year before any backfill of past years (see CrawlFrontier), and between the
+cycles a fast lane polls the current year's index page every PIPELINE_FRESH_INTERVAL seconds (60): new speeches
+join the running crawl or start a cycle, so they are available within minutes however long the backfill is.
+
+A PDF that fails to download is not retried by the thread that downloaded it: it goes to the retry queue
+(src/data/pdfs/retry_queue.sqlite, see RetryQueue) and is attempted again with exponential backoff by the retry
+thread of the crawls, or as a dead letter waits for `speech-retries requeue`.
+
+Pipelines on several hosts (or in several processes with their own SPEECH_DATA_DIR) split the crawls between them
+with WORK_QUEUE=mongo, see CrawlFrontier.SharedFrontier; each extracts and uploads the PDFs it downloaded.
+
+Cycles never overlap: triggers that arrive during a cycle start one more cycle right after it.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import time
+
+from src.config import config
+from src.core.Common import Metrics, Profiling, RunStamp
+from src.core.Speech import SpeechDownloader as downloader_module
+from src.core.Speech.PdfHanlder import PdfHanlder as pdf_module
+from src.core.Speech.PdfHanlder.UploadDb import MongoDbManger as mongo_module
+
+# Logs go to the same file and console as the downloader's (configured by it through LogSetup)
+logger = logging.getLogger('SpeechPipeline')
+
+TRIGGER_POLL_SECONDS = 1.0
+
+CYCLE_SECONDS = Metrics.histogram('pipeline_cycle_seconds', "Duration of speech pipeline cycles",
+                                  buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800))
+TIME_TO_AVAILABILITY = Metrics.histogram(
+    'speech_time_to_availability_seconds', "From the first index listing of a new speech until it is in MongoDB",
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600, 900, 1800))
+LAST_CYCLE = Metrics.gauge('pipeline_last_cycle_timestamp_seconds', "Unix time the last pipeline cycle finished")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class SpeechPipeline:
+    """
+    Runs pipeline cycles on a schedule. The extraction workers and the upload worker run for the lifetime of
+    the pipeline; each cycle downloads in a worker thread and feeds the new metadata records to them.
+    """
+
+    def __init__(self, downloader=None, db_manager=None, interval=config.PIPELINE_INTERVAL,
+                 queue_size=config.PIPELINE_QUEUE_SIZE, extract_workers=config.PIPELINE_EXTRACT_WORKERS,
+                 upload_batch=config.PIPELINE_UPLOAD_BATCH, trigger_file=config.PIPELINE_TRIGGER_FILE,
+                 streaming=config.PIPELINE_STREAMING, fresh_interval=config.PIPELINE_FRESH_INTERVAL):
+        """
+        :param downloader: Optional SpeechDownloader, by default one for config.PDF_DIR from config.START_YEAR.
+        :param db_manager: Optional AsyncMongoDBManager (e.g. with a mongomock client), created on first use
+                           otherwise.
+        :param interval: Seconds to wait after a cycle before the next scheduled one.
+        :param trigger_file: Path whose creation starts a cycle; None disables it.
+        :param streaming: Extract and upload each PDF as soon as it is saved instead of after the download stage.
+        :param fresh_interval: Seconds between fast-lane polls of the current year's index page; 0 disables them.
+        """
+        self.downloader = downloader or downloader_module.SpeechDownloader(start_year=config.START_YEAR)
+        self.db_manager = db_manager
+        self.db_ready = False
+        # Fingerprint of the metadata store when every saved speech was in MongoDB (see missing_records)
+        self.stamp_path = os.path.join(self.downloader.base_folder, 'speech_metadata.uploaded')
+        self.reconciled = False  # Whether the store was checked against MongoDB on start
+        self.cycle_complete = True  # False while a cycle runs and after one that failed
+        self.interval = interval
+        self.queue_size = queue_size
+        self.extract_workers = extract_workers
+        self.upload_batch = upload_batch
+        self.trigger_file = trigger_file
+        self.streaming = streaming
+        self.fresh_interval = fresh_interval
+        self.retry_records = []  # Records whose extraction or upload failed, fed to the next cycle
+        self.cycles = 0
+        self.stats = {}
+        self.availability = []  # Time-to-availability in seconds of the new speeches of the current cycle
+        self.seen_at = {}  # Batch mode: file_path -> seen_at of the PDFs saved by the running download
+        self.loop = None
+        self.stopping = False
+        self.wakeup = None
+        self.extract_queue = None
+        self.upload_queue = None
+        self.workers = []
+
+    async def database(self):
+        """
+        The MongoDB manager, connected and with the title index ensured on first use. A --once cycle with nothing
+        to upload never connects (nor imports motor).
+        """
+        if self.db_manager is None:
+            self.db_manager = mongo_module.AsyncMongoDBManager()
+        if not self.db_ready:
+            await self.db_manager.create_unique_index()
+            self.db_ready = True
+        return self.db_manager
+
+    def _store_fingerprint(self):
+        return RunStamp.fingerprint(os.path.join(self.downloader.base_folder, 'speech_metadata'), '.parquet')
+
+    async def start(self):
+        """Start the stage workers and queue the records missing from the collection."""
+        self.loop = asyncio.get_running_loop()
+        self.downloader.on_pdf_saved = self._pdf_saved
+        self.wakeup = asyncio.Event()
+        self.extract_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.upload_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.workers = [asyncio.create_task(self._extract_worker()) for _ in range(self.extract_workers)]
+        self.workers.append(asyncio.create_task(self._upload_worker()))
+        self.retry_records = await self.missing_records()
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        self.downloader.on_pdf_saved = None
+        # Everything saved so far is in MongoDB: the next start can skip the reconciliation
+        if self.reconciled and self.cycle_complete and not self.retry_records:
+            RunStamp.record(self.stamp_path, self._store_fingerprint())
+        else:
+            RunStamp.clear(self.stamp_path)
+        if self.db_manager is not None:
+            await self.db_manager.close_connection()
+
+    async def missing_records(self):
+        """
+        Metadata records of saved PDFs that are not in MongoDB yet (e.g. from the old file based stages or
+        an interrupted run). Only read once on start; afterwards the cycles track their own failures.
+        Skipped, without loading the store or connecting, when the store has not changed since the last run
+        that ended with everything uploaded.
+        """
+        if RunStamp.is_current(self.stamp_path, self._store_fingerprint()):
+            self.reconciled = True
+            return []
+        db_manager = await self.database()
+        uploaded = await db_manager.get_uploaded_file_paths()
+        if uploaded is None:
+            return []
+        self.reconciled = True
+        base_folder = self.downloader.base_folder
+        store = pdf_module.open_metadata_store(os.path.join(base_folder, 'speech_metadata'))
+        if store.is_empty():
+            return []
+        metadata_df = store.read()
+        missing = pdf_module.metadata_records(metadata_df[~metadata_df['file_path'].isin(uploaded)])
+        if missing:
+            logger.info(f"{len(missing)} saved speeches are not in MongoDB yet, queueing them")
+        return missing
+
+    def trigger(self):
+        """Start a cycle now, or right after the running one."""
+        self.wakeup.set()
+
+    def request_stop(self):
+        """Stop after the running cycle."""
+        logger.info("Stop requested, finishing the current cycle")
+        self.stopping = True
+        self.wakeup.set()
+
+    def _download(self):
+        """Download stage, run in a worker thread. Returns the metadata records of the new PDFs."""
+        downloader = self.downloader
+        downloader.speech_metadata = []
+        downloader.last_year = downloader.load_last_year()
+        downloader.download_speeches_parallel()
+        # Also called without new PDFs: the processed speech pages join the seen-set there
+        downloader.save_metadata()
+        return list(downloader.speech_metadata)
+
+    def _pdf_saved(self, record, seen_at):
+        """
+        SpeechDownloader.on_pdf_saved: in streaming mode queue the PDF for extraction right away, in batch mode
+        keep its seen_at for when the download stage is over.
+        """
+        if not self.streaming:
+            self.seen_at[record['file_path']] = seen_at
+            return
+        # Runs in a download thread and waits while the queue is full, which slows the download down
+        asyncio.run_coroutine_threadsafe(self.extract_queue.put((record, seen_at)), self.loop).result()
+
+    async def run_cycle(self):
+        start = time.perf_counter()
+        self.cycles += 1
+        self.cycle_complete = False
+        self.stats = {'downloaded': 0, 'extracted': 0, 'uploaded': 0, 'failed': 0}
+        self.availability = []
+        retry_records, self.retry_records = self.retry_records, []
+
+        # put() waits while the extractors are behind, so only a bounded number of extracted documents is in memory
+        if self.streaming:
+            # New PDFs are queued by _pdf_saved while the download runs; earlier failures are mixed in meanwhile
+            download = asyncio.create_task(asyncio.to_thread(self._download))
+            for record in retry_records:
+                await self.extract_queue.put((record, None))
+            records = await download
+        else:
+            records = await asyncio.to_thread(self._download)
+            seen_at, self.seen_at = self.seen_at, {}
+            for record in retry_records:
+                await self.extract_queue.put((record, None))
+            for record in records:
+                await self.extract_queue.put((record, seen_at.get(record['file_path'])))
+        self.stats['downloaded'] = len(records)
+        await self.extract_queue.join()
+        await self.upload_queue.join()
+
+        if self.availability:
+            self.stats['availability_p50'] = percentile(self.availability, 50)
+            self.stats['availability_max'] = max(self.availability)
+            availability = (f", time-to-availability p50 {self.stats['availability_p50']:.1f}s "
+                            f"max {self.stats['availability_max']:.1f}s")
+        else:
+            availability = ""
+        CYCLE_SECONDS.observe(time.perf_counter() - start)
+        LAST_CYCLE.set(time.time())
+        Metrics.write_textfile(Metrics.textfile_path('speech_pipeline'))
+        logger.info(f"Cycle {self.cycles} finished in {time.perf_counter() - start:.1f}s: "
+                    f"{self.stats['downloaded']} new PDFs, {self.stats['extracted']} extracted, "
+                    f"{self.stats['uploaded']} uploaded, {self.stats['failed']} failed "
+                    f"({len(self.retry_records)} queued for the next cycle){availability}",
+                    extra={'cycle': self.cycles, **self.stats})
+        self.cycle_complete = True
+        return self.stats
+
+    async def _extract_worker(self):
+        while True:
+            record, seen_at = await self.extract_queue.get()
+            try:
+                pdf_path = os.path.join(self.downloader.base_folder, record['file_path'])
+                pdf_data = await asyncio.to_thread(pdf_module.extract_pdf, pdf_path)
+                self.stats['extracted'] += 1
+                await self.upload_queue.put((record, seen_at, pdf_module.build_document(record, pdf_data)))
+            except FileNotFoundError:
+                logger.error(f"PDF file not found: {record['file_path']}")
+                self.stats['failed'] += 1
+            except Exception as e:
+                logger.error(f"Could not read PDF file {record['file_path']}: {e}")
+                self.stats['failed'] += 1
+                self.retry_records.append(record)
+            finally:
+                self.extract_queue.task_done()
+
+    async def _upload_worker(self):
+        while True:
+            # Upload what has been extracted so far in one insert_many, up to upload_batch documents
+            batch = [await self.upload_queue.get()]
+            while len(batch) < self.upload_batch and not self.upload_queue.empty():
+                batch.append(self.upload_queue.get_nowait())
+            try:
+                db_manager = await self.database()
+                inserted = await db_manager.insert_many_speeches([document for _, _, document in batch])
+                if inserted is None:
+                    self.stats['failed'] += len(batch)
+                    self.retry_records.extend(record for record, _, _ in batch)
+                else:
+                    self.stats['uploaded'] += inserted
+                    # Queryable through the API from now on; retries (extraction, upload or download) have no seen_at
+                    available_at = time.time()
+                    for _, seen_at, _ in batch:
+                        if seen_at is not None:
+                            self.availability.append(available_at - seen_at)
+                            TIME_TO_AVAILABILITY.observe(available_at - seen_at)
+            finally:
+                for _ in batch:
+                    self.upload_queue.task_done()
+
+    async def _fresh_lane(self):
+        """
+        Poll the current year's index every fresh_interval seconds, between and during cycles. New speeches found
+        during a cycle join its crawl ahead of any backfill; found between cycles, they start a cycle right away,
+        as do failed PDF downloads whose retry is due (see RetryQueue).
+        """
+        while True:
+            await asyncio.sleep(self.fresh_interval)
+            try:
+                new_pages = await asyncio.to_thread(self.downloader.poll_fresh)
+            except Exception as e:
+                logger.warning(f"Fast-lane poll failed: {e}")
+                continue
+            if new_pages:
+                logger.info(f"Fast lane: {new_pages} new speech pages on the current year's index, starting a cycle")
+                self.trigger()
+            elif self.downloader.retries_due():
+                logger.info("Fast lane: failed PDF downloads are due for a retry, starting a cycle")
+                self.trigger()
+
+    def _trigger_file_present(self):
+        if self.trigger_file and os.path.exists(self.trigger_file):
+            try:
+                os.remove(self.trigger_file)
+            except OSError:
+                pass
+            logger.info(f"Cycle triggered by {self.trigger_file}")
+            return True
+        return False
+
+    async def wait_for_next_cycle(self):
+        """Wait for the interval to pass, a trigger() / SIGUSR1 or the trigger file, whichever comes first."""
+        deadline = time.monotonic() + self.interval
+        while not self.wakeup.is_set() and not self._trigger_file_present():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=min(remaining, TRIGGER_POLL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+
+    def _install_signal_handlers(self):
+        loop = asyncio.get_running_loop()
+        handlers = {'SIGUSR1': self.trigger, 'SIGTERM': self.request_stop}
+        for name, handler in handlers.items():
+            if hasattr(signal, name):
+                try:
+                    loop.add_signal_handler(getattr(signal, name), handler)
+                except NotImplementedError:  # Windows event loops
+                    pass
+
+    async def run(self, once=False):
+        await self.start()
+        self._install_signal_handlers()
+        if not once and self.fresh_interval > 0:
+            self.workers.append(asyncio.create_task(self._fresh_lane()))
+        try:
+            while not self.stopping:
+                self.wakeup.clear()
+                try:
+                    with Profiling.profile_run('speech_pipeline'):
+                        await self.run_cycle()
+                except Exception as e:
+                    logger.error(f"Pipeline cycle failed: {e}", exc_info=True)
+                if once or self.stopping:
+                    break
+                await self.wait_for_next_cycle()
+        finally:
+            await self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--once', action='store_true', help="Run a single cycle and exit")
+    parser.add_argument('--interval', type=int, default=config.PIPELINE_INTERVAL,
+                        help="Seconds to wait between cycles")
+    parser.add_argument('--batch', action='store_true',
+                        help="Extract and upload after the download stage instead of streaming each PDF")
+    args = parser.parse_args()
+
+    pipeline = SpeechPipeline(interval=args.interval, streaming=config.PIPELINE_STREAMING and not args.batch)
+    try:
+        asyncio.run(pipeline.run(once=args.once))
+    except KeyboardInterrupt:
+        logger.info("SpeechPipeline interrupted")
+
+
+if __name__ == "__main__":
+    main()